@@ -0,0 +1,78 @@
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from django.db.models import CharField, Func, Q
+
+
+EMAIL_INDEX_NAME = 'auth_user_email_ci_uniq'
+
+
+class EmailKey(Func):
+    """
+    LOWER(NULLIF(email, '')): ekspresi yang sama persis dengan unique index
+    auth_user_email_ci_uniq (migration 0014), jadi lookup email memakai index
+    itu. '' ditulis langsung di SQL (bukan parameter) supaya cocok dengan
+    ekspresi index; email kosong menjadi NULL dan tidak ikut unik.
+    """
+    template = "LOWER(NULLIF(%(expressions)s, ''))"
+    output_field = CharField()
+
+
+def normalize_email(email):
+    return User.objects.normalize_email((email or '').strip())
+
+
+def users_by_email(email):
+    """User dengan email ini, tanpa membedakan huruf besar/kecil"""
+    email = normalize_email(email)
+    if not email:
+        return User.objects.none()
+    return User.objects.alias(email_key=EmailKey('email')).filter(email_key=email.lower())
+
+
+def email_taken(email, exclude_user=None):
+    users = users_by_email(email)
+    if exclude_user is not None:
+        users = users.exclude(pk=exclude_user.pk)
+    return users.exists()
+
+
+class EmailOrUsernameBackend(ModelBackend):
+    """
+    Login dengan username atau email (AUTHENTICATION_BACKENDS).
+
+    User dicari dengan satu query ber-index (username, atau username OR
+    email kalau input berisi '@'), lalu password di-hash tepat sekali.
+    Kalau tidak ada user yang cocok tetap dilakukan satu hash palsu, jadi
+    waktu respons tidak membocorkan apakah akun itu ada.
+    Menggantikan ModelBackend (bukan ditambahkan di belakangnya), supaya
+    login yang gagal tidak di-hash lagi oleh backend berikutnya.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if not username or password is None:
+            return None
+
+        user = self.find_user(username)
+        if user is None:
+            User().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    def find_user(self, identifier):
+        """Username yang sama persis didahulukan dari email (username boleh berisi '@')"""
+        if '@' not in identifier:
+            return User.objects.filter(username=identifier).first()
+
+        email = normalize_email(identifier).lower()
+        candidates = list(
+            User.objects.alias(email_key=EmailKey('email'))
+            .filter(Q(username=identifier) | Q(email_key=email))[:2]
+        )
+        for user in candidates:
+            if user.username == identifier:
+                return user
+        return candidates[0] if candidates else None
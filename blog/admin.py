@@ -1,18 +1,53 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django import forms
+from django.db.models import Count
+from django.template.response import TemplateResponse
 from unfold.admin import ModelAdmin
 from unfold.decorators import display
-from .models import Product, Category, Order, OrderItem, Payment
+from unfold.views import ChangeList
+from .analytics import DASHBOARD_RANGES, parse_dashboard_range, sales_dashboard
+from .exports import ExportError, order_lines, streaming_export
+from .mail import SENSITIVE_KINDS
+from .models import (
+    Product, Category, DailySales, Order, OrderItem, OutgoingEmail, Payment, PaymentNotification, StockReservation,
+)
+from .reservations import can_change_status, change_order_status
+
+
+class ListOnlyChangeList(ChangeList):
+    """ChangeList yang hanya mengambil kolom di ModelAdmin.list_only"""
+
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        if self.model_admin.list_only:
+            queryset = queryset.only(*self.model_admin.list_only)
+        return queryset
+
+
+class ListQueryAdmin(ModelAdmin):
+    """
+    Changelist dengan jumlah query tetap, berapa pun baris per halaman:
+    relasi lewat list_select_related, hitungan lewat annotate di
+    get_queryset, dan list_only membatasi kolom yang diambil. list_only
+    hanya dipakai di halaman daftar; halaman edit tetap memuat semua kolom.
+    """
+    list_only = None
+
+    def get_changelist(self, request, **kwargs):
+        return ListOnlyChangeList
 
 
 @admin.register(Category)
-class CategoryAdmin(ModelAdmin):
+class CategoryAdmin(ListQueryAdmin):
     list_display = ('name', 'product_count')
     search_fields = ('name',)
-    
-    @display(description='Jumlah Produk')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(product_count=Count('product'))
+
+    @display(description='Jumlah Produk', ordering='product_count')
     def product_count(self, obj):
-        return obj.product_set.count()
+        return obj.product_count
 
 
 # ✅ Custom Form untuk Product (handle image upload)
@@ -26,11 +61,13 @@ class ProductAdminForm(forms.ModelForm):
 
 
 @admin.register(Product)
-class ProductAdmin(ModelAdmin):
+class ProductAdmin(ListQueryAdmin):
     form = ProductAdminForm  # ✅ Pakai custom form
-    list_display = ('name', 'category', 'price_display', 'original_price_display', 'discount_badge', 'image_preview', 'stock', 'created_at')
+    list_display = ('name', 'category', 'price_display', 'original_price_display', 'discount_badge', 'image_preview', 'stock', 'wishlist_count', 'created_at')
     list_filter = ('category', 'created_at')
     search_fields = ('name', 'description')
+    list_select_related = ('category',)
+    list_only = ('name', 'category__name', 'price', 'original_price', 'image', 'stock', 'wishlist_count', 'created_at')
     list_per_page = 20
     
     fieldsets = (
@@ -83,12 +120,30 @@ class ProductAdmin(ModelAdmin):
         return '❌'
 
 
+class OrderAdminForm(forms.ModelForm):
+    class Meta:
+        model = Order
+        fields = '__all__'
+
+    def clean_status(self):
+        status = self.cleaned_data['status']
+        previous = self.initial.get('status')
+        if previous and not can_change_status(previous, status):
+            raise forms.ValidationError(
+                f'Pesanan {self.instance.get_status_display()} tidak bisa diubah ke status ini.'
+            )
+        return status
+
+
 @admin.register(Order)
-class OrderAdmin(ModelAdmin):
+class OrderAdmin(ListQueryAdmin):
+    form = OrderAdminForm
     list_display = ('order_id', 'full_name', 'status_badge', 'total_display', 'payment_method', 'created_at')
     list_filter = ('status', 'payment_method', 'created_at')
     search_fields = ('order_id', 'full_name', 'phone', 'address')
-    readonly_fields = ('order_id', 'created_at', 'updated_at', 'paid_at')
+    list_only = ('order_id', 'full_name', 'status', 'total_amount', 'payment_method', 'created_at')
+    actions = ['export_csv', 'export_parquet']
+    readonly_fields = ('order_id', 'created_at', 'updated_at', 'paid_at', 'cancelled_at')
     list_per_page = 20
     
     fieldsets = (
@@ -99,10 +154,48 @@ class OrderAdmin(ModelAdmin):
             'fields': ('full_name', 'phone', 'address', 'city', 'postal_code'),
         }),
         ('💵 Informasi Pembayaran', {
-            'fields': ('total_amount', 'created_at', 'updated_at', 'paid_at'),
+            'fields': ('total_amount', 'created_at', 'updated_at', 'paid_at', 'cancelled_at'),
         }),
     )
     
+    def _export(self, request, queryset, export_format):
+        """Baris order + item + payment dari order terpilih / hasil filter changelist"""
+        try:
+            return streaming_export(request, order_lines(orders=queryset), export_format)
+        except ExportError as e:
+            self.message_user(request, str(e), messages.ERROR)
+
+    @admin.action(description='Export CSV (order, item, pembayaran)')
+    def export_csv(self, request, queryset):
+        return self._export(request, queryset, 'csv')
+
+    @admin.action(description='Export Parquet (order, item, pembayaran)')
+    def export_parquet(self, request, queryset):
+        return self._export(request, queryset, 'parquet')
+
+    def save_model(self, request, obj, form, change):
+        """
+        Status diubah manual: lewat change_order_status, sama seperti webhook
+        dan cancel user (Payment, hold stok, rollup, email, cache status).
+        Transisi yang tidak didukung sudah ditolak OrderAdminForm.
+        """
+        if not (change and 'status' in form.changed_data):
+            return super().save_model(request, obj, form, change)
+
+        # Field lain disimpan tanpa kolom status; status hanya lewat UPDATE bersyarat
+        # (changeform_view sudah berjalan di dalam transaction.atomic())
+        status = obj.status
+        fields = [name for name in form.changed_data if name != 'status']
+        if fields:
+            obj.save(update_fields=fields + ['updated_at'])
+
+        if not change_order_status(obj, form.initial['status'], status):
+            self.message_user(
+                request, 'Status tidak diubah: status pesanan sudah diubah lebih dulu (webhook / user / admin lain).',
+                messages.WARNING,
+            )
+        obj.refresh_from_db()
+
     @display(description='Status', ordering='status')
     def status_badge(self, obj):
         colors = {
@@ -133,6 +226,13 @@ class OrderItemInline(admin.TabularInline):
     extra = 0
     readonly_fields = ('product', 'quantity', 'price', 'subtotal_display')
     can_delete = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product')
+
+    def has_add_permission(self, request, obj=None):
+        # Item dibuat saat checkout; form kosong (semua field readonly) tidak punya harga
+        return False
     
     def subtotal_display(self, obj):
         return f'IDR {obj.get_subtotal():,.0f}'
@@ -144,10 +244,12 @@ OrderAdmin.inlines = [OrderItemInline]
 
 
 @admin.register(OrderItem)
-class OrderItemAdmin(ModelAdmin):
+class OrderItemAdmin(ListQueryAdmin):
     list_display = ('order', 'product', 'quantity', 'price_display', 'subtotal_display')
     list_filter = ('order__created_at',)
     search_fields = ('order__order_id', 'product__name')
+    list_select_related = ('order', 'product')
+    list_only = ('quantity', 'price', 'order__order_id', 'order__full_name', 'product__name')
     
     @display(description='Harga')
     def price_display(self, obj):
@@ -159,10 +261,12 @@ class OrderItemAdmin(ModelAdmin):
 
 
 @admin.register(Payment)
-class PaymentAdmin(ModelAdmin):
+class PaymentAdmin(ListQueryAdmin):
     list_display = ('order', 'payment_method_display', 'status_badge', 'amount_display', 'created_at')
     list_filter = ('payment_method', 'status', 'created_at')
     search_fields = ('order__order_id', 'transaction_id')
+    list_select_related = ('order',)
+    list_only = ('payment_method', 'status', 'amount', 'created_at', 'order__order_id', 'order__full_name')
     readonly_fields = ('transaction_id', 'snap_token', 'redirect_url', 'created_at', 'updated_at')
     list_per_page = 20
     
@@ -210,4 +314,86 @@ class PaymentAdmin(ModelAdmin):
     
     @display(description='Jumlah', ordering='amount')
     def amount_display(self, obj):
-        return f'IDR {obj.amount:,.0f}'
\ No newline at end of file
+        return f'IDR {obj.amount:,.0f}'
+
+
+@admin.register(PaymentNotification)
+class PaymentNotificationAdmin(ListQueryAdmin):
+    list_display = ('order_id', 'transaction_status', 'fraud_status', 'state_badge', 'attempts', 'error', 'received_at', 'processed_at')
+    list_filter = ('state', 'transaction_status', 'received_at')
+    search_fields = ('order_id',)
+    # payload (JSON dari Midtrans) hanya dimuat di halaman detail
+    list_only = ('order_id', 'transaction_status', 'fraud_status', 'state', 'attempts', 'error', 'received_at', 'processed_at')
+    readonly_fields = ('dedupe_key', 'order_id', 'transaction_status', 'fraud_status', 'payload', 'state', 'attempts', 'error', 'received_at', 'processed_at')
+    list_per_page = 50
+
+    @display(description='State', ordering='state')
+    def state_badge(self, obj):
+        # 'conflict': pelanggan membayar order yang sudah dibatalkan, perlu refund / rekonsiliasi
+        colors = {
+            'pending': '🟡',
+            'done': '🟢',
+            'skipped': '⚪',
+            'conflict': '🚨',
+            'failed': '🔴',
+        }
+        return f"{colors.get(obj.state, '⚪')} {obj.get_state_display()}"
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(ListQueryAdmin):
+    list_display = ('kind', 'to', 'subject', 'state', 'attempts', 'created_at', 'sent_at')
+    list_filter = ('state', 'kind', 'created_at')
+    search_fields = ('to', 'subject')
+    # body hanya dimuat di halaman detail
+    list_only = ('kind', 'to', 'subject', 'state', 'attempts', 'created_at', 'sent_at')
+    readonly_fields = ('kind', 'dedupe_key', 'to', 'subject', 'body', 'attempts', 'error', 'next_attempt_at', 'created_at', 'sent_at')
+    list_per_page = 50
+
+    def get_fields(self, request, obj=None):
+        # Body reset password berisi token yang masih berlaku: tidak ditampilkan
+        fields = super().get_fields(request, obj)
+        if obj is not None and obj.kind in SENSITIVE_KINDS:
+            fields = [field for field in fields if field != 'body']
+        return fields
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(ListQueryAdmin):
+    list_display = ('order', 'product', 'quantity', 'state', 'created_at', 'updated_at')
+    list_filter = ('state', 'created_at')
+    search_fields = ('order__order_id', 'product__name')
+    list_select_related = ('order', 'product')
+    list_only = ('quantity', 'state', 'created_at', 'updated_at', 'order__order_id', 'order__full_name', 'product__name')
+    readonly_fields = ('order', 'product', 'quantity', 'state', 'created_at', 'updated_at')
+    list_per_page = 50
+
+
+@admin.register(DailySales)
+class SalesDashboardAdmin(ModelAdmin):
+    """
+    Dashboard analitik (omzet harian, konversi per metode bayar, produk
+    terlaris, risiko stok habis). Dibaca dari tabel rollup blog/analytics.py;
+    isi ulang dengan `manage.py rebuild_sales_rollups`.
+    """
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        days = parse_dashboard_range(request.GET.get('days'))
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Analitik Penjualan',
+            'opts': self.model._meta,
+            'ranges': DASHBOARD_RANGES,
+            'dashboard': sales_dashboard(days),
+            **(extra_context or {}),
+        }
+        return TemplateResponse(request, 'admin/blog/sales_dashboard.html', context)
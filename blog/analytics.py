@@ -0,0 +1,271 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import Coalesce, Greatest, TruncDate
+from django.utils import timezone
+
+from .models import DailyPaymentMethodSales, DailyProductSales, DailySales, Order, OrderItem
+
+
+# Status setelah dibayar; order di status ini dihitung sebagai 'paid' di rollup
+PAID_ORDER_STATUSES = ['paid', 'processing', 'shipped', 'delivered']
+DASHBOARD_RANGES = [7, 30, 90, 365]
+TOP_PRODUCTS = 10
+
+ZERO = Decimal('0')
+
+
+def _increment(model, keys, **deltas):
+    """
+    UPDATE x = x + delta; baris baru dibuat kalau belum ada (aman untuk dua
+    proses). Delta negatif (revert_paid_orders) tidak membuat baris baru dan
+    tidak membuat kolom di bawah 0.
+    """
+    increments = {
+        field: F(field) + value if value >= 0 else Greatest(F(field) + value, 0)
+        for field, value in deltas.items()
+    }
+    if model.objects.filter(**keys).update(**increments) or all(value <= 0 for value in deltas.values()):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**keys, **deltas)
+    except IntegrityError:
+        model.objects.filter(**keys).update(**increments)
+
+
+def record_order_transitions(order_ids, status, at=None):
+    """
+    Tambahkan order yang baru berpindah ke 'paid' / 'cancelled' ke rollup.
+
+    Panggil di transaksi yang sama dengan UPDATE status, dan hanya untuk order
+    yang benar-benar berpindah (hasil UPDATE bersyarat): order yang tercatat
+    dua kali akan terhitung dua kali. Tanggal rollup = tanggal transisi.
+    """
+    if status not in ('paid', 'cancelled') or not order_ids:
+        return
+    _record(order_ids, status == 'paid', timezone.localdate(at or timezone.now()), 1)
+
+
+def revert_paid_orders(order_ids):
+    """
+    Order yang sudah dibayar lalu dibatalkan: angka paid-nya dikurangi lagi
+    dari rollup tanggal paid_at (tanggal yang dipakai rebuild_rollups untuk
+    order paid). Batalnya dicatat terpisah lewat record_order_transitions.
+    """
+    days = {}
+    for pk, paid_at, updated_at in Order.objects.filter(id__in=order_ids).values_list('id', 'paid_at', 'updated_at'):
+        days.setdefault(timezone.localdate(paid_at or updated_at), []).append(pk)
+    for day, ids in days.items():
+        _record(ids, True, day, -1)
+
+
+def _record(order_ids, paid, day, sign):
+    orders = list(Order.objects.filter(id__in=order_ids).values_list('payment_method', 'total_amount'))
+    if not orders:
+        return
+
+    sales = {'orders_paid': 0, 'orders_cancelled': 0, 'items_sold': 0, 'revenue': ZERO}
+    methods = {}
+    for payment_method, total_amount in orders:
+        method = methods.setdefault(payment_method or '', {'orders_paid': 0, 'orders_cancelled': 0, 'revenue': ZERO})
+        if paid:
+            for row in (sales, method):
+                row['orders_paid'] += sign
+                row['revenue'] += sign * total_amount
+        else:
+            sales['orders_cancelled'] += sign
+            method['orders_cancelled'] += sign
+
+    products = {}
+    if paid:
+        items = OrderItem.objects.filter(order_id__in=order_ids).values_list('product_id', 'quantity', 'price')
+        for product_id, quantity, price in items:
+            product = products.setdefault(product_id, {'quantity': 0, 'revenue': ZERO})
+            product['quantity'] += sign * quantity
+            product['revenue'] += sign * price * quantity
+            sales['items_sold'] += sign * quantity
+
+    _increment(DailySales, {'date': day}, **sales)
+    for payment_method, deltas in methods.items():
+        _increment(DailyPaymentMethodSales, {'date': day, 'payment_method': payment_method}, **deltas)
+    for product_id, deltas in products.items():
+        _increment(DailyProductSales, {'date': day, 'product_id': product_id}, **deltas)
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def rebuild_rollups(start, end):
+    """
+    Hitung ulang rollup tanggal [start, end) dari Order/OrderItem (backfill).
+
+    Order paid memakai tanggal paid_at, order cancelled tanggal cancelled_at,
+    sama dengan tanggal yang dipakai record_order_transitions (updated_at
+    hanya untuk order lama yang belum punya kolom itu). GROUP BY hanya
+    atas order di rentang ini, jadi `manage.py rebuild_sales_rollups`
+    memanggilnya per potongan beberapa hari. Return jumlah order yang dihitung.
+    """
+    tz = timezone.get_current_timezone()
+    lo, hi = _day_start(start), _day_start(end)
+    money = DecimalField(max_digits=14, decimal_places=2)
+
+    paid = (
+        Order.objects.filter(status__in=PAID_ORDER_STATUSES)
+        .annotate(closed_at=Coalesce('paid_at', 'updated_at'))
+        .filter(closed_at__gte=lo, closed_at__lt=hi)
+        .annotate(day=TruncDate('closed_at', tzinfo=tz))
+    )
+    cancelled = (
+        Order.objects.filter(status='cancelled')
+        .annotate(closed_at=Coalesce('cancelled_at', 'updated_at'))
+        .filter(closed_at__gte=lo, closed_at__lt=hi)
+        .annotate(day=TruncDate('closed_at', tzinfo=tz))
+    )
+
+    sales = {}
+    for row in paid.values('day').annotate(orders=Count('id'), revenue=Sum('total_amount')):
+        sales[row['day']] = DailySales(date=row['day'], orders_paid=row['orders'], revenue=row['revenue'])
+    for row in cancelled.values('day').annotate(orders=Count('id')):
+        sales.setdefault(row['day'], DailySales(date=row['day'])).orders_cancelled = row['orders']
+
+    methods = {}
+    for row in paid.values('day', 'payment_method').annotate(orders=Count('id'), revenue=Sum('total_amount')):
+        methods[row['day'], row['payment_method'] or ''] = DailyPaymentMethodSales(
+            date=row['day'], payment_method=row['payment_method'] or '',
+            orders_paid=row['orders'], revenue=row['revenue'],
+        )
+    for row in cancelled.values('day', 'payment_method').annotate(orders=Count('id')):
+        key = (row['day'], row['payment_method'] or '')
+        methods.setdefault(key, DailyPaymentMethodSales(date=key[0], payment_method=key[1])).orders_cancelled += row['orders']
+
+    products = []
+    items = (
+        OrderItem.objects.filter(order__in=paid.values('id'))
+        .annotate(day=TruncDate(Coalesce('order__paid_at', 'order__updated_at'), tzinfo=tz))
+        .values('day', 'product_id')
+        .annotate(sold=Sum('quantity'), sales=Sum(F('price') * F('quantity'), output_field=money))
+    )
+    for row in items:
+        products.append(DailyProductSales(
+            date=row['day'], product_id=row['product_id'], quantity=row['sold'], revenue=row['sales'],
+        ))
+        sales[row['day']].items_sold += row['sold']
+
+    with transaction.atomic():
+        for model in (DailySales, DailyPaymentMethodSales, DailyProductSales):
+            model.objects.filter(date__gte=start, date__lt=end).delete()
+        DailySales.objects.bulk_create(sales.values())
+        DailyPaymentMethodSales.objects.bulk_create(methods.values())
+        DailyProductSales.objects.bulk_create(products)
+
+    return sum(row.orders_paid + row.orders_cancelled for row in sales.values())
+
+
+def parse_dashboard_range(value):
+    try:
+        days = int(value)
+    except (TypeError, ValueError):
+        return DASHBOARD_RANGES[1]
+    return days if days in DASHBOARD_RANGES else DASHBOARD_RANGES[1]
+
+
+def _conversion(paid, cancelled):
+    closed = paid + cancelled
+    return round(paid * 100 / closed, 1) if closed else None
+
+
+def sales_dashboard(days, today=None):
+    """
+    Data dashboard analitik untuk `days` hari terakhir, hanya dari tabel
+    rollup (4 query kecil, tidak tergantung jumlah order).
+    """
+    today = today or timezone.localdate()
+    since = today - timedelta(days=days - 1)
+
+    by_date = {row.date: row for row in DailySales.objects.filter(date__gte=since, date__lte=today)}
+    daily = []
+    for offset in range(days):
+        day = since + timedelta(days=offset)
+        row = by_date.get(day) or DailySales(date=day)
+        daily.append({
+            'date': day,
+            'revenue': row.revenue,
+            'orders_paid': row.orders_paid,
+            'orders_cancelled': row.orders_cancelled,
+            'items_sold': row.items_sold,
+        })
+    peak = max((row['revenue'] for row in daily), default=ZERO) or 1
+    for row in daily:
+        row['bar'] = round(row['revenue'] * 100 / peak)
+
+    totals = {
+        'revenue': sum((row['revenue'] for row in daily), ZERO),
+        'orders_paid': sum(row['orders_paid'] for row in daily),
+        'orders_cancelled': sum(row['orders_cancelled'] for row in daily),
+        'items_sold': sum(row['items_sold'] for row in daily),
+    }
+    totals['conversion'] = _conversion(totals['orders_paid'], totals['orders_cancelled'])
+    totals['average_order'] = totals['revenue'] / totals['orders_paid'] if totals['orders_paid'] else ZERO
+
+    methods = list(
+        DailyPaymentMethodSales.objects.filter(date__gte=since, date__lte=today)
+        .values('payment_method')
+        .annotate(orders_paid=Sum('orders_paid'), orders_cancelled=Sum('orders_cancelled'), revenue=Sum('revenue'))
+        .order_by('-revenue')
+    )
+    for row in methods:
+        row['conversion'] = _conversion(row['orders_paid'], row['orders_cancelled'])
+
+    top_products = list(
+        DailyProductSales.objects.filter(date__gte=since, date__lte=today)
+        .values('product_id', 'product__name', 'product__stock')
+        .annotate(quantity=Sum('quantity'), revenue=Sum('revenue'))
+        .order_by('-quantity', '-revenue')[:TOP_PRODUCTS]
+    )
+
+    return {
+        'days': days,
+        'since': since,
+        'today': today,
+        'daily': daily,
+        'totals': totals,
+        'methods': methods,
+        'top_products': top_products,
+        'stock_risk': stock_risk(today),
+    }
+
+
+def stock_risk(today=None):
+    """
+    Produk yang stoknya diperkirakan habis dalam ANALYTICS_STOCK_RISK_DAYS hari,
+    dari rata-rata penjualan harian ANALYTICS_STOCK_WINDOW_DAYS hari terakhir.
+    """
+    today = today or timezone.localdate()
+    window = settings.ANALYTICS_STOCK_WINDOW_DAYS
+    since = today - timedelta(days=window - 1)
+
+    products = (
+        DailyProductSales.objects.filter(date__gte=since, date__lte=today)
+        .values('product_id', 'product__name', 'product__stock')
+        .annotate(sold=Sum('quantity'))
+        .filter(sold__gt=0)
+    )
+
+    risky = []
+    for product in products:
+        per_day = product['sold'] / window
+        days_left = max(product['product__stock'], 0) / per_day
+        if days_left <= settings.ANALYTICS_STOCK_RISK_DAYS:
+            risky.append({
+                'product_id': product['product_id'],
+                'name': product['product__name'],
+                'stock': product['product__stock'],
+                'per_day': round(per_day, 1),
+                'days_left': round(days_left, 1),
+            })
+    return sorted(risky, key=lambda product: product['days_left'])
@@ -0,0 +1,168 @@
+from django.conf import settings
+from django.db import transaction
+
+from .checkout import SHIPPING_COST
+from .models import Cart, CartItem
+from .prices import get_prices
+
+
+SESSION_CART_KEY = 'cart'
+
+
+class CartError(Exception):
+    """Perubahan cart tidak valid; pesan aman ditampilkan ke user"""
+
+
+def parse_changes(changes):
+    """
+    Diff dari client -> {product_id: quantity}.
+
+    Quantity adalah jumlah akhir (bukan selisih), jadi request yang dikirim
+    ulang tidak menggandakan item; 0 berarti hapus dari cart.
+    """
+    if not isinstance(changes, dict):
+        raise CartError('Data cart tidak valid')
+
+    parsed = {}
+    for product_id, quantity in changes.items():
+        try:
+            product_id = int(product_id)
+            quantity = int(quantity)
+        except (TypeError, ValueError):
+            raise CartError('Data cart tidak valid')
+        if quantity < 0 or quantity > settings.CART_MAX_QUANTITY:
+            raise CartError('Jumlah produk tidak valid')
+        parsed[product_id] = quantity
+    return parsed
+
+
+class SessionCartStore:
+    """Cart tamu: {product_id: quantity} di session"""
+
+    def __init__(self, session):
+        self.session = session
+
+    def load(self):
+        return {int(product_id): quantity for product_id, quantity in self.session.get(SESSION_CART_KEY, {}).items()}
+
+    def save(self, quantities, removed=(), clear=False):
+        current = {} if clear else self.load()
+        for product_id in removed:
+            current.pop(product_id, None)
+        current.update(quantities)
+        self.session[SESSION_CART_KEY] = {str(product_id): quantity for product_id, quantity in current.items()}
+        return current
+
+    def clear(self):
+        self.session.pop(SESSION_CART_KEY, None)
+
+
+class DatabaseCartStore:
+    """Cart user yang login: Cart + CartItem, ditulis dengan bulk upsert"""
+
+    def __init__(self, user):
+        self.user = user
+
+    def load(self):
+        return dict(CartItem.objects.filter(cart__user=self.user).values_list('product_id', 'quantity'))
+
+    def save(self, quantities, removed=(), clear=False):
+        with transaction.atomic():
+            cart, _ = Cart.objects.get_or_create(user=self.user)
+            if clear:
+                cart.items.all().delete()
+            elif removed:
+                cart.items.filter(product_id__in=removed).delete()
+            if quantities:
+                CartItem.objects.bulk_create(
+                    [CartItem(cart=cart, product_id=product_id, quantity=quantity)
+                     for product_id, quantity in quantities.items()],
+                    update_conflicts=True,
+                    unique_fields=['cart', 'product'],
+                    update_fields=['quantity', 'updated_at'],
+                )
+        return self.load()
+
+    def clear(self):
+        CartItem.objects.filter(cart__user=self.user).delete()
+
+
+def get_cart_store(request):
+    if request.user.is_authenticated:
+        return DatabaseCartStore(request.user)
+    return SessionCartStore(request.session)
+
+
+def apply_cart_changes(store, changes, clear=False):
+    """
+    Terapkan satu batch perubahan ke cart dan return {product_id: quantity}.
+
+    Produk yang tidak ada di database diabaikan; batas jumlah baris cart
+    CART_MAX_LINES dicek setelah perubahan diterapkan.
+    """
+    changes = parse_changes(changes)
+    wanted = [product_id for product_id, quantity in changes.items() if quantity > 0]
+    existing = get_prices(wanted)
+
+    quantities = {product_id: changes[product_id] for product_id in wanted if product_id in existing}
+    removed = [product_id for product_id, quantity in changes.items() if quantity == 0]
+
+    current = {} if clear else store.load()
+    lines = set(current) - set(removed) | set(quantities)
+    if len(lines) > settings.CART_MAX_LINES:
+        raise CartError(f'Maksimal {settings.CART_MAX_LINES} produk dalam satu keranjang')
+
+    return store.save(quantities, removed=removed, clear=clear)
+
+
+def merge_session_cart(session, user):
+    """Setelah login: item di cart tamu dipindah ke cart database user"""
+    session_store = SessionCartStore(session)
+    quantities = session_store.load()
+    if not quantities:
+        return
+    existing = get_prices(quantities)
+    DatabaseCartStore(user).save({pid: qty for pid, qty in quantities.items() if pid in existing})
+    session_store.clear()
+
+
+def price_cart(quantities):
+    """
+    Ringkasan cart dengan harga dari server (blog/prices.py; tanpa query
+    database selama harga ada di cache).
+
+    Return {'items': [...], 'count', 'subtotal', 'shipping', 'total'}; harga
+    dalam rupiah (int), sama dengan format productsData di lund.js.
+    """
+    prices = get_prices(quantities)
+
+    items = []
+    subtotal = 0
+    for product_id, quantity in quantities.items():
+        entry = prices.get(product_id)
+        if entry is None:
+            continue
+        price = int(entry['price'])
+        subtotal += price * quantity
+        items.append({
+            'product_id': product_id,
+            'name': entry['name'],
+            'image': entry['image'],
+            'price': price,
+            'quantity': quantity,
+            'subtotal': price * quantity,
+        })
+
+    shipping = int(SHIPPING_COST) if items else 0
+    return {
+        'items': items,
+        'count': sum(item['quantity'] for item in items),
+        'subtotal': subtotal,
+        'shipping': shipping,
+        'total': subtotal + shipping,
+    }
+
+
+def checkout_cart_data(quantities):
+    """Cart server -> format cart_data yang diterima place_order"""
+    return {str(product_id): {'quantity': quantity} for product_id, quantity in quantities.items()}
@@ -0,0 +1,160 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.template.loader import render_to_string
+
+from .images import product_image_url
+from .models import Category, Product
+
+
+# Opsi urutan katalog -> ORDER BY (selalu diakhiri 'id' supaya stabil antar halaman)
+SORT_OPTIONS = {
+    'newest': ('Terbaru', ('-created_at', '-id')),
+    'price_asc': ('Harga: Rendah ke Tinggi', ('price', 'id')),
+    'price_desc': ('Harga: Tinggi ke Rendah', ('-price', '-id')),
+}
+DEFAULT_SORT = 'newest'
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+def get_catalog_version():
+    """Token versi katalog; berubah setiap kali Product disimpan/dihapus"""
+    return cache.get_or_set(CATALOG_VERSION_KEY, time.time_ns(), None)
+
+
+def invalidate_catalog_cache():
+    """Buang semua fragment katalog dengan mengganti token versi"""
+    cache.set(CATALOG_VERSION_KEY, time.time_ns(), None)
+
+
+def parse_catalog_params(params):
+    """Normalisasi query string katalog -> (category_id, sort, page)"""
+    category_id = params.get('category') or None
+    if category_id is not None:
+        try:
+            category_id = int(category_id)
+        except (TypeError, ValueError):
+            category_id = None
+
+    sort = params.get('sort', DEFAULT_SORT)
+    if sort not in SORT_OPTIONS:
+        sort = DEFAULT_SORT
+
+    try:
+        page = max(int(params.get('page', 1)), 1)
+    except (TypeError, ValueError):
+        page = 1
+
+    return category_id, sort, page
+
+
+def format_idr(amount):
+    """35000 -> 'IDR 35.000' (format yang sama dengan formatCurrency di lund.js)"""
+    return f'IDR {amount:,.0f}'.replace(',', '.')
+
+
+def get_catalog_page(category_id, sort, page, per_page=None):
+    """
+    Ambil satu halaman produk dengan SATU query.
+
+    Tidak memakai COUNT(*): ambil per_page + 1 baris untuk tahu apakah
+    masih ada halaman berikutnya.
+    """
+    per_page = per_page or settings.CATALOG_PAGE_SIZE
+    offset = (page - 1) * per_page
+
+    products = Product.objects.select_related('category').order_by(*SORT_OPTIONS[sort][1])
+    if category_id:
+        products = products.filter(category_id=category_id)
+
+    rows = list(products[offset:offset + per_page + 1])
+    return {
+        'products': rows[:per_page],
+        'page': page,
+        'has_previous': page > 1,
+        'has_next': len(rows) > per_page,
+        'previous_page': page - 1,
+        'next_page': page + 1,
+    }
+
+
+def prepare_product(product):
+    """Atribut tampilan kartu produk (gambar, diskon, harga terformat)"""
+    product.image_url = product_image_url(product, width=640)
+    product.discount = product.get_discount_percentage()
+    product.price_display = format_idr(product.price)
+    product.original_price_display = format_idr(product.original_price) if product.discount else None
+    return product
+
+
+def product_data(product):
+    """
+    Data produk untuk productsData di lund.js (modal + cart); setelah
+    prepare_product. Tanpa stok: data ini ikut di-cache bersama fragment,
+    stok dicek ulang saat checkout.
+    """
+    return {
+        'name': product.name,
+        'image': product.image_url,
+        'price': int(product.price),
+        'priceFormatted': product.price_display,
+        'originalPrice': product.original_price_display,
+        'description': product.description,
+        'features': [],
+    }
+
+
+def get_catalog_counts(version):
+    """Jumlah produk per kategori ({None: total, id: jumlah}), di-cache per versi katalog"""
+    cache_key = f'catalog:counts:{version}'
+    counts = cache.get(cache_key)
+    if counts is None:
+        counts = dict(Category.objects.order_by().annotate(total=Count('product')).values_list('id', 'total'))
+        counts[None] = Product.objects.count()
+        cache.set(cache_key, counts, settings.CATALOG_CACHE_TIMEOUT)
+    return counts
+
+
+def clamp_catalog_params(version, category_id, page):
+    """
+    Kategori tak dikenal -> semua produk, halaman di luar jangkauan ->
+    halaman terakhir; jumlah kunci cache fragment jadi terbatas.
+    """
+    counts = get_catalog_counts(version)
+    if category_id not in counts:
+        category_id = None
+    last_page = max(-(-counts[category_id] // settings.CATALOG_PAGE_SIZE), 1)
+    return category_id, min(page, last_page)
+
+
+def render_catalog_fragment(category_id, sort, page):
+    """
+    Render grid katalog (filter, produk, navigasi halaman) dan simpan di cache
+    per kombinasi kategori/urutan/halaman.
+    """
+    version = get_catalog_version()
+    category_id, page = clamp_catalog_params(version, category_id, page)
+    cache_key = f'catalog:fragment:{version}:{category_id or "all"}:{sort}:{page}'
+    html = cache.get(cache_key)
+    if html is not None:
+        return html
+
+    listing = get_catalog_page(category_id, sort, page)
+    for product in listing['products']:
+        prepare_product(product)
+    products_data = {str(product.id): product_data(product) for product in listing['products']}
+
+    context = {
+        **listing,
+        'categories': list(Category.objects.order_by('name')),
+        'category_id': category_id,
+        'sort': sort,
+        'sort_options': [(key, label) for key, (label, _) in SORT_OPTIONS.items()],
+        'products_data': products_data,
+    }
+    html = render_to_string('blog/partials/catalog_products.html', context)
+    cache.set(cache_key, html, settings.CATALOG_CACHE_TIMEOUT)
+    return html
@@ -0,0 +1,127 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, When
+
+from .models import Order, OrderItem, Product, StockReservation
+from .prices import get_prices
+
+
+SHIPPING_COST = Decimal('10000')
+
+
+class CheckoutError(Exception):
+    """Checkout gagal; pesan aman ditampilkan ke user"""
+
+
+def parse_cart(cart_data):
+    """
+    Validasi cart JSON dari client -> {product_id: item_data}.
+
+    Quantity harus bilangan bulat positif; produk yang sama digabung.
+    """
+    if not isinstance(cart_data, dict):
+        raise CheckoutError('Data cart tidak valid')
+
+    cart = {}
+    for product_id, item_data in cart_data.items():
+        try:
+            product_id = int(product_id)
+            quantity = int(item_data.get('quantity', 1))
+        except (TypeError, ValueError, AttributeError):
+            raise CheckoutError('Data cart tidak valid')
+        if quantity <= 0:
+            raise CheckoutError('Jumlah produk tidak valid')
+        cart[product_id] = {**item_data, 'quantity': quantity}
+    return cart
+
+
+def _stock_delta(quantities, sign):
+    """CASE id WHEN .. THEN stock +/- qty untuk satu UPDATE"""
+    return Case(
+        *[When(id=product_id, then=F('stock') + sign * quantity) for product_id, quantity in quantities.items()],
+        default=F('stock'),
+        output_field=IntegerField(),
+    )
+
+
+def decrement_stock(quantities):
+    """
+    Kurangi stok semua produk dalam SATU UPDATE bersyarat.
+
+    Setiap baris hanya ikut ter-update kalau stoknya masih cukup; kalau jumlah
+    baris yang ter-update kurang dari jumlah produk, ada yang kehabisan stok
+    (nama produknya dicari dengan satu query tambahan untuk pesan error).
+    Harus dipanggil di dalam transaction.atomic().
+    """
+    enough_stock = Q()
+    for product_id, quantity in quantities.items():
+        enough_stock |= Q(id=product_id, stock__gte=quantity)
+
+    updated = Product.objects.filter(enough_stock).update(stock=_stock_delta(quantities, -1))
+    if updated != len(quantities):
+        short = [
+            product.name for product in Product.objects.filter(id__in=quantities).only('name', 'stock')
+            if product.stock < quantities[product.id]
+        ]
+        if len(short) == 1:
+            raise CheckoutError(f'Stok {short[0]} tidak mencukupi')
+        raise CheckoutError('Stok produk tidak mencukupi')
+
+
+def restore_stock(quantities):
+    """Kembalikan stok beberapa produk sekaligus dalam SATU UPDATE"""
+    if not quantities:
+        return 0
+    return Product.objects.filter(id__in=quantities).update(stock=_stock_delta(quantities, 1))
+
+
+def place_order(cart_data, user=None, **order_fields):
+    """
+    Buat Order + OrderItem dan hold stok (StockReservation) dalam satu transaksi.
+
+    Harga selalu dari server (blog/prices.py); harga yang dikirim client
+    diabaikan. Query yang dijalankan tetap, berapapun jumlah item di cart:
+    satu UPDATE stok bersyarat, INSERT order, bulk INSERT item, bulk INSERT
+    reservation (plus satu SELECT harga kalau belum ada di cache). Produk tidak
+    di-lock dengan SELECT ... FOR UPDATE; UPDATE bersyarat yang menjaga stok
+    tidak minus, jadi checkout produk yang sama tidak saling antri lock. Kalau
+    ada item yang stoknya tidak cukup, seluruh transaksi di-rollback dan
+    CheckoutError dilempar.
+
+    Return (order, lines); lines = [{'product_id', 'name', 'quantity', 'price'}, ...].
+    """
+    cart = parse_cart(cart_data)
+    prices = get_prices(cart)
+
+    total = Decimal('0.00')
+    lines = []
+    for product_id, item_data in cart.items():
+        entry = prices.get(product_id)
+        if entry is None:
+            continue
+        quantity = item_data['quantity']
+        total += entry['price'] * quantity
+        lines.append({'product_id': product_id, 'name': entry['name'], 'quantity': quantity, 'price': entry['price']})
+
+    if not lines:
+        raise CheckoutError('Tidak ada produk valid dalam cart')
+
+    with transaction.atomic():
+        decrement_stock({line['product_id']: line['quantity'] for line in lines})
+        order = Order.objects.create(
+            user=user,
+            total_amount=total + SHIPPING_COST,
+            status='pending',
+            **order_fields
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product_id=line['product_id'], quantity=line['quantity'], price=line['price'])
+            for line in lines
+        ])
+        StockReservation.objects.bulk_create([
+            StockReservation(order=order, product_id=line['product_id'], quantity=line['quantity'])
+            for line in lines
+        ])
+
+    return order, lines
@@ -0,0 +1,200 @@
+import csv
+from datetime import datetime, time
+
+from django.conf import settings
+from django.db.models import DecimalField, ExpressionWrapper, F
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import OrderItem
+from .streaming import streaming_content
+
+
+# (nama kolom, field) satu baris per OrderItem, data Order + Payment ikut
+EXPORT_COLUMNS = [
+    ('order_id', 'order__order_id'),
+    ('created_at', 'order__created_at'),
+    ('paid_at', 'order__paid_at'),
+    ('status', 'order__status'),
+    ('full_name', 'order__full_name'),
+    ('city', 'order__city'),
+    ('postal_code', 'order__postal_code'),
+    ('order_total', 'order__total_amount'),
+    ('payment_method', 'order__payment__payment_method'),
+    ('payment_status', 'order__payment__status'),
+    ('transaction_id', 'order__payment__transaction_id'),
+    ('product_id', 'product_id'),
+    ('product_name', 'product__name'),
+    ('quantity', 'quantity'),
+    ('price', 'price'),
+    ('subtotal', 'subtotal'),
+]
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+class ExportError(Exception):
+    """Export tidak bisa dibuat; pesan aman ditampilkan ke admin"""
+
+
+def order_lines(since=None, until=None, statuses=None, orders=None):
+    """
+    Baris export (tuple, urutan EXPORT_COLUMNS) untuk order yang dibuat di
+    tanggal [since, until] dengan status tertentu. `orders` (queryset Order,
+    mis. dari action admin) dipakai sebagai subquery, tidak dimuat ke memori.
+    """
+    lines = OrderItem.objects.annotate(
+        subtotal=ExpressionWrapper(F('price') * F('quantity'), output_field=DecimalField(max_digits=14, decimal_places=2))
+    )
+    if since:
+        lines = lines.filter(order__created_at__gte=timezone.make_aware(datetime.combine(since, time.min)))
+    if until:
+        lines = lines.filter(order__created_at__lte=timezone.make_aware(datetime.combine(until, time.max)))
+    if statuses:
+        lines = lines.filter(order__status__in=statuses)
+    if orders is not None:
+        lines = lines.filter(order__in=orders.values('pk'))
+    return lines.order_by('order__created_at', 'order_id', 'id').values_list(*[field for _, field in EXPORT_COLUMNS])
+
+
+def iter_lines(lines, chunk_size=None):
+    """Baris diambil per chunk dari cursor database (server-side cursor di PostgreSQL)"""
+    return lines.iterator(chunk_size=chunk_size or settings.EXPORT_CHUNK_SIZE)
+
+
+class _Echo:
+    """File-like untuk csv.writer: write() langsung mengembalikan barisnya"""
+
+    def write(self, value):
+        return value
+
+
+# Teks yang diawali karakter ini dibaca Excel / Sheets sebagai formula
+# (nama, alamat, kota diisi pelanggan); diberi awalan ' supaya tetap teks
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_chunks(rows, rows_per_chunk=500):
+    """Generator potongan CSV (str); beberapa ratus baris per potong"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+
+    buffer = []
+    for row in rows:
+        buffer.append(writer.writerow([_csv_value(value) for value in row]))
+        if len(buffer) >= rows_per_chunk:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+class _ParquetSink:
+    """Output pyarrow yang menampung byte sampai diambil oleh generator"""
+
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+        self.position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _parquet_schema(pa):
+    tz = settings.TIME_ZONE
+    money = pa.decimal128(14, 2)
+    types = {
+        'created_at': pa.timestamp('us', tz=tz),
+        'paid_at': pa.timestamp('us', tz=tz),
+        'order_total': money,
+        'product_id': pa.int64(),
+        'quantity': pa.int64(),
+        'price': money,
+        'subtotal': money,
+    }
+    return pa.schema([(name, types.get(name, pa.string())) for name, _ in EXPORT_COLUMNS])
+
+
+def parquet_chunks(rows, rows_per_group=None):
+    """
+    Generator potongan file Parquet (bytes), satu row group per
+    rows_per_group baris, jadi memori tetap walau jumlah barisnya jutaan.
+    Butuh pyarrow (opsional, tidak ada di requirements.txt); dicek di sini,
+    sebelum response mulai dikirim.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportError('Export Parquet membutuhkan pyarrow (pip install pyarrow)')
+    return _parquet_stream(pa, pq, rows, rows_per_group or settings.EXPORT_CHUNK_SIZE)
+
+
+def _parquet_stream(pa, pq, rows, rows_per_group):
+    schema = _parquet_schema(pa)
+    sink = _ParquetSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+
+    def write(batch):
+        columns = list(zip(*batch))
+        writer.write_batch(pa.record_batch(
+            [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema,
+        ))
+        return sink.drain()
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= rows_per_group:
+            yield write(batch)
+            batch = []
+    if batch:
+        yield write(batch)
+    writer.close()
+    yield sink.drain()
+
+
+def export_chunks(lines, export_format):
+    """Generator potongan file untuk format 'csv' (str) atau 'parquet' (bytes)"""
+    rows = iter_lines(lines)
+    if export_format == 'parquet':
+        return parquet_chunks(rows)
+    return csv_chunks(rows)
+
+
+def streaming_export(request, lines, export_format):
+    """StreamingHttpResponse download: baris dikirim sambil dibaca dari database"""
+    content_type, extension = EXPORT_FORMATS[export_format]
+    chunks = streaming_content(request, export_chunks(lines, export_format))
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    filename = f'orders-{timezone.localtime():%Y%m%d-%H%M}.{extension}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,83 @@
+import threading
+import time
+import uuid
+
+import midtransclient
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+
+
+class _TimeoutHTTPAdapter(HTTPAdapter):
+    """midtransclient tidak pernah mengirim timeout; pasang default di sini"""
+
+    def __init__(self, timeout, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
+
+
+class MidtransGateway:
+    """
+    Midtrans Snap dengan satu requests.Session per proses, supaya koneksi
+    TLS ke Midtrans dipakai ulang antar transaksi (bukan handshake baru
+    setiap checkout).
+    """
+
+    def __init__(self):
+        self.snap = midtransclient.Snap(
+            is_production=settings.MIDTRANS_IS_PRODUCTION,
+            server_key=settings.MIDTRANS_SERVER_KEY,
+            client_key=settings.MIDTRANS_CLIENT_KEY
+        )
+        session = requests.Session()
+        session.mount('https://', _TimeoutHTTPAdapter(
+            timeout=settings.MIDTRANS_TIMEOUT,
+            pool_connections=1,
+            pool_maxsize=settings.BACKGROUND_THREADS,
+        ))
+        self.snap.http_client.http_client = session
+
+    def create_transaction(self, param):
+        return self.snap.create_transaction(param)
+
+
+class StubGateway:
+    """
+    Pengganti Midtrans untuk test dan load test: tidak ada request keluar.
+    Latency bisa disimulasikan lewat PAYMENT_STUB_LATENCY_MS.
+    """
+
+    def create_transaction(self, param):
+        if settings.PAYMENT_STUB_LATENCY_MS:
+            time.sleep(settings.PAYMENT_STUB_LATENCY_MS / 1000)
+        order_id = param['transaction_details']['order_id']
+        return {
+            'token': f'stub-{uuid.uuid4().hex}',
+            'redirect_url': f'https://stub.midtrans.local/snap/v2/vtweb/{order_id}',
+        }
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    """Instance gateway (PAYMENT_GATEWAY) yang dipakai bersama dalam satu proses"""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = import_string(settings.PAYMENT_GATEWAY)()
+    return _gateway
+
+
+def reset_gateway():
+    """Dipakai saat setting PAYMENT_GATEWAY diganti (mis. di test)"""
+    global _gateway
+    _gateway = None
@@ -0,0 +1,163 @@
+import hashlib
+import io
+import posixpath
+import re
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.templatetags.static import static
+from PIL import Image, ImageOps, features
+
+from .models import Product
+
+
+FALLBACK_IMAGE = 'blog/Pict/logo.png'
+
+HASHED_STEM = re.compile(r'\.[0-9a-f]{12}$')
+
+# (format Pillow, ekstensi, mime type), urut dari yang paling kecil ukurannya
+IMAGE_FORMATS = [
+    ('AVIF', 'avif', 'image/avif'),
+    ('WEBP', 'webp', 'image/webp'),
+    ('JPEG', 'jpg', 'image/jpeg'),
+]
+
+
+def available_formats():
+    """AVIF hanya dibuat kalau Pillow di server mendukungnya"""
+    return [fmt for fmt in IMAGE_FORMATS if fmt[0] != 'AVIF' or features.check('avif')]
+
+
+def derivative_name(original_name, digest, width, ext):
+    """products/gelang.<hash>.jpg -> products/gelang.<hash>.320w.webp (di folder yang sama)"""
+    directory, filename = posixpath.split(original_name)
+    # Hash isi dari HashedMediaStorage tidak perlu diulang di nama turunan
+    stem = HASHED_STEM.sub('', posixpath.splitext(filename)[0])
+    return posixpath.join(directory, f'{stem}.{digest}.{width}w.{ext}')
+
+
+def _encode(image, pil_format):
+    quality = settings.PRODUCT_IMAGE_QUALITY
+    if pil_format == 'JPEG':
+        if image.mode != 'RGB':
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A') if 'A' in image.getbands() else None)
+            image = background
+        options = {'quality': quality, 'optimize': True, 'progressive': True}
+    elif pil_format == 'WEBP':
+        options = {'quality': quality, 'method': 4}
+    else:
+        options = {'quality': quality}
+
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def generate_derivatives(image_file):
+    """
+    Buat turunan gambar untuk setiap lebar di PRODUCT_IMAGE_WIDTHS dan setiap format.
+
+    Nama file memakai hash isi gambar asli, jadi upload ulang gambar yang sama
+    tidak membuat file baru dan URL yang sudah di-cache browser tetap valid.
+    Return manifest yang disimpan di Product.image_variants.
+    """
+    image_file.open('rb')
+    try:
+        data = image_file.read()
+    finally:
+        image_file.close()
+    # Kualitas ikut di-hash: setting baru menghasilkan nama (dan URL) baru
+    digest = hashlib.sha256(data + f'q{settings.PRODUCT_IMAGE_QUALITY}'.encode()).hexdigest()[:12]
+
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+
+    # Lebar lebih besar dari aslinya tidak dibuat (tidak ada upscaling)
+    widths = sorted({min(width, image.width) for width in settings.PRODUCT_IMAGE_WIDTHS}, reverse=True)
+
+    formats = {ext: {} for _, ext, _ in available_formats()}
+    resized = image
+    for width in widths:
+        # Resize bertahap dari turunan yang lebih besar (lebih cepat dari aslinya)
+        height = max(1, round(image.height * width / image.width))
+        resized = resized.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+        for pil_format, ext, _ in available_formats():
+            name = derivative_name(image_file.name, digest, width, ext)
+            if not default_storage.exists(name):
+                name = default_storage.save(name, ContentFile(_encode(resized, pil_format)))
+            formats[ext][str(width)] = name
+
+    return {
+        'source': image_file.name,
+        'hash': digest,
+        'width': image.width,
+        'height': image.height,
+        'formats': formats,
+    }
+
+
+def refresh_product_images(product_id, force=False):
+    """
+    Buat ulang turunan gambar satu produk kalau gambarnya berubah (atau force).
+
+    Disimpan dengan save(update_fields=...) supaya signal post_save ikut
+    membuang cache katalog dan tabel harga yang memuat URL gambar lama.
+    """
+    product = Product.objects.filter(pk=product_id).first()
+    if product is None:
+        return None
+
+    if not product.image:
+        variants = {}
+    elif force or product.image_variants.get('source') != product.image.name:
+        variants = generate_derivatives(product.image)
+    else:
+        return product.image_variants
+
+    if variants != product.image_variants:
+        product.image_variants = variants
+        product.save(update_fields=['image_variants'])
+    return variants
+
+
+def _variant_urls(variants, ext):
+    return sorted(
+        ((int(width), default_storage.url(name)) for width, name in variants.get('formats', {}).get(ext, {}).items()),
+    )
+
+
+def image_srcset(variants, ext='jpg'):
+    """'url 160w, url 320w, ...' untuk atribut srcset; '' kalau belum ada turunan"""
+    return ', '.join(f'{url} {width}w' for width, url in _variant_urls(variants, ext))
+
+
+def image_sources(variants):
+    """[(mime type, srcset), ...] untuk <source> di dalam <picture>, urut AVIF -> WebP"""
+    sources = []
+    for _, ext, mime in IMAGE_FORMATS:
+        if ext == 'jpg':
+            continue
+        srcset = image_srcset(variants, ext)
+        if srcset:
+            sources.append((mime, srcset))
+    return sources
+
+
+def product_image_url(product, width=None):
+    """
+    URL gambar produk. Dengan width: JPEG turunan terkecil yang >= width
+    (atau yang terbesar); tanpa turunan: gambar asli, lalu logo.
+    """
+    if not product.image:
+        return static(FALLBACK_IMAGE)
+
+    variants = product.image_variants or {}
+    urls = _variant_urls(variants, 'jpg') if variants.get('source') == product.image.name else []
+    if urls and width:
+        return next((url for variant_width, url in urls if variant_width >= width), urls[-1][1])
+    if urls:
+        return urls[-1][1]
+    return product.image.url
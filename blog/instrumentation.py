@@ -0,0 +1,334 @@
+import json
+import logging
+import queue
+import random
+import socket
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+logger = logging.getLogger('blog.request')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+# ========================================
+# METRICS (Prometheus text / statsd)
+# ========================================
+
+class Metrics:
+    """
+    Counter dan histogram di memori proses, dirender sebagai Prometheus text.
+    Tiap worker gunicorn punya registry sendiri; untuk angka gabungan semua
+    worker pakai statsd (METRICS_STATSD_ADDR).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets=DURATION_BUCKETS):
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [buckets, [0] * len(buckets), 0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[1][i] += 1
+            histogram[2] += value
+            histogram[3] += 1
+
+    def render(self):
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (h[0], list(h[1]), h[2], h[3])) for key, h in self._histograms.items())
+
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f'# TYPE {name} counter')
+            lines.append(f'{name}{_labels(labels)} {value}')
+        for (name, labels), (buckets, counts, total, count) in histograms:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f'# TYPE {name} histogram')
+            for bound, bucket_count in zip(buckets, counts):
+                lines.append(f'{name}_bucket{_labels(labels + (("le", str(bound)),))} {bucket_count}')
+            lines.append(f'{name}_bucket{_labels(labels + (("le", "+Inf"),))} {count}')
+            lines.append(f'{name}_sum{_labels(labels)} {total:.6f}')
+            lines.append(f'{name}_count{_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for key, value in labels
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+metrics = Metrics()
+_statsd = None
+
+
+def _send_statsd(name, labels, value, kind):
+    """Kirim ke statsd lewat UDP (fire-and-forget, tidak pernah memblokir request)"""
+    global _statsd
+    if not settings.METRICS_STATSD_ADDR:
+        return
+    if _statsd is None:
+        host, _, port = settings.METRICS_STATSD_ADDR.rpartition(':')
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        _statsd = (sock, (host or '127.0.0.1', int(port)))
+    sock, address = _statsd
+    path = '.'.join([name] + [str(value).replace('.', '_').replace(':', '_') for _, value in labels])
+    try:
+        sock.sendto(f'blog.{path}:{value}|{kind}'.encode(), address)
+    except OSError:
+        pass
+
+
+def count(name, value=1, **labels):
+    labels = tuple(sorted(labels.items()))
+    metrics.inc(name, labels, value)
+    _send_statsd(name, labels, value, 'c')
+
+
+def observe(name, seconds, **labels):
+    labels = tuple(sorted(labels.items()))
+    metrics.observe(name, labels, seconds)
+    _send_statsd(name, labels, round(seconds * 1000, 3), 'ms')
+
+
+# ========================================
+# TIMING PER REQUEST
+# ========================================
+
+class RequestTimings:
+    __slots__ = ('db_queries', 'db_seconds', 'template_seconds', 'external_seconds', 'total_seconds')
+
+    def __init__(self):
+        self.total_seconds = 0.0
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.external_seconds = 0.0
+
+
+# Timing request yang sedang berjalan; None di thread pool / worker
+_timings = ContextVar('request_timings', default=None)
+
+
+@contextmanager
+def external_call(service):
+    """Ukur panggilan ke layanan luar (Midtrans, SMTP)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        observe('external_call_duration_seconds', elapsed, service=service)
+        timings = _timings.get()
+        if timings is not None:
+            timings.external_seconds += elapsed
+
+
+def _db_timer(execute, sql, params, many, context):
+    timings = _timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db_queries += 1
+        timings.db_seconds += time.perf_counter() - start
+
+
+def _install_db_timer(connection, **kwargs):
+    if _db_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_db_timer)
+
+
+def _instrument_database():
+    """
+    Pasang _db_timer permanen di setiap koneksi DB. Koneksi Django per thread
+    (di ASGI, view sync dan ORM async jalan di thread lain dari middleware),
+    jadi request yang sedang diukur dicari lewat ContextVar, bukan dipasang
+    per request di koneksi milik thread middleware.
+    """
+    connection_created.connect(_install_db_timer, dispatch_uid='blog.instrumentation.db_timer')
+    for connection in connections.all(initialized_only=True):
+        _install_db_timer(connection)
+
+
+def _instrument_templates():
+    """
+    Bungkus Template.render backend Django (render(), render_to_string) sekali
+    per proses. {% include %} dirender di dalamnya, jadi tidak terhitung dua kali.
+    """
+    from django.template.backends.django import Template
+
+    original = Template.render
+    if getattr(original, 'instrumented', False):
+        return
+
+    def render(self, context=None, request=None):
+        timings = _timings.get()
+        if timings is None:
+            return original(self, context, request)
+        start = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            timings.template_seconds += time.perf_counter() - start
+
+    render.instrumented = True
+    Template.render = render
+
+
+@contextmanager
+def _measure():
+    timings = RequestTimings()
+    token = _timings.set(timings)
+    start = time.perf_counter()
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+        timings.total_seconds = time.perf_counter() - start
+
+
+def _view_name(request):
+    # Nama view (bukan path) supaya label metrics tidak meledak jumlahnya
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unresolved'
+
+
+class RequestMetricsMiddleware:
+    """
+    Durasi tiap request, jumlah dan waktu query DB, waktu render template dan
+    panggilan keluar: dicatat ke metrics (/metrics), dikirim sebagai header
+    Server-Timing, dan di-log sebagai JSON untuk sebagian request
+    (REQUEST_LOG_SAMPLE_RATE; request lambat dan 5xx selalu di-log).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        _instrument_database()
+        _instrument_templates()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with _measure() as timings:
+            response = self.get_response(request)
+        return self._record(request, response, timings)
+
+    async def __acall__(self, request):
+        # ASGI: ORM dan template berjalan di thread lain, tapi ContextVar
+        # _timings ikut terbawa ke sana, jadi tetap terhitung
+        with _measure() as timings:
+            response = await self.get_response(request)
+        return self._record(request, response, timings)
+
+    def _record(self, request, response, timings):
+        duration = timings.total_seconds
+        view = _view_name(request)
+        count('http_requests_total', view=view, method=request.method, status=response.status_code)
+        observe('http_request_duration_seconds', duration, view=view)
+        observe('http_request_db_seconds', timings.db_seconds, view=view)
+        observe('http_request_template_seconds', timings.template_seconds, view=view)
+        observe('http_request_external_seconds', timings.external_seconds, view=view)
+        count('http_request_db_queries_total', timings.db_queries, view=view)
+
+        if settings.METRICS_SERVER_TIMING:
+            response['Server-Timing'] = (
+                f'db;dur={timings.db_seconds * 1000:.1f};desc="{timings.db_queries} queries", '
+                f'tpl;dur={timings.template_seconds * 1000:.1f}, '
+                f'ext;dur={timings.external_seconds * 1000:.1f}, '
+                f'total;dur={duration * 1000:.1f}'
+            )
+
+        slow = duration * 1000 >= settings.REQUEST_LOG_SLOW_MS
+        if slow or response.status_code >= 500 or random.random() < settings.REQUEST_LOG_SAMPLE_RATE:
+            logger.log(logging.WARNING if slow or response.status_code >= 500 else logging.INFO, 'request', extra={
+                'fields': {
+                    'view': view,
+                    'method': request.method,
+                    'status': response.status_code,
+                    'duration_ms': round(duration * 1000, 1),
+                    'db_queries': timings.db_queries,
+                    'db_ms': round(timings.db_seconds * 1000, 1),
+                    'template_ms': round(timings.template_seconds * 1000, 1),
+                    'external_ms': round(timings.external_seconds * 1000, 1),
+                },
+            })
+        return response
+
+
+# ========================================
+# LOGGING
+# ========================================
+
+class JsonFormatter(logging.Formatter):
+    """Satu baris JSON per log; field tambahan lewat extra={'fields': {...}}"""
+
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': record.getMessage(),
+        }
+        data.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+class BackgroundStreamHandler(QueueHandler):
+    """
+    Log diformat di thread pemanggil, ditulis ke stderr oleh thread terpisah.
+    close() (dipanggil logging.shutdown saat proses selesai) menulis sisa
+    antrian lalu menunggu thread penulis berhenti.
+    """
+
+    def __init__(self):
+        super().__init__(queue.SimpleQueue())
+        self.listener = QueueListener(self.queue, logging.StreamHandler(sys.stderr))
+        self.listener.start()
+
+    def close(self):
+        with self.lock:
+            listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.stop()
+        super().close()
@@ -0,0 +1,158 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import IntegrityError, transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .instrumentation import external_call
+from .models import Order, OutgoingEmail
+from .tasks import run_after_commit
+
+
+# Email berisi token sekali pakai (link reset password): body dihapus dari
+# outbox begitu terkirim atau gagal permanen, dan tidak ditampilkan di admin
+SENSITIVE_KINDS = {'password_reset'}
+REDACTED_BODY = '[dihapus: berisi link reset password]'
+
+
+def enqueue_email(kind, to, subject, body, dedupe_key=None):
+    """
+    Simpan email ke outbox (ikut transaksi yang sedang berjalan) dan jadwalkan
+    pengirimannya setelah commit. Return OutgoingEmail, atau None kalau
+    dedupe_key sudah pernah masuk antrian.
+    """
+    try:
+        with transaction.atomic():
+            email = OutgoingEmail.objects.create(
+                kind=kind, to=to, subject=subject[:255], body=body, dedupe_key=dedupe_key,
+            )
+    except IntegrityError:
+        return None
+
+    run_after_commit(settings.EMAIL_DISPATCH, send_emails, [email.pk])
+    return email
+
+
+def enqueue_password_reset(user, reset_link):
+    body = render_to_string('blog/email/password_reset.txt', {'user': user, 'reset_link': reset_link})
+    return enqueue_email('password_reset', user.email, 'Reset Password - Threeofkind.supply', body)
+
+
+def _order_email(kind, subject, order_id, template):
+    order = (
+        Order.objects.select_related('user')
+        .prefetch_related('items__product')
+        .filter(order_id=order_id).first()
+    )
+    # Order tamu tidak punya email
+    if order is None or order.user is None or not order.user.email:
+        return None
+    body = render_to_string(template, {'order': order, 'items': order.items.all()})
+    return enqueue_email(kind, order.user.email, subject, body, dedupe_key=f'{kind}:{order.order_id}')
+
+
+def enqueue_order_confirmation(order_id):
+    return _order_email(
+        'order_confirmation', f'Pesanan {order_id} diterima - Threeofkind.supply',
+        order_id, 'blog/email/order_confirmation.txt',
+    )
+
+
+def enqueue_payment_success(order_id):
+    return _order_email(
+        'payment_success', f'Pembayaran {order_id} berhasil - Threeofkind.supply',
+        order_id, 'blog/email/payment_success.txt',
+    )
+
+
+def retry_delay(attempts):
+    """Backoff eksponensial: EMAIL_RETRY_DELAY, 2x, 4x, ... maksimal 1 jam"""
+    return min(settings.EMAIL_RETRY_DELAY * 2 ** (attempts - 1), 3600)
+
+
+def claim(email_id, now):
+    """
+    Ambil hak kirim satu email: next_attempt_at dimajukan selama
+    EMAIL_SEND_LEASE detik dengan UPDATE bersyarat, jadi thread / worker lain
+    tidak mengirim email yang sama. Kalau proses mati di tengah jalan, email
+    otomatis bisa diambil lagi setelah lease habis.
+    """
+    return OutgoingEmail.objects.filter(pk=email_id, state='pending', next_attempt_at__lte=now).update(
+        next_attempt_at=now + timedelta(seconds=settings.EMAIL_SEND_LEASE),
+    ) == 1
+
+
+def send_emails(email_ids):
+    """
+    Kirim email dari outbox lewat satu koneksi SMTP yang dipakai ulang.
+    Email yang gagal dicoba lagi dengan backoff sampai EMAIL_MAX_ATTEMPTS.
+    Return jumlah email yang terkirim.
+    """
+    now = timezone.now()
+    claimed = [email_id for email_id in email_ids if claim(email_id, now)]
+    if not claimed:
+        return 0
+
+    sent = 0
+    connection = get_connection(fail_silently=False)
+    try:
+        for email in OutgoingEmail.objects.filter(pk__in=claimed).order_by('id'):
+            message = EmailMessage(
+                email.subject, email.body, settings.DEFAULT_FROM_EMAIL, [email.to], connection=connection,
+            )
+            try:
+                # open() tidak melakukan apa-apa kalau koneksi masih terbuka
+                with external_call('smtp'):
+                    connection.open()
+                    connection.send_messages([message])
+            except Exception as e:
+                _mark_failed(email, e)
+                # Koneksi mungkin sudah putus; dibuka lagi untuk email berikutnya
+                _close(connection)
+            else:
+                OutgoingEmail.objects.filter(pk=email.pk).update(
+                    state='sent', attempts=email.attempts + 1, error='', sent_at=timezone.now(), **_redacted(email),
+                )
+                sent += 1
+    finally:
+        _close(connection)
+    return sent
+
+
+def _mark_failed(email, error):
+    attempts = email.attempts + 1
+    final = attempts >= settings.EMAIL_MAX_ATTEMPTS
+    OutgoingEmail.objects.filter(pk=email.pk).update(
+        state='failed' if final else 'pending',
+        attempts=attempts,
+        error=str(error)[:255],
+        next_attempt_at=timezone.now() + timedelta(seconds=retry_delay(attempts)),
+        **(_redacted(email) if final else {}),
+    )
+
+
+def _redacted(email):
+    """Field update yang menghapus body email sensitif (tidak akan dikirim lagi)"""
+    return {'body': REDACTED_BODY} if email.kind in SENSITIVE_KINDS else {}
+
+
+def _close(connection):
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+def send_pending_emails(limit=50):
+    """
+    Satu putaran `manage.py send_queued_mail`: email yang sudah jatuh tempo
+    (baru, atau retry yang backoff-nya habis). Return (diproses, terkirim).
+    """
+    due = list(
+        OutgoingEmail.objects.filter(state='pending', next_attempt_at__lte=timezone.now())
+        .order_by('next_attempt_at', 'id')
+        .values_list('id', flat=True)[:limit]
+    )
+    return len(due), send_emails(due)
@@ -0,0 +1,91 @@
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from blog.checkout import place_order
+from blog.models import Order, OrderItem, Product
+
+
+def legacy_place_order(cart_data, **order_fields):
+    """Alur lama process_payment: get/create/save per item (untuk pembanding)"""
+    total = Decimal('0.00')
+    order_items_data = []
+    for product_id, item_data in cart_data.items():
+        product = Product.objects.get(id=product_id)
+        quantity = item_data.get('quantity', 1)
+        price = Decimal(str(item_data.get('price', product.price)))
+        total += price * quantity
+        order_items_data.append({'product': product, 'quantity': quantity, 'price': price})
+
+    order = Order.objects.create(total_amount=total + Decimal('10000'), status='pending', **order_fields)
+    for item_data in order_items_data:
+        OrderItem.objects.create(
+            order=order,
+            product=item_data['product'],
+            quantity=item_data['quantity'],
+            price=item_data['price']
+        )
+        product = item_data['product']
+        product.stock -= item_data['quantity']
+        product.save()
+    return order
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark checkout lama vs baru: jumlah query dan latency p50/p95 (data di-rollback)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=50, help='Jumlah item di cart')
+        parser.add_argument('--runs', type=int, default=30, help='Jumlah percobaan per implementasi')
+
+    def handle(self, *args, **options):
+        order_fields = {
+            'full_name': 'Bench', 'address': 'Jl. Bench', 'city': 'Jakarta',
+            'postal_code': '10000', 'phone': '0800', 'payment_method': 'qris',
+        }
+        implementations = [
+            ('legacy', lambda cart: legacy_place_order(cart, **order_fields)),
+            ('batched', lambda cart: place_order(cart, **order_fields)),
+        ]
+
+        # Semua data benchmark dibuat di dalam transaksi yang di-rollback
+        try:
+            with transaction.atomic():
+                products = Product.objects.bulk_create([
+                    Product(name=f'Bench {i}', price=Decimal('25000'), stock=10 ** 6)
+                    for i in range(options['lines'])
+                ])
+                cart = {str(p.id): {'quantity': 1, 'price': 25000} for p in products}
+
+                for name, run in implementations:
+                    self._bench(name, run, cart, options['runs'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _bench(self, name, run, cart, runs):
+        timings = []
+        queries = 0
+        for _ in range(runs):
+            sid = transaction.savepoint()
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                run(cart)
+                timings.append((time.perf_counter() - start) * 1000)
+            # Savepoint sendiri ikut tercatat; yang dihitung hanya query checkout
+            queries = len([q for q in ctx.captured_queries if 'SAVEPOINT' not in q['sql']])
+            transaction.savepoint_rollback(sid)
+
+        p95 = statistics.quantiles(timings, n=20)[18] if len(timings) > 1 else timings[0]
+        self.stdout.write(
+            f'{name:8s} lines={len(cart):<4d} queries={queries:<4d} '
+            f'p50={statistics.median(timings):.2f}ms p95={p95:.2f}ms'
+        )
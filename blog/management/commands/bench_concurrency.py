@@ -0,0 +1,140 @@
+import asyncio
+import statistics
+import time
+from decimal import Decimal
+from importlib import import_module
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from blog.models import Order, Payment
+from blog.orders import SESSION_ORDERS_KEY
+
+
+class Command(BaseCommand):
+    help = (
+        'Kapasitas request bersamaan server yang sedang berjalan (WSGI vs ASGI): '
+        'buka stream SSE status pembayaran, lalu ukur polling status selama stream terbuka'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Alamat server yang diuji')
+        parser.add_argument('--streams', type=int, default=200, help='Stream SSE yang dibuka bersamaan')
+        parser.add_argument('--polls', type=int, default=1000, help='Total request polling status')
+        parser.add_argument('--concurrency', type=int, default=50, help='Request polling bersamaan')
+        parser.add_argument('--timeout', type=float, default=10.0, help='Batas waktu per request (detik)')
+        parser.add_argument('--path', help='Path yang dipoll selain status pembayaran (mis. / untuk katalog)')
+
+    def handle(self, *args, **options):
+        # Order contoh di database yang sama dengan server; dihapus lagi di akhir
+        order = Order.objects.create(
+            full_name='Bench', address='Jl. Bench', city='Jakarta', postal_code='10000',
+            phone='0800', total_amount=Decimal('10000'), payment_method='qris',
+        )
+        Payment.objects.create(
+            order=order, payment_method='qris', transaction_id=order.order_id,
+            amount=order.total_amount, status='pending',
+        )
+        # Stream dan polling status hanya untuk session pembuat order
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_ORDERS_KEY] = [order.order_id]
+        session.create()
+        cookie = f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+        try:
+            asyncio.run(self._run(order.order_id, cookie, options))
+        finally:
+            session.delete()
+            order.delete()
+
+    async def _run(self, order_id, cookie, options):
+        target = urlsplit(options['url'])
+        stream_path = reverse('payment_status_stream', kwargs={'order_id': order_id})
+        poll_path = options['path'] or reverse('check_payment_status', kwargs={'order_id': order_id})
+        timeout = options['timeout']
+
+        streams = await asyncio.gather(*(
+            _open_stream(target, stream_path, cookie, timeout) for _ in range(options['streams'])
+        ))
+        opened = [s for s in streams if s[0] is not None]
+        first_event = sorted(s[1] for s in opened)
+        self.stdout.write(
+            f'stream    dibuka={len(opened)}/{options["streams"]} '
+            f'event pertama p50={_ms(_percentile(first_event, 50))} p95={_ms(_percentile(first_event, 95))}'
+        )
+
+        # Polling selama semua stream di atas masih terbuka
+        semaphore = asyncio.Semaphore(options['concurrency'])
+
+        async def poll():
+            async with semaphore:
+                return await _get(target, poll_path, cookie, timeout)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(poll() for _ in range(options['polls'])))
+        elapsed = time.perf_counter() - start
+        latencies = sorted(seconds for status, seconds in results if status == 200)
+        errors = len(results) - len(latencies)
+        self.stdout.write(
+            f'polling   {poll_path} ok={len(latencies)} gagal={errors} req/s={len(latencies) / elapsed:.0f} '
+            f'p50={_ms(_percentile(latencies, 50))} p95={_ms(_percentile(latencies, 95))} '
+            f'p99={_ms(_percentile(latencies, 99))}'
+        )
+
+        for writer, _ in opened:
+            writer.close()
+
+
+def _request(target, path, cookie):
+    return (
+        f'GET {path} HTTP/1.1\r\nHost: {target.hostname}\r\nCookie: {cookie}\r\n'
+        'Accept: */*\r\nConnection: close\r\n\r\n'
+    ).encode()
+
+
+async def _open_stream(target, path, cookie, timeout):
+    """(writer, detik sampai event status pertama), atau (None, None) kalau gagal"""
+    start = time.perf_counter()
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(target.hostname, target.port or 80), timeout
+        )
+        writer.write(_request(target, path, cookie))
+        while True:
+            line = await asyncio.wait_for(reader.readline(), timeout)
+            if not line:
+                writer.close()
+                return None, None
+            if line.startswith(b'event: status'):
+                return writer, time.perf_counter() - start
+    except (OSError, asyncio.TimeoutError):
+        return None, None
+
+
+async def _get(target, path, cookie, timeout):
+    """(status HTTP, detik), status 0 kalau koneksi gagal / timeout"""
+    start = time.perf_counter()
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(target.hostname, target.port or 80), timeout
+        )
+        writer.write(_request(target, path, cookie))
+        response = await asyncio.wait_for(reader.read(), timeout)
+        writer.close()
+        status = int(response.split(b' ', 2)[1]) if response.startswith(b'HTTP/') else 0
+    except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+        status = 0
+    return status, time.perf_counter() - start
+
+
+def _percentile(values, percent):
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[percent - 1]
+
+
+def _ms(seconds):
+    return '-' if seconds is None else f'{seconds * 1000:.1f}ms'
@@ -0,0 +1,68 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.models import Order
+from blog.order_ids import legacy_order_id, snowflake_order_id
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark insert ke unique index order_id: format lama (acak) vs snowflake (data di-rollback)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--existing', type=int, default=200000, help='Order yang sudah ada di tabel sebelum diukur')
+        parser.add_argument('--orders', type=int, default=20000, help='Order yang di-insert per percobaan')
+        parser.add_argument('--batch', type=int, default=1, help='Order per INSERT (1 = seperti checkout)')
+        parser.add_argument('--rounds', type=int, default=3, help='Percobaan per generator')
+
+    def handle(self, *args, **options):
+        generators = [('legacy', legacy_order_id), ('snowflake', snowflake_order_id)]
+
+        for name, generate in generators:
+            ids = {generate() for _ in range(options['orders'])}
+            self.stdout.write(f'{name:9s} id unik: {len(ids)}/{options["orders"]}')
+
+        # Semua data benchmark dibuat di dalam transaksi yang di-rollback
+        try:
+            with transaction.atomic():
+                for name, generate in generators:
+                    sid = transaction.savepoint()
+                    # Isi tabel dengan format yang sama, seperti database yang sudah berjalan lama
+                    self._insert(generate, options['existing'], 1000)
+                    rates = []
+                    collisions = 0
+                    for _ in range(options['rounds']):
+                        round_sid = transaction.savepoint()
+                        start = time.perf_counter()
+                        inserted = self._insert(generate, options['orders'], options['batch'])
+                        rates.append(options['orders'] / (time.perf_counter() - start))
+                        collisions += options['orders'] - inserted
+                        transaction.savepoint_rollback(round_sid)
+                    transaction.savepoint_rollback(sid)
+                    self.stdout.write(
+                        f'{name:9s} existing={options["existing"]} batch={options["batch"]} '
+                        f'insert/s best={max(rates):.0f} worst={min(rates):.0f} bentrok={collisions}'
+                    )
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _insert(self, generate, count, batch):
+        """Return jumlah baris yang masuk; order_id yang bentrok dilewati dan dihitung"""
+        # bulk_create tidak lewat Order.save(): order_id diisi di sini
+        before = Order.objects.count()
+        for offset in range(0, count, batch):
+            Order.objects.bulk_create([
+                Order(
+                    order_id=generate(), full_name='Bench', address='Jl. Bench', city='Jakarta',
+                    postal_code='10000', phone='0800', total_amount=Decimal('10000'),
+                )
+                for _ in range(min(batch, count - offset))
+            ], ignore_conflicts=True)
+        return Order.objects.count() - before
@@ -0,0 +1,98 @@
+import re
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from blog.accounts import EMAIL_INDEX_NAME, users_by_email
+from blog.models import DailySales, Order, Payment, PaymentNotification, Product, StockReservation
+from blog.orders import user_orders
+
+
+# Index yang disebut planner: SQLite "USING [COVERING] INDEX x", PostgreSQL
+# "Index [Only] Scan [Backward] using x" / "Bitmap Index Scan on x"
+INDEX_USED = re.compile(
+    r'USING (?:COVERING )?INDEX (\w+)|USING INTEGER PRIMARY KEY|'
+    r'Index (?:Only )?Scan (?:Backward )?using (\w+)|Bitmap Index Scan on (\w+)'
+)
+FULL_SCAN = re.compile(r'\bSCAN (\w+)$|Seq Scan on (\w+)', re.M)
+SORT = re.compile(r'USE TEMP B-TREE FOR ORDER BY|^\s*(?:->\s*)?(?:Incremental )?Sort\b', re.M)
+
+
+def hot_queries():
+    """(nama, queryset, index yang diharapkan atau None = index apa saja)"""
+    user = User(pk=1)
+    now = timezone.now()
+    return [
+        ('order_history', user_orders(user, 'all'), 'order_user_created_idx'),
+        ('order_history_status', user_orders(user, 'paid'), 'order_user_status_idx'),
+        ('order_by_code', Order.objects.filter(order_id='ORD-00000000-20260101'), None),
+        ('admin_orders', Order.objects.order_by('-created_at', '-pk')[:20], 'order_created_idx'),
+        ('admin_orders_status', Order.objects.filter(status='paid').order_by('-created_at', '-pk')[:20],
+         'order_status_created_idx'),
+        ('payment_status', Payment.objects.filter(status='pending').order_by('-pk')[:20], None),
+        ('expired_holds', Payment.objects.filter(status='pending', expired_at__lte=now).order_by('expired_at')[:200],
+         'payment_expiry_idx'),
+        ('user_by_email', users_by_email('someone@example.com'), EMAIL_INDEX_NAME),
+        ('notification_queue', PaymentNotification.objects.filter(state='pending').order_by('id')[:200],
+         'notification_queue_idx'),
+        ('held_reservations', StockReservation.objects.filter(order_id__in=[1], state='held'),
+         'reservation_order_state_idx'),
+        ('catalog_newest', Product.objects.order_by('-created_at', '-id')[:12], 'product_newest_idx'),
+        ('sales_dashboard', DailySales.objects.filter(date__gte=now.date() - timedelta(days=30)), None),
+    ]
+
+
+def explain(queryset):
+    """
+    Plan dari EXPLAIN. Di PostgreSQL seq scan dimatikan dulu: tabel kecil
+    (database dev / CI) selalu di-scan, yang dicek adalah index BISA dipakai.
+    """
+    if connection.vendor != 'postgresql':
+        return queryset.explain()
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+
+def inspect_plan(plan):
+    """(index yang dipakai, full scan?, sort tanpa index?)"""
+    indexes = [next(filter(None, match.groups()), 'rowid') for match in INDEX_USED.finditer(plan)]
+    return indexes, bool(FULL_SCAN.search(plan)), bool(SORT.search(plan))
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN query yang sering dipakai dan laporkan apakah planner memakai index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Tampilkan plan lengkap')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'[EXPLAIN] {connection.vendor}')
+        failed = []
+        for name, queryset, expected in hot_queries():
+            plan = explain(queryset)
+            indexes, full_scan, sort = inspect_plan(plan)
+
+            if not indexes or full_scan:
+                status, style = 'SCAN', self.style.ERROR
+                failed.append(name)
+            elif expected and expected not in indexes:
+                status, style = 'OTHER', self.style.WARNING
+            else:
+                status, style = 'OK', self.style.SUCCESS
+
+            note = ', '.join(indexes) or '-'
+            if expected and status != 'OK':
+                note += f' (diharapkan {expected})'
+            if sort:
+                note += ' +sort'
+            self.stdout.write(style(f'{status:<6}') + f' {name:<22} {note}')
+            if options['verbose_plans']:
+                self.stdout.write('    ' + plan.replace('\n', '\n    '))
+
+        if failed:
+            raise CommandError(f'Query tanpa index: {", ".join(failed)}')
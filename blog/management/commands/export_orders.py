@@ -0,0 +1,55 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.exports import EXPORT_FORMATS, ExportError, export_chunks, order_lines
+from blog.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Export order + item + pembayaran (satu baris per item) ke CSV atau Parquet, di-stream per chunk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Order dibuat sejak tanggal ini (YYYY-MM-DD)')
+        parser.add_argument('--until', help='Order dibuat sampai tanggal ini, inklusif (YYYY-MM-DD)')
+        parser.add_argument('--status', action='append', choices=[value for value, _ in Order.STATUS_CHOICES],
+                            help='Filter status order (boleh diulang)')
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', '-o', help='File tujuan (default stdout, hanya untuk CSV)')
+
+    def parse_date(self, value):
+        if not value:
+            return None
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f'Tanggal tidak valid: {value}')
+
+    def handle(self, *args, **options):
+        export_format = options['format']
+        if export_format == 'parquet' and not options['output']:
+            raise CommandError('Export Parquet butuh --output')
+
+        lines = order_lines(
+            since=self.parse_date(options['since']),
+            until=self.parse_date(options['until']),
+            statuses=options['status'],
+        )
+        try:
+            chunks = export_chunks(lines, export_format)
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+
+        if export_format == 'parquet':
+            f = open(options['output'], 'wb')
+        else:
+            f = open(options['output'], 'w', encoding='utf-8', newline='')
+        with f:
+            for chunk in chunks:
+                f.write(chunk)
+        self.stderr.write(f'[EXPORT] Selesai: {options["output"]}')
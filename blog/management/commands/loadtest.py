@@ -0,0 +1,367 @@
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from django.utils import timezone
+
+from blog.models import Order, Product
+from blog.webhooks import notification_signature
+
+
+LOADTEST_NAME = 'Loadtest'
+
+# Environment server yang dijalankan --serve: Midtrans stub, tanpa rate limit
+# (semua pembeli virtual datang dari satu IP), email tidak benar-benar dikirim,
+# dan jumlah query per request dikirim lewat header Server-Timing
+SERVE_ENV = {
+    'PAYMENT_GATEWAY': 'blog.gateway.StubGateway',
+    'RATE_LIMIT_ENABLED': 'False',
+    'METRICS_SERVER_TIMING': 'True',
+    'EMAIL_BACKEND': 'django.core.mail.backends.locmem.EmailBackend',
+    'REQUEST_LOG_SAMPLE_RATE': '0',
+}
+
+SERVER_TIMING_QUERIES = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+
+
+class Stats:
+    """Hasil per endpoint: (latency detik, berhasil, status HTTP, jumlah query)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.results = defaultdict(list)
+        self.flows = Counter()
+
+    def add(self, name, seconds, ok, status, queries):
+        with self.lock:
+            self.results[name].append((seconds, ok, status, queries))
+
+    def flow(self, failure):
+        """failure: None kalau alur selesai, atau langkah tempat alur berhenti"""
+        with self.lock:
+            self.flows[failure or 'completed'] += 1
+
+    def report(self, elapsed):
+        endpoints = {}
+        for name, results in sorted(self.results.items()):
+            latencies = sorted(seconds for seconds, ok, _, _ in results if ok)
+            errors = sum(1 for _, ok, _, _ in results if not ok)
+            queries = [count for _, ok, _, count in results if ok and count is not None]
+            endpoints[name] = {
+                'requests': len(results),
+                'errors': errors,
+                'error_rate': round(errors / len(results), 4),
+                'rps': round(len(latencies) / elapsed, 2),
+                'latency_ms': {
+                    label: _ms(_percentile(latencies, percent))
+                    for label, percent in (('p50', 50), ('p90', 90), ('p95', 95), ('p99', 99))
+                } | {'max': _ms(latencies[-1] if latencies else None)},
+                'db_queries': {
+                    'mean': round(statistics.mean(queries), 2),
+                    'max': max(queries),
+                } if queries else None,
+                'status': dict(sorted(Counter(str(status) for _, _, status, _ in results).items())),
+            }
+        return {
+            'flows': {
+                'completed': self.flows['completed'],
+                'failed': sum(self.flows.values()) - self.flows['completed'],
+                'per_second': round(self.flows['completed'] / elapsed, 2),
+                'failures': {step: count for step, count in sorted(self.flows.items()) if step != 'completed'},
+            },
+            'endpoints': endpoints,
+        }
+
+
+class Shopper:
+    """
+    Satu pembeli virtual (tamu, session sendiri): katalog -> cart -> checkout
+    -> polling status -> webhook Midtrans settlement -> polling sampai lunas.
+    """
+
+    def __init__(self, base_url, product_ids, stats, options):
+        self.base_url = base_url.rstrip('/')
+        self.product_ids = product_ids
+        self.stats = stats
+        self.polls = options['polls']
+        self.think = options['think']
+        self.timeout = options['timeout']
+        self.session = requests.Session()
+
+    def request(self, name, method, path, ok_statuses=(200,), **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.session.request(
+                method, self.base_url + path, timeout=self.timeout, allow_redirects=False, **kwargs
+            )
+        except requests.RequestException:
+            self.stats.add(name, time.perf_counter() - start, False, 'error', None)
+            return None
+        seconds = time.perf_counter() - start
+        match = SERVER_TIMING_QUERIES.search(response.headers.get('Server-Timing', ''))
+        ok = response.status_code in ok_statuses
+        self.stats.add(name, seconds, ok, response.status_code, int(match.group(1)) if match else None)
+        return response if ok else None
+
+    def pause(self):
+        if self.think:
+            time.sleep(random.uniform(0, self.think))
+
+    def run_flow(self):
+        """None kalau pembayaran sampai lunas, selain itu nama langkah yang gagal"""
+        sort = random.choice(['newest', 'price_asc', 'price_desc'])
+        self.request('catalog', 'GET', reverse('home'), params={'sort': sort, 'page': random.randint(1, 3)})
+        self.pause()
+
+        # Cookie csrftoken dari GET, lalu isi cart lewat API sync (seperti cart_sync.js)
+        if self.request('cart_get', 'GET', reverse('sync_cart')) is None:
+            return 'cart_get'
+        csrf = self.session.cookies.get('csrftoken', '')
+        picked = random.sample(self.product_ids, min(len(self.product_ids), random.randint(1, 3)))
+        changes = {str(product_id): random.randint(1, 2) for product_id in picked}
+        if self.request('cart_sync', 'POST', reverse('sync_cart'), json={'changes': changes},
+                        headers={'X-CSRFToken': csrf}) is None:
+            return 'cart_sync'
+        self.pause()
+
+        response = self.request('checkout', 'POST', reverse('process_payment'), ok_statuses=(302,), data={
+            'csrfmiddlewaretoken': csrf,
+            'full_name': LOADTEST_NAME,
+            'address': 'Jl. Loadtest 1',
+            'city': 'Jakarta',
+            'postal_code': '10000',
+            'phone': '0800000000',
+            'payment_method': 'qris',
+        })
+        if response is None:
+            return 'checkout'
+        order_id = response.headers['Location'].rstrip('/').rsplit('/', 1)[-1]
+
+        status_path = reverse('check_payment_status', kwargs={'order_id': order_id})
+        etag = None
+        for _ in range(self.polls):
+            self.pause()
+            response = self.request('status_poll', 'GET', status_path, ok_statuses=(200, 304),
+                                    headers={'If-None-Match': etag} if etag else {})
+            if response is not None:
+                etag = response.headers.get('ETag', etag)
+
+        if self.request('notification', 'POST', reverse('payment_notification'),
+                        json=settlement_notification(order_id)) is None:
+            return 'notification'
+
+        # Webhook diproses di background; tunggu sampai status terbaca lunas
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            response = self.request('status_poll', 'GET', status_path)
+            if response is not None and response.json().get('status') == 'success':
+                return None
+            time.sleep(0.2)
+        return 'payment_not_confirmed'
+
+
+def settlement_notification(order_id):
+    """Payload webhook Midtrans untuk QRIS yang lunas, dengan signature_key-nya"""
+    # Total dibaca dari database yang sama dengan server (--serve / server lokal)
+    amount = Order.objects.filter(order_id=order_id).values_list('total_amount', flat=True).first()
+    gross_amount = '%.2f' % (amount or 0)
+    status_code = '200'
+    return {
+        'order_id': order_id,
+        'transaction_id': str(uuid.uuid4()),
+        'transaction_status': 'settlement',
+        'fraud_status': 'accept',
+        'status_code': status_code,
+        'gross_amount': gross_amount,
+        'payment_type': 'qris',
+        'signature_key': notification_signature(order_id, status_code, gross_amount),
+        'transaction_time': timezone.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test alur belanja: katalog -> cart -> checkout -> polling status -> webhook. '
+        'Jalankan terhadap database khusus (order dan rollup penjualan ikut bertambah).'
+    )
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group()
+        target.add_argument('--url', help='Server yang sudah berjalan (harus memakai PAYMENT_GATEWAY stub)')
+        target.add_argument('--serve', choices=['asgi', 'wsgi', 'runserver'], default='asgi',
+                            help='Jalankan server sendiri dengan Midtrans stub (default: asgi, seperti Procfile)')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--workers', type=int, default=2, help='Worker gunicorn untuk --serve asgi/wsgi')
+        parser.add_argument('--server-log', help='Tulis output server --serve ke file ini')
+        parser.add_argument('--gateway-latency', type=int, default=50, help='Latency Midtrans stub (ms)')
+        parser.add_argument('--shoppers', type=int, default=10, help='Pembeli virtual bersamaan')
+        parser.add_argument('--duration', type=float, default=30, help='Lama test (detik)')
+        parser.add_argument('--iterations', type=int, help='Jumlah alur per pembeli (menggantikan --duration)')
+        parser.add_argument('--polls', type=int, default=3, help='Polling status sebelum webhook dikirim')
+        parser.add_argument('--think', type=float, default=0, help='Jeda acak maksimal antar langkah (detik)')
+        parser.add_argument('--timeout', type=float, default=10, help='Batas waktu per request (detik)')
+        parser.add_argument('--products', type=int, default=20, help='Produk loadtest yang disiapkan')
+        parser.add_argument('--json', dest='json_path', help='Tulis hasil sebagai JSON ke file ini')
+        parser.add_argument('--compare', help='JSON hasil run sebelumnya untuk dibandingkan')
+        parser.add_argument('--keep-data', action='store_true', help='Jangan hapus order loadtest setelah selesai')
+
+    def handle(self, *args, **options):
+        product_ids = self._prepare_products(options['products'])
+        server = None
+        base_url = options['url']
+        if not base_url:
+            server, base_url = self._start_server(options)
+
+        stats = Stats()
+        started_at = timezone.now()
+        start = time.perf_counter()
+        deadline = time.monotonic() + options['duration']
+        try:
+            def shop():
+                shopper = Shopper(base_url, product_ids, stats, options)
+                done = 0
+                while (done < options['iterations']) if options['iterations'] else (time.monotonic() < deadline):
+                    stats.flow(shopper.run_flow())
+                    done += 1
+
+            with ThreadPoolExecutor(max_workers=options['shoppers']) as executor:
+                for future in [executor.submit(shop) for _ in range(options['shoppers'])]:
+                    future.result()
+            elapsed = time.perf_counter() - start
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=10)
+            if not options['keep_data']:
+                Order.objects.filter(full_name=LOADTEST_NAME).delete()
+
+        result = {
+            'started_at': started_at.isoformat(),
+            'target': base_url,
+            'server': None if options['url'] else options['serve'],
+            'config': {
+                key: options[key] for key in (
+                    'shoppers', 'duration', 'iterations', 'polls', 'think', 'workers', 'gateway_latency', 'products',
+                )
+            },
+            'elapsed_s': round(elapsed, 2),
+            **stats.report(elapsed),
+        }
+        self._print(result)
+        if options['compare']:
+            with open(options['compare']) as f:
+                self._print_comparison(json.load(f), result)
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump(result, f, indent=2)
+            self.stdout.write(f'JSON: {options["json_path"]}')
+
+    def _prepare_products(self, count):
+        """Produk khusus loadtest dengan stok besar, dipakai ulang antar run"""
+        existing = list(
+            Product.objects.filter(name__startswith=f'{LOADTEST_NAME} #').order_by('id').values_list('id', flat=True)
+        )
+        for i in range(len(existing), count):
+            existing.append(Product.objects.create(
+                name=f'{LOADTEST_NAME} #{i + 1}', description='Produk untuk load test',
+                price=Decimal(random.choice([25000, 50000, 99000, 150000])), stock=10 ** 6,
+            ).pk)
+        Product.objects.filter(pk__in=existing).update(stock=10 ** 6)
+        return existing[:count]
+
+    def _start_server(self, options):
+        address = f'127.0.0.1:{options["port"]}'
+        if options['serve'] == 'asgi':
+            command = ['-m', 'gunicorn', 'config.asgi:application', '-k', 'uvicorn_worker.UvicornWorker']
+        elif options['serve'] == 'wsgi':
+            command = ['-m', 'gunicorn', 'config.wsgi:application']
+        else:
+            command = [str(settings.BASE_DIR / 'manage.py'), 'runserver', '--noreload', address]
+        if options['serve'] != 'runserver':
+            command += ['--workers', str(options['workers']), '--bind', address]
+
+        env = {**os.environ, **SERVE_ENV, 'PAYMENT_STUB_LATENCY_MS': str(options['gateway_latency'])}
+        log = open(options['server_log'], 'w') if options['server_log'] else subprocess.DEVNULL
+        server = subprocess.Popen([sys.executable] + command, cwd=settings.BASE_DIR, env=env,
+                                  stdout=log, stderr=subprocess.STDOUT)
+        base_url = f'http://{address}'
+
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'Server {options["serve"]} berhenti saat start (exit {server.returncode})')
+            try:
+                if requests.get(base_url + reverse('sync_cart'), timeout=1).status_code == 200:
+                    return server, base_url
+            except requests.RequestException:
+                pass
+            time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f'Server {options["serve"]} tidak merespons di {base_url}')
+
+    def _print(self, result):
+        flows = result['flows']
+        self.stdout.write(
+            f'{result["server"] or result["target"]}: {result["config"]["shoppers"]} pembeli, '
+            f'{result["elapsed_s"]}s, alur selesai={flows["completed"]} gagal={flows["failed"]} '
+            f'({flows["per_second"]}/s)'
+        )
+        if flows['failures']:
+            self.stdout.write('gagal di: ' + ', '.join(f'{step}={count}' for step, count in flows['failures'].items()))
+        self.stdout.write(f'{"endpoint":13s} {"req":>6s} {"err%":>6s} {"req/s":>7s} '
+                          f'{"p50":>8s} {"p95":>8s} {"p99":>8s} {"query":>6s}')
+        for name, data in result['endpoints'].items():
+            latency = data['latency_ms']
+            queries = data['db_queries']['mean'] if data['db_queries'] else '-'
+            self.stdout.write(
+                f'{name:13s} {data["requests"]:6d} {data["error_rate"] * 100:6.1f} {data["rps"]:7.1f} '
+                f'{_fmt(latency["p50"]):>8s} {_fmt(latency["p95"]):>8s} {_fmt(latency["p99"]):>8s} {queries!s:>6s}'
+            )
+
+    def _print_comparison(self, before, after):
+        self.stdout.write(f'Dibanding {before["started_at"]}:')
+        for name, data in after['endpoints'].items():
+            old = before['endpoints'].get(name)
+            if old is None:
+                continue
+            self.stdout.write(
+                f'{name:13s} req/s {_change(old["rps"], data["rps"])} '
+                f'p95 {_change(old["latency_ms"]["p95"], data["latency_ms"]["p95"])} '
+                f'err% {old["error_rate"] * 100:.1f} -> {data["error_rate"] * 100:.1f}'
+            )
+
+
+def _percentile(values, percent):
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[percent - 1]
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def _fmt(ms):
+    return '-' if ms is None else f'{ms:.1f}ms'
+
+
+def _change(old, new):
+    if not old or new is None:
+        return f'{old} -> {new}'
+    return f'{old} -> {new} ({(new - old) / old * 100:+.0f}%)'
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.webhooks import process_pending_notifications
+
+
+class Command(BaseCommand):
+    help = 'Worker pemroses antrian notifikasi pembayaran Midtrans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Proses satu putaran lalu keluar')
+        parser.add_argument('--interval', type=float, default=1.0, help='Jeda antar putaran (detik)')
+        parser.add_argument('--batch', type=int, default=200, help='Maksimal notifikasi per putaran')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_pending_notifications(limit=options['batch'])
+            if processed:
+                self.stdout.write(f'[NOTIFICATIONS] {processed} notifikasi diproses')
+            if options['once']:
+                return
+            if processed < options['batch']:
+                time.sleep(options['interval'])
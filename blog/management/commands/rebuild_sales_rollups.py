@@ -0,0 +1,48 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from blog.analytics import rebuild_rollups
+from blog.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Backfill: hitung ulang tabel rollup analitik penjualan per potongan beberapa hari'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Tanggal awal (YYYY-MM-DD), default order pertama')
+        parser.add_argument('--until', help='Tanggal akhir inklusif (YYYY-MM-DD), default hari ini')
+        parser.add_argument('--chunk-days', type=int, default=31, help='Jumlah hari per transaksi')
+
+    def parse_date(self, value):
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f'Tanggal tidak valid: {value}')
+
+    def handle(self, *args, **options):
+        if options['since']:
+            start = self.parse_date(options['since'])
+        else:
+            first = Order.objects.aggregate(first=Min('created_at'))['first']
+            if first is None:
+                self.stdout.write('[ROLLUP] Belum ada order')
+                return
+            start = timezone.localdate(first)
+        until = self.parse_date(options['until']) if options['until'] else timezone.localdate()
+        if options['chunk_days'] < 1:
+            raise CommandError('--chunk-days minimal 1')
+
+        total = 0
+        chunk = timedelta(days=options['chunk_days'])
+        end = until + timedelta(days=1)
+        while start < end:
+            stop = min(start + chunk, end)
+            counted = rebuild_rollups(start, stop)
+            total += counted
+            self.stdout.write(f'[ROLLUP] {start} - {stop - timedelta(days=1)}: {counted} order')
+            start = stop
+
+        self.stdout.write(self.style.SUCCESS(f'[ROLLUP] Selesai, {total} order dihitung'))
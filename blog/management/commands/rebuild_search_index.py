@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.search import index_products, search_backend
+
+
+class Command(BaseCommand):
+    help = 'Bangun ulang index pencarian produk (setelah import / bulk_create yang melewati signal)'
+
+    def handle(self, *args, **options):
+        backend = search_backend()
+        if backend is None:
+            self.stdout.write('[SEARCH] Database ini memakai fallback icontains, tidak ada index')
+            return
+        with transaction.atomic():
+            index_products()
+        self.stdout.write(self.style.SUCCESS(f'[SEARCH] Index {backend} dibangun ulang'))
@@ -0,0 +1,58 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from blog.images import refresh_product_images
+from blog.models import Product
+
+
+def _regenerate(product_id, force):
+    """Dijalankan di proses worker: resize/encode gambar tidak terhalang GIL"""
+    close_old_connections()
+    try:
+        variants = refresh_product_images(product_id, force=force)
+        return product_id, sum(len(widths) for widths in (variants or {}).get('formats', {}).values())
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = 'Buat ulang turunan gambar (WebP/AVIF/JPEG) semua produk secara paralel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Jumlah proses worker')
+        parser.add_argument('--force', action='store_true', help='Buat ulang walaupun gambar tidak berubah')
+        parser.add_argument('--product', type=int, action='append', help='Hanya produk ini (boleh diulang)')
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').exclude(image__isnull=True)
+        if options['product']:
+            products = products.filter(id__in=options['product'])
+        product_ids = list(products.order_by('id').values_list('id', flat=True))
+        if not product_ids:
+            self.stdout.write('Tidak ada produk dengan gambar')
+            return
+
+        # Koneksi DB tidak boleh dipakai bersama oleh proses hasil fork
+        connections.close_all()
+
+        started = time.perf_counter()
+        files = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            futures = [pool.submit(_regenerate, product_id, options['force']) for product_id in product_ids]
+            for future in as_completed(futures):
+                try:
+                    product_id, count = future.result()
+                except Exception as e:
+                    self.stderr.write(f'[IMAGES] Gagal: {e}')
+                    continue
+                files += count
+                self.stdout.write(f'[IMAGES] Produk {product_id}: {count} turunan')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(product_ids)} produk, {files} file turunan, {elapsed:.1f}s dengan {options["workers"]} worker'
+        ))
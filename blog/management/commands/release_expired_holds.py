@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.reservations import release_expired_holds
+
+
+class Command(BaseCommand):
+    help = 'Sweeper: lepas hold stok order yang Payment.expired_at-nya sudah lewat'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Proses satu putaran lalu keluar')
+        parser.add_argument('--interval', type=float, default=30.0, help='Jeda antar putaran (detik)')
+        parser.add_argument('--batch', type=int, default=200, help='Maksimal order per putaran')
+
+    def handle(self, *args, **options):
+        while True:
+            released = release_expired_holds(limit=options['batch'])
+            if released:
+                self.stdout.write(f'[HOLDS] {released} order expired, stok dikembalikan')
+            if options['once']:
+                return
+            if released < options['batch']:
+                time.sleep(options['interval'])
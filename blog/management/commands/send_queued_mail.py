@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.mail import send_pending_emails
+
+
+class Command(BaseCommand):
+    help = 'Worker pengirim outbox email (satu koneksi SMTP per putaran)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Proses satu putaran lalu keluar')
+        parser.add_argument('--interval', type=float, default=5.0, help='Jeda antar putaran (detik)')
+        parser.add_argument('--batch', type=int, default=50, help='Maksimal email per putaran')
+
+    def handle(self, *args, **options):
+        while True:
+            processed, sent = send_pending_emails(limit=options['batch'])
+            if processed:
+                self.stdout.write(f'[MAIL] {sent}/{processed} email terkirim')
+            if options['once']:
+                return
+            if processed < options['batch']:
+                time.sleep(options['interval'])
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.payments import process_pending_tokens
+
+
+class Command(BaseCommand):
+    help = 'Worker pembuat Snap token Midtrans untuk payment yang masih menunggu token'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Proses satu putaran lalu keluar')
+        parser.add_argument('--interval', type=float, default=1.0, help='Jeda antar putaran (detik)')
+        parser.add_argument('--batch', type=int, default=50, help='Maksimal payment per putaran')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_pending_tokens(limit=options['batch'])
+            if processed:
+                self.stdout.write(f'[SNAP WORKER] {processed} payment diproses')
+            if options['once']:
+                return
+            if processed < options['batch']:
+                time.sleep(options['interval'])
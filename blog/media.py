@@ -0,0 +1,114 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .storage import is_hashed_name
+from .streaming import streaming_content
+
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+RANGE_CHUNK_SIZE = 64 * 1024
+
+_RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header, size):
+    """
+    Header Range -> (start, end) inklusif, atau None kalau diabaikan
+    (tidak ada / format lain / multi-range: dikirim file utuh).
+    Raise ValueError kalau range tidak bisa dipenuhi (416).
+    """
+    match = _RANGE_HEADER.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+
+    start, end = match.groups()
+    if start == '':
+        # bytes=-500 -> 500 byte terakhir
+        length = int(end)
+        if length == 0:
+            raise ValueError('range kosong')
+        return max(0, size - length), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError('range di luar ukuran file')
+    return start, end
+
+
+def _read_range(path, start, end):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def media_response(request, name):
+    """
+    Response untuk satu file di MEDIA_ROOT.
+
+    Nama yang sudah di-hash (blog/storage.py) dikirim dengan Cache-Control
+    immutable setahun; file lama tanpa hash hanya MEDIA_CACHE_MAX_AGE.
+    Mendukung ETag / If-None-Match (304), If-Range dan satu Range (206).
+    Di ASGI isi file dibaca per potong lewat async iterator (blog/streaming.py).
+    """
+    try:
+        path = default_storage.path(name)
+    except (SuspiciousFileOperation, NotImplementedError):
+        raise Http404('File tidak ditemukan')
+    try:
+        stat = os.stat(path)
+    except OSError:
+        raise Http404('File tidak ditemukan')
+    if not os.path.isfile(path):
+        raise Http404('File tidak ditemukan')
+
+    size = stat.st_size
+    etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+    last_modified = int(stat.st_mtime)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        byte_range = None
+        if request.headers.get('If-Range', etag) == etag:
+            try:
+                byte_range = parse_range(request.headers.get('Range'), size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+                return response
+
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if byte_range is None and not isinstance(request, ASGIRequest):
+            # WSGI: file dikirim lewat wsgi.file_wrapper (sendfile)
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+        else:
+            start, end = byte_range or (0, size - 1)
+            chunks = streaming_content(request, _read_range(path, start, end))
+            response = StreamingHttpResponse(chunks, status=206 if byte_range else 200, content_type=content_type)
+            response['Content-Length'] = str(end - start + 1)
+            if byte_range:
+                response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    if is_hashed_name(name):
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    else:
+        response['Cache-Control'] = f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+    return response
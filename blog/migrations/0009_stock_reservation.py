@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def hold_pending_orders(apps, schema_editor):
+    """Order pending yang sudah ada: stoknya sudah dikurangi, catat sebagai hold"""
+    OrderItem = apps.get_model('blog', 'OrderItem')
+    StockReservation = apps.get_model('blog', 'StockReservation')
+
+    items = OrderItem.objects.filter(order__status='pending').values_list('order_id', 'product_id', 'quantity')
+    StockReservation.objects.bulk_create(
+        [StockReservation(order_id=order_id, product_id=product_id, quantity=quantity)
+         for order_id, product_id, quantity in items.iterator()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_order_history_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('state', models.CharField(choices=[('held', 'Held'), ('committed', 'Committed'), ('released', 'Released')], default='held', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', 'expired_at'], name='payment_expiry_idx'),
+        ),
+        migrations.AddField(
+            model_name='stockreservation',
+            name='order',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='blog.order'),
+        ),
+        migrations.AddField(
+            model_name='stockreservation',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='blog.product'),
+        ),
+        migrations.AddIndex(
+            model_name='stockreservation',
+            index=models.Index(fields=['order', 'state'], name='reservation_order_state_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockreservation',
+            index=models.Index(fields=['product', 'state'], name='reservation_product_state_idx'),
+        ),
+        migrations.RunPython(hold_pending_orders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+INDEX_NAME = 'auth_user_email_ci_uniq'
+
+
+def check_duplicate_emails(apps, schema_editor):
+    """Index unik gagal dibuat kalau sudah ada email ganda: sebutkan akunnya"""
+    User = apps.get_model('auth', 'User')
+    duplicates = list(
+        User.objects.exclude(email='')
+        .annotate(email_key=Lower('email'))
+        .values('email_key')
+        .annotate(users=Count('id'))
+        .filter(users__gt=1)
+        .values_list('email_key', flat=True)[:20]
+    )
+    if duplicates:
+        raise RuntimeError(
+            'Email dipakai lebih dari satu akun (abaikan huruf besar/kecil), '
+            'gabungkan atau ubah dulu akun berikut: ' + ', '.join(duplicates)
+        )
+
+
+class Migration(migrations.Migration):
+    """
+    Unique index case-insensitive untuk auth_user.email. auth.User milik
+    Django, jadi index dibuat dengan SQL; ekspresinya harus sama dengan
+    blog.accounts.EmailKey. Email kosong (NULLIF -> NULL) boleh lebih dari satu.
+    """
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('blog', '0013_order_status_created_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        migrations.RunSQL(
+            f"CREATE UNIQUE INDEX {INDEX_NAME} ON auth_user (LOWER(NULLIF(email, '')))",
+            f"DROP INDEX {INDEX_NAME}",
+        ),
+    ]
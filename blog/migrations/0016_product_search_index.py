@@ -0,0 +1,51 @@
+from django.db import migrations
+
+
+TABLE = 'blog_product_search'
+
+SCHEMA = {
+    'sqlite': [
+        f"CREATE VIRTUAL TABLE {TABLE} USING fts5("
+        "name, category, description, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"INSERT INTO {TABLE} (rowid, name, category, description) "
+        "SELECT p.id, p.name, COALESCE(c.name, ''), p.description "
+        "FROM blog_product p LEFT JOIN blog_category c ON c.id = p.category_id",
+    ],
+    'postgresql': [
+        f"CREATE TABLE {TABLE} ("
+        "product_id integer PRIMARY KEY REFERENCES blog_product (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+        "document tsvector NOT NULL)",
+        f"CREATE INDEX {TABLE}_document_idx ON {TABLE} USING gin (document)",
+        f"INSERT INTO {TABLE} (product_id, document) "
+        "SELECT p.id, setweight(to_tsvector('simple', p.name), 'A') || "
+        "setweight(to_tsvector('simple', COALESCE(c.name, '')), 'B') || "
+        "setweight(to_tsvector('simple', p.description), 'C') "
+        "FROM blog_product p LEFT JOIN blog_category c ON c.id = p.category_id",
+    ],
+}
+
+
+def create_search_index(apps, schema_editor):
+    for sql in SCHEMA.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in SCHEMA:
+        schema_editor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+class Migration(migrations.Migration):
+    """
+    Index pencarian produk (blog/search.py): FTS5 di SQLite, tsvector + GIN
+    di PostgreSQL. Database lain tidak punya tabel ini dan memakai fallback
+    icontains.
+    """
+
+    dependencies = [
+        ('blog', '0015_outgoing_email'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
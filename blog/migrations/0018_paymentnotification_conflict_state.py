@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0017_wishlist'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='paymentnotification',
+            name='state',
+            field=models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('skipped', 'Skipped'), ('conflict', 'Conflict'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+    ]
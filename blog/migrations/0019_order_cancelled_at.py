@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:02
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_cancelled_at(apps, schema_editor):
+    """Order batal yang sudah ada: updated_at adalah perkiraan terbaik waktu batalnya"""
+    Order = apps.get_model('blog', 'Order')
+    Order.objects.filter(status='cancelled', cancelled_at__isnull=True).update(cancelled_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0018_paymentnotification_conflict_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='cancelled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_cancelled_at, migrations.RunPython.noop),
+    ]
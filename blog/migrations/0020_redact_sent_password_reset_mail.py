@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:20
+
+from django.db import migrations
+
+
+# Sama dengan blog.mail.SENSITIVE_KINDS / REDACTED_BODY pada saat migration ini dibuat
+SENSITIVE_KINDS = ['password_reset']
+REDACTED_BODY = '[dihapus: berisi link reset password]'
+
+
+def redact_finished_mail(apps, schema_editor):
+    """Link reset password di email yang sudah terkirim / gagal permanen"""
+    OutgoingEmail = apps.get_model('blog', 'OutgoingEmail')
+    OutgoingEmail.objects.filter(kind__in=SENSITIVE_KINDS, state__in=['sent', 'failed']).update(body=REDACTED_BODY)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0019_order_cancelled_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(redact_finished_mail, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,8 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
-import uuid
+
+from .order_ids import new_order_id
 
 
 class Category(models.Model):
@@ -30,9 +31,22 @@ class Product(models.Model):
     original_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     stock = models.IntegerField(default=0)
     image = models.ImageField(upload_to='products/', null=True, blank=True)
+    # Manifest turunan gambar (WebP/AVIF/JPEG per lebar), diisi blog/images.py
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    # Jumlah user yang menyimpan produk ini di wishlist; dijaga blog/wishlist.py
+    wishlist_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Dipakai listing katalog: filter kategori + urutan
+            models.Index(fields=['-created_at', '-id'], name='product_newest_idx'),
+            models.Index(fields=['price', 'id'], name='product_price_idx'),
+            models.Index(fields=['category', '-created_at', '-id'], name='product_cat_newest_idx'),
+            models.Index(fields=['category', 'price', 'id'], name='product_cat_price_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -43,6 +57,49 @@ class Product(models.Model):
         return 0
 
 
+class Cart(models.Model):
+    """Keranjang user yang login; keranjang tamu disimpan di session (blog/cart.py)"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='cart')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Cart {self.user}"
+
+
+class CartItem(models.Model):
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'product'], name='unique_cart_product'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity}x {self.product_id} - {self.cart}"
+
+
+class Wishlist(models.Model):
+    """Produk yang disimpan user (satu baris per user + produk)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='wishlist')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='wishlisted_by')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'product'], name='unique_wishlist_product'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='wishlist_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.product_id}"
+
+
 class Order(models.Model):
     """Model untuk pesanan"""
     STATUS_CHOICES = [
@@ -73,17 +130,40 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     paid_at = models.DateTimeField(null=True, blank=True)
+    # Tanggal rollup order batal (blog/analytics.py), tidak bergeser saat order diedit lagi
+    cancelled_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Riwayat pesanan user (keyset pagination pada created_at, id)
+            models.Index(fields=['user', 'status', '-created_at', '-id'], name='order_user_status_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='order_user_created_idx'),
+            # Changelist admin (urut terbaru, filter status) dan export
+            models.Index(fields=['-created_at', '-id'], name='order_created_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='order_status_created_idx'),
+        ]
 
     def __str__(self):
         return f"Order {self.order_id} - {self.full_name}"
 
+    ORDER_ID_ATTEMPTS = 3
+
     def save(self, *args, **kwargs):
-        if not self.order_id:
-            self.order_id = f"ORD-{uuid.uuid4().hex[:8].upper()}-{timezone.now().strftime('%Y%m%d')}"
-        super().save(*args, **kwargs)
+        if self.order_id:
+            return super().save(*args, **kwargs)
+
+        # order_id bentrok di unique index (node sama di dua proses, atau
+        # generator lama): ulangi dengan id baru di savepoint yang sama
+        for attempt in range(self.ORDER_ID_ATTEMPTS):
+            self.order_id = new_order_id()
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                if attempt + 1 == self.ORDER_ID_ATTEMPTS or not Order.objects.filter(order_id=self.order_id).exists():
+                    self.order_id = ''
+                    raise
     
     # 🆕 METHOD BARU - Hitung subtotal produk saja (tanpa ongkir)
     def get_items_total(self):
@@ -119,6 +199,13 @@ class Payment(models.Model):
         ('cancelled', 'Cancelled'),  # 🆕 TAMBAHAN - untuk support cancel order
     ]
 
+    TOKEN_STATUS = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+
     PAYMENT_METHOD_CHOICES = [
         ('credit_card', 'Credit Card'),
         ('qris', 'QRIS'),
@@ -133,7 +220,12 @@ class Payment(models.Model):
     transaction_id = models.CharField(max_length=255, unique=True, null=True, blank=True)
     snap_token = models.CharField(max_length=255, null=True, blank=True)
     redirect_url = models.URLField(null=True, blank=True)
-    
+
+    # Snap token dibuat di background (lihat blog/payments.py)
+    token_status = models.CharField(max_length=20, choices=TOKEN_STATUS, default='ready', db_index=True)
+    token_attempts = models.PositiveSmallIntegerField(default=0)
+    token_error = models.CharField(max_length=255, blank=True)
+
     # Data Payment
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=20, choices=PAYMENT_STATUS, default='pending')
@@ -148,5 +240,167 @@ class Payment(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     expired_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Dipakai sweeper `manage.py release_expired_holds`
+            models.Index(fields=['status', 'expired_at'], name='payment_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"Payment {self.transaction_id} - {self.order.order_id}"
+
+
+class StockReservation(models.Model):
+    """
+    Hold stok untuk satu item order (lihat blog/reservations.py).
+
+    Product.stock adalah stok yang masih tersedia: dikurangi saat hold dibuat
+    di checkout, dikembalikan saat hold dilepas (batal/expired). Hold yang
+    dibayar menjadi 'committed' tanpa mengubah stok lagi.
+    """
+    STATE_CHOICES = [
+        ('held', 'Held'),
+        ('committed', 'Committed'),
+        ('released', 'Released'),
+    ]
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    state = models.CharField(max_length=20, choices=STATE_CHOICES, default='held')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['order', 'state'], name='reservation_order_state_idx'),
+            models.Index(fields=['product', 'state'], name='reservation_product_state_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity}x {self.product_id} - Order {self.order_id} ({self.state})"
+
+
+class PaymentNotification(models.Model):
+    """Antrian notifikasi Midtrans (webhook) yang diproses di background"""
+    STATE_CHOICES = [
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('skipped', 'Skipped'),
+        # Pembayaran berhasil untuk order yang sudah dibatalkan: refund manual
+        ('conflict', 'Conflict'),
+        ('failed', 'Failed'),
+    ]
+
+    # Hash (order_id, transaction_id, transaction_status, fraud_status):
+    # notifikasi yang dikirim ulang Midtrans tidak tercatat dua kali
+    dedupe_key = models.CharField(max_length=64, unique=True)
+    order_id = models.CharField(max_length=100, db_index=True)
+    transaction_status = models.CharField(max_length=50)
+    fraud_status = models.CharField(max_length=50, blank=True)
+    payload = models.JSONField()
+
+    state = models.CharField(max_length=20, choices=STATE_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.CharField(max_length=255, blank=True)
+
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['state', 'id'], name='notification_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"Notification {self.order_id} - {self.transaction_status}"
+
+
+class OutgoingEmail(models.Model):
+    """Outbox email: view hanya menyimpan, pengiriman SMTP di background (blog/mail.py)"""
+    STATE_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    # Email yang sama (mis. "pembayaran berhasil" untuk satu order) tidak masuk dua kali
+    dedupe_key = models.CharField(max_length=100, unique=True, null=True, blank=True)
+    to = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+
+    state = models.CharField(max_length=20, choices=STATE_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.CharField(max_length=255, blank=True)
+    # Kapan boleh dikirim (lagi): backoff setelah gagal, atau lease saat sedang dikirim
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['state', 'next_attempt_at'], name='outgoing_email_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} -> {self.to}"
+
+
+class DailySales(models.Model):
+    """
+    Rollup penjualan per hari (lihat blog/analytics.py).
+
+    Ditambah saat order berpindah ke 'paid' / 'cancelled', jadi dashboard
+    tidak perlu GROUP BY atas seluruh Order/OrderItem.
+    """
+    date = models.DateField(unique=True)
+    orders_paid = models.PositiveIntegerField(default=0)
+    orders_cancelled = models.PositiveIntegerField(default=0)
+    items_sold = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = 'Analitik Penjualan'
+        verbose_name_plural = 'Analitik Penjualan'
+
+    def __str__(self):
+        return f"Penjualan {self.date}"
+
+
+class DailyPaymentMethodSales(models.Model):
+    """Rollup harian per metode pembayaran (konversi paid vs cancelled)"""
+    date = models.DateField()
+    payment_method = models.CharField(max_length=50, blank=True)
+    orders_paid = models.PositiveIntegerField(default=0)
+    orders_cancelled = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'payment_method'], name='unique_daily_payment_method'),
+        ]
+
+    def __str__(self):
+        return f"{self.payment_method or '-'} {self.date}"
+
+
+class DailyProductSales(models.Model):
+    """Rollup harian per produk (produk terlaris dan risiko stok habis)"""
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'product'], name='unique_daily_product'),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'date'], name='daily_product_date_idx'),
+        ]
+
     def __str__(self):
-        return f"Payment {self.transaction_id} - {self.order.order_id}"
\ No newline at end of file
+        return f"{self.quantity}x {self.product_id} {self.date}"
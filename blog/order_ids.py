@@ -0,0 +1,116 @@
+import os
+import socket
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+# Order ID gaya Snowflake: 41 bit milidetik sejak ORDER_ID_EPOCH_MS, 10 bit node
+# (proses), 12 bit urutan dalam milidetik yang sama. Dienkode Crockford base32
+# dengan lebar tetap, jadi urutan string = urutan waktu dibuat:
+#   ORD-0C9YZ1V8K2G00  (17 karakter, aman untuk order_id Midtrans)
+ORDER_ID_PREFIX = 'ORD-'
+ORDER_ID_EPOCH_MS = 1704067200000  # 2024-01-01 UTC, cukup sampai ~2093
+NODE_BITS = 10
+SEQUENCE_BITS = 12
+ID_LENGTH = 13
+# Crockford base32: tanpa I, L, O, U; urutan karakter sama dengan urutan nilai
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+
+
+def encode(value, length=ID_LENGTH):
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+def decode(text):
+    value = 0
+    for char in text:
+        value = value * 32 + ALPHABET.index(char)
+    return value
+
+
+class SnowflakeGenerator:
+    """
+    Id 63 bit yang naik terus dalam satu proses. Lebih dari 4096 id dalam satu
+    milidetik, atau jam sistem mundur: milidetik terakhir dilanjutkan (tidak
+    menunggu), jadi urutan tetap naik dan tidak ada id ganda.
+    """
+
+    def __init__(self, node):
+        self.node = node % (1 << NODE_BITS)
+        self.lock = threading.Lock()
+        self.last_ms = 0
+        self.sequence = 0
+
+    def next_value(self):
+        with self.lock:
+            now = max(int(time.time() * 1000) - ORDER_ID_EPOCH_MS, self.last_ms)
+            if now == self.last_ms:
+                self.sequence = (self.sequence + 1) & ((1 << SEQUENCE_BITS) - 1)
+                if self.sequence == 0:
+                    now += 1
+            else:
+                self.sequence = 0
+            self.last_ms = now
+            return (now << (NODE_BITS + SEQUENCE_BITS)) | (self.node << SEQUENCE_BITS) | self.sequence
+
+
+def default_node():
+    """
+    ORDER_ID_NODE kalau diset (satu nilai unik per proses/container), selain
+    itu diturunkan dari hostname + pid. Dua proses yang kebetulan dapat node
+    sama hanya bentrok kalau juga sama milidetik dan urutannya; Order.save()
+    mengulang dengan id baru untuk kasus itu.
+    """
+    if settings.ORDER_ID_NODE is not None:
+        return settings.ORDER_ID_NODE
+    return zlib.crc32(f'{socket.gethostname()}:{os.getpid()}'.encode()) % (1 << NODE_BITS)
+
+
+_generator = None
+_generator_pid = None
+_generator_lock = threading.Lock()
+
+
+def get_generator():
+    """Generator per proses; dibuat ulang setelah fork (worker gunicorn)"""
+    global _generator, _generator_pid
+    pid = os.getpid()
+    if _generator_pid != pid:
+        with _generator_lock:
+            if _generator_pid != pid:
+                _generator = SnowflakeGenerator(default_node())
+                _generator_pid = pid
+    return _generator
+
+
+def snowflake_order_id():
+    return ORDER_ID_PREFIX + encode(get_generator().next_value())
+
+
+def legacy_order_id():
+    """Format lama (acak, 32 bit per hari); untuk rollback lewat ORDER_ID_GENERATOR"""
+    return f"{ORDER_ID_PREFIX}{uuid.uuid4().hex[:8].upper()}-{timezone.now().strftime('%Y%m%d')}"
+
+
+def new_order_id():
+    return import_string(settings.ORDER_ID_GENERATOR)()
+
+
+def order_id_created_at(order_id):
+    """Waktu pembuatan dari order_id format baru (None untuk format lama)"""
+    code = order_id[len(ORDER_ID_PREFIX):]
+    if len(code) != ID_LENGTH or not all(char in ALPHABET for char in code):
+        return None
+    ms = (decode(code) >> (NODE_BITS + SEQUENCE_BITS)) + ORDER_ID_EPOCH_MS
+    return datetime.fromtimestamp(ms / 1000, tz=dt_timezone.utc)
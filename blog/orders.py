@@ -0,0 +1,150 @@
+import base64
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Count, Prefetch, Q
+
+from .images import product_image_url
+from .models import Order, OrderItem
+
+
+ORDER_STATUSES = {value for value, _ in Order.STATUS_CHOICES}
+ACTIVE_ORDER_STATUSES = ['pending', 'paid', 'processing']
+
+
+def parse_status_filter(value):
+    """Status dari query string; nilai yang tidak dikenal dianggap 'all'"""
+    return value if value in ORDER_STATUSES else 'all'
+
+
+def order_stats(user):
+    """Total, selesai, dan pending dalam satu query (conditional aggregation)"""
+    return Order.objects.filter(user=user).aggregate(
+        total_orders=Count('id'),
+        completed_orders=Count('id', filter=Q(status='delivered')),
+        pending_orders=Count('id', filter=Q(status__in=ACTIVE_ORDER_STATUSES)),
+    )
+
+
+def user_orders(user, status_filter='all'):
+    """
+    Pesanan user, terbaru dulu, dengan item + produk di-prefetch.
+
+    Jumlah query tetap (order + item) berapa pun banyaknya pesanan/item.
+    Filter 'all' tidak menampilkan pesanan yang dibatalkan.
+    """
+    orders = _with_items(Order.objects.filter(user=user)).order_by('-created_at', '-id')
+
+    if status_filter == 'all':
+        return orders.exclude(status='cancelled')
+    return orders.filter(status=status_filter)
+
+
+def _with_items(orders):
+    return orders.prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('product').order_by('id'))
+    )
+
+
+def encode_cursor(order):
+    """Cursor keyset dari (created_at, id) order terakhir di halaman"""
+    raw = f'{order.created_at.isoformat()}|{order.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(created_at, id) dari cursor; ValueError kalau cursor tidak valid"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.split('|')
+        return datetime.fromisoformat(created_at), int(pk)
+    except (TypeError, UnicodeDecodeError, ValueError) as e:
+        raise ValueError('Cursor tidak valid') from e
+
+
+def parse_page_size(value):
+    """Ukuran halaman dari query string, dibatasi ORDER_HISTORY_MAX_PAGE_SIZE"""
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return settings.PROFILE_ORDERS_PAGE_SIZE
+    return max(1, min(size, settings.ORDER_HISTORY_MAX_PAGE_SIZE))
+
+
+def order_history_page(user, status_filter='all', cursor=None, page_size=None):
+    """
+    Satu halaman riwayat pesanan dengan keyset pagination pada (created_at, id).
+
+    Halaman ke-100 sama murahnya dengan halaman pertama: index
+    order_user_status_idx / order_user_created_idx langsung mulai dari cursor,
+    tanpa OFFSET. Return (orders, next_cursor); next_cursor None di halaman terakhir.
+    """
+    page_size = page_size or settings.PROFILE_ORDERS_PAGE_SIZE
+    orders = Order.objects.filter(user=user)
+    if status_filter != 'all':
+        orders = orders.filter(status=status_filter)
+
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        orders = orders.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    orders = list(_with_items(orders.order_by('-created_at', '-id'))[:page_size + 1])
+    if len(orders) > page_size:
+        orders = orders[:page_size]
+        return orders, encode_cursor(orders[-1])
+    return orders, None
+
+
+def serialize_order(order):
+    """Order + item untuk response JSON riwayat pesanan"""
+    return {
+        'order_id': order.order_id,
+        'status': order.status,
+        'status_display': order.get_status_display(),
+        'total_amount': str(order.total_amount),
+        'payment_method': order.payment_method,
+        'created_at': order.created_at.isoformat(),
+        'paid_at': order.paid_at.isoformat() if order.paid_at else None,
+        'items': [
+            {
+                'product_id': item.product_id,
+                'name': item.product.name,
+                'image_url': product_image_url(item.product, width=160),
+                'quantity': item.quantity,
+                'price': str(item.price),
+                'subtotal': str(item.get_subtotal()),
+            }
+            for item in order.items.all()
+        ],
+    }
+
+
+# Order ID berurutan (blog/order_ids.py), jadi bisa ditebak: halaman
+# konfirmasi dan endpoint status/Snap token hanya untuk session yang membuat
+# order itu, pemiliknya (login), atau staff.
+SESSION_ORDERS_KEY = 'order_ids'
+
+
+def remember_order(request, order_id):
+    """Catat order yang baru dibuat di session (maksimal SESSION_ORDERS_MAX)"""
+    order_ids = [value for value in request.session.get(SESSION_ORDERS_KEY, []) if value != order_id]
+    request.session[SESSION_ORDERS_KEY] = (order_ids + [order_id])[-settings.SESSION_ORDERS_MAX:]
+
+
+def can_view_order(request, order_id):
+    if order_id in request.session.get(SESSION_ORDERS_KEY, []):
+        return True
+    user = request.user
+    if user.is_staff:
+        return True
+    return user.is_authenticated and Order.objects.filter(order_id=order_id, user=user).exists()
+
+
+async def acan_view_order(request, order_id):
+    """can_view_order untuk view async; session dan user dibaca secara async"""
+    if order_id in await request.session.aget(SESSION_ORDERS_KEY, []):
+        return True
+    user = await request.auser()
+    if user.is_staff:
+        return True
+    return user.is_authenticated and await Order.objects.filter(order_id=order_id, user=user).aexists()
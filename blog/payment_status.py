@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Payment
+
+
+FINAL_PAYMENT_STATUSES = {'success', 'failed', 'expired', 'cancelled'}
+
+
+def _cache_key(order_id):
+    return f'payment-status:{order_id}'
+
+
+def _status_row(order_id):
+    return Payment.objects.filter(order__order_id=order_id).values('status', 'order__status', 'order__paid_at')
+
+
+def _status_from_row(row):
+    if row is None:
+        return None
+    return {
+        'status': row['status'],
+        'order_status': row['order__status'],
+        'paid_at': row['order__paid_at'].isoformat() if row['order__paid_at'] else None,
+    }
+
+
+def load_payment_status(order_id):
+    """Status order + payment dari database dalam satu query (join)"""
+    return _status_from_row(_status_row(order_id).first())
+
+
+def get_payment_status(order_id):
+    """
+    Status pembayaran dari cache (TTL pendek), fallback ke database.
+
+    Ratusan pelanggan yang menunggu di layar QRIS cukup ditangani dari cache;
+    perubahan status langsung ditulis ke cache oleh publish_payment_status.
+    Entri cache hanya petunjuk berumur PAYMENT_STATUS_CACHE_TIMEOUT detik:
+    dengan cache per proses (LocMem) perubahan yang dipublish proses lain
+    terbaca dari database setelah entri itu habis.
+    """
+    status = cache.get(_cache_key(order_id))
+    if status is None:
+        status = load_payment_status(order_id)
+        if status is not None:
+            cache.set(_cache_key(order_id), status, settings.PAYMENT_STATUS_CACHE_TIMEOUT)
+    return status
+
+
+async def aget_payment_status(order_id):
+    """get_payment_status untuk view async (endpoint polling, stream SSE)"""
+    status = await cache.aget(_cache_key(order_id))
+    if status is None:
+        status = _status_from_row(await _status_row(order_id).afirst())
+        if status is not None:
+            await cache.aset(_cache_key(order_id), status, settings.PAYMENT_STATUS_CACHE_TIMEOUT)
+    return status
+
+
+def publish_payment_status(order_id):
+    """
+    Tulis status terbaru ke cache; dipakai endpoint polling dan stream SSE.
+    TTL-nya tetap pendek: cache proses lain (LocMem) tidak ikut ter-update.
+    """
+    status = load_payment_status(order_id)
+    if status is not None:
+        cache.set(_cache_key(order_id), status, settings.PAYMENT_STATUS_CACHE_TIMEOUT)
+
+
+def publish_payment_status_on_commit(order_id):
+    transaction.on_commit(lambda: publish_payment_status(order_id))
+
+
+def publish_payment_statuses(order_ids):
+    """publish_payment_status untuk banyak order: satu query, satu set_many"""
+    rows = Payment.objects.filter(order__order_id__in=order_ids).values(
+        'order__order_id', 'status', 'order__status', 'order__paid_at'
+    )
+    statuses = {_cache_key(row['order__order_id']): _status_from_row(row) for row in rows}
+    if statuses:
+        cache.set_many(statuses, settings.PAYMENT_STATUS_CACHE_TIMEOUT)
+
+
+def publish_payment_statuses_on_commit(order_ids):
+    transaction.on_commit(lambda: publish_payment_statuses(order_ids))
+
+
+def status_etag(status):
+    return '"%s"' % hashlib.md5(json.dumps(status, sort_keys=True).encode()).hexdigest()
+
+
+# Stream SSE yang sedang terbuka di proses ini (satu event loop per worker)
+_open_streams = 0
+
+
+def stream_slots_available():
+    """Masih boleh membuka stream baru? Di atas batas, client kembali ke polling"""
+    return _open_streams < settings.PAYMENT_STATUS_MAX_STREAMS
+
+
+async def payment_status_events(order_id):
+    """
+    Event stream SSE: kirim status saat ini, lalu setiap kali berubah.
+
+    Perubahan dibaca dari cache (tanpa query DB selama status ada di cache).
+    Selama status tidak berubah, jeda antar pengecekan naik 1.5x dari
+    PAYMENT_STATUS_STREAM_INTERVAL sampai PAYMENT_STATUS_STREAM_MAX_INTERVAL.
+    Stream ditutup setelah status final atau PAYMENT_STATUS_STREAM_TIMEOUT.
+    """
+    global _open_streams
+    _open_streams += 1
+    try:
+        deadline = time.monotonic() + settings.PAYMENT_STATUS_STREAM_TIMEOUT
+        interval = settings.PAYMENT_STATUS_STREAM_INTERVAL
+        last_sent = None
+        last_heartbeat = time.monotonic()
+
+        # Minta browser menunggu sebelum reconnect
+        yield 'retry: 3000\n\n'
+
+        while time.monotonic() < deadline:
+            status = await aget_payment_status(order_id)
+            if status is None:
+                yield 'event: not_found\ndata: {"error": "Order not found"}\n\n'
+                return
+
+            if status != last_sent:
+                last_sent = status
+                interval = settings.PAYMENT_STATUS_STREAM_INTERVAL
+                yield f'event: status\ndata: {json.dumps(status)}\n\n'
+                if status['status'] in FINAL_PAYMENT_STATUSES:
+                    return
+            else:
+                interval = min(interval * 1.5, settings.PAYMENT_STATUS_STREAM_MAX_INTERVAL)
+                if time.monotonic() - last_heartbeat >= 15:
+                    last_heartbeat = time.monotonic()
+                    yield ': keep-alive\n\n'
+
+            await asyncio.sleep(interval)
+    finally:
+        _open_streams -= 1
@@ -0,0 +1,197 @@
+from concurrent.futures import wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .analytics import record_order_transitions
+from .checkout import SHIPPING_COST
+from .gateway import get_gateway
+from .instrumentation import external_call
+from .models import Order, Payment
+from .payment_status import publish_payment_status_on_commit
+from .prices import get_prices
+from .reservations import release_reservations
+from .tasks import run_after_commit, submit
+
+
+DEFAULT_CUSTOMER_EMAIL = 'customer@threeofkind.supply'
+
+
+def build_snap_param(payment):
+    """Susun parameter Snap create_transaction dari Payment + Order di database"""
+    order = payment.order
+
+    # Harga dari OrderItem (harus sama dengan gross_amount), nama dari tabel harga
+    items = list(order.items.values_list('product_id', 'price', 'quantity'))
+    names = get_prices(product_id for product_id, _, _ in items)
+    item_details = [
+        {
+            'id': str(product_id),
+            'price': int(price),
+            'quantity': quantity,
+            'name': names[product_id]['name'][:50] if product_id in names else f'Produk {product_id}',
+        }
+        for product_id, price, quantity in items
+    ]
+    item_details.append({
+        'id': 'SHIPPING',
+        'price': int(SHIPPING_COST),
+        'quantity': 1,
+        'name': 'Biaya Pengiriman'
+    })
+
+    if order.user_id and order.user.email:
+        customer_email = order.user.email
+    else:
+        customer_email = DEFAULT_CUSTOMER_EMAIL
+
+    address = {
+        'address': order.address,
+        'city': order.city,
+        'postal_code': order.postal_code,
+        'country_code': 'IDN'
+    }
+
+    enabled_payments = []
+    if payment.payment_method == 'credit_card':
+        enabled_payments = ['credit_card']
+    elif payment.payment_method == 'qris':
+        enabled_payments = ['qris']
+    elif payment.payment_method == 'bank_transfer':
+        enabled_payments = [f"{payment.bank_choice or 'bca'}_va"]
+    elif payment.payment_method == 'e_wallet':
+        enabled_payments = [payment.ewallet_choice or 'gopay']
+
+    return {
+        'transaction_details': {
+            'order_id': order.order_id,
+            'gross_amount': int(order.total_amount)
+        },
+        'item_details': item_details,
+        'customer_details': {
+            'first_name': order.full_name,
+            'email': customer_email,
+            'phone': order.phone,
+            'billing_address': address,
+            'shipping_address': address,
+        },
+        'enabled_payments': enabled_payments,
+        'expiry': snap_expiry(payment),
+    }
+
+
+def snap_expiry(payment):
+    """
+    Batas waktu bayar di Midtrans, dibulatkan ke bawah supaya tidak lebih lama
+    dari Payment.expired_at (saat hold stok dilepas oleh sweeper).
+    """
+    minutes = settings.STOCK_HOLD_MINUTES
+    if payment.expired_at:
+        minutes = int((payment.expired_at - timezone.now()).total_seconds() // 60)
+    return {'unit': 'minute', 'duration': max(minutes, 1)}
+
+
+def fail_snap_token(payment, error):
+    """Token tidak bisa dibuat: batalkan order dan lepas hold stok"""
+    with transaction.atomic():
+        claimed = Payment.objects.filter(pk=payment.pk, token_status='processing').update(
+            token_status='failed',
+            token_error=str(error)[:255],
+            status='failed',
+            updated_at=timezone.now(),
+        )
+        if not claimed:
+            return
+        now = timezone.now()
+        if Order.objects.filter(pk=payment.order_id, status='pending').update(
+            status='cancelled', cancelled_at=now, updated_at=now
+        ):
+            record_order_transitions([payment.order_id], 'cancelled', now)
+        release_reservations([payment.order_id])
+        publish_payment_status_on_commit(payment.order.order_id)
+
+
+def request_snap_token(payment_id):
+    """
+    Satu percobaan membuat Snap token untuk Payment berstatus token 'pending'.
+
+    Payment di-klaim dulu (pending -> processing) dengan UPDATE bersyarat,
+    jadi thread web dan worker tidak pernah memanggil Midtrans dua kali untuk
+    order yang sama. Return token_status akhir.
+    """
+    claimed = Payment.objects.filter(pk=payment_id, token_status='pending').update(
+        token_status='processing',
+        token_attempts=F('token_attempts') + 1,
+        updated_at=timezone.now(),
+    )
+    if not claimed:
+        return Payment.objects.filter(pk=payment_id).values_list('token_status', flat=True).first()
+
+    payment = Payment.objects.select_related('order', 'order__user').get(pk=payment_id)
+    try:
+        param = build_snap_param(payment)
+        with external_call('midtrans'):
+            result = get_gateway().create_transaction(param)
+    except Exception as e:
+        if payment.token_attempts >= settings.SNAP_TOKEN_MAX_ATTEMPTS:
+            fail_snap_token(payment, e)
+            return 'failed'
+        Payment.objects.filter(pk=payment_id, token_status='processing').update(
+            token_status='pending',
+            token_error=str(e)[:255],
+            updated_at=timezone.now(),
+        )
+        return 'pending'
+
+    Payment.objects.filter(pk=payment_id, token_status='processing').update(
+        snap_token=result['token'],
+        redirect_url=result.get('redirect_url', ''),
+        token_status='ready',
+        token_error='',
+        updated_at=timezone.now(),
+    )
+    return 'ready'
+
+
+def process_pending_tokens(limit=50, retry_after=5, stale_after=120):
+    """
+    Satu putaran `manage.py snap_worker`.
+
+    Payment yang macet di 'processing' (proses mati di tengah jalan) dikembalikan
+    ke 'pending', lalu maksimal `limit` payment pending diproses paralel memakai
+    thread pool yang sama. Percobaan ulang menunggu `retry_after` detik.
+    Return jumlah payment yang diproses.
+    """
+    now = timezone.now()
+    Payment.objects.filter(
+        token_status='processing', updated_at__lt=now - timedelta(seconds=stale_after)
+    ).update(token_status='pending', updated_at=now)
+
+    payment_ids = list(
+        Payment.objects.filter(token_status='pending')
+        .filter(Q(token_attempts=0) | Q(updated_at__lt=now - timedelta(seconds=retry_after)))
+        .order_by('id')
+        .values_list('id', flat=True)[:limit]
+    )
+    wait([submit(request_snap_token, payment_id) for payment_id in payment_ids])
+    return len(payment_ids)
+
+
+def dispatch_snap_token(payment_id):
+    """
+    Jadwalkan pembuatan Snap token setelah transaksi checkout commit.
+
+    SNAP_TOKEN_DISPATCH:
+      'thread' - thread pool di proses web (default)
+      'worker' - diambil oleh `manage.py snap_worker`
+      'sync'   - langsung setelah commit di request ini (test)
+
+    Di sini hanya satu percobaan. Kalau gagal, payment kembali 'pending' dan
+    percobaan ulang diambil `manage.py snap_worker` setelah retry_after detik:
+    thread pool dipakai bersama webhook dan outbox email, jadi tidak boleh
+    tertahan sleep backoff saat Midtrans lambat atau mati.
+    """
+    run_after_commit(settings.SNAP_TOKEN_DISPATCH, request_snap_token, payment_id)
@@ -0,0 +1,96 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .images import product_image_url
+from .models import Product
+
+
+PRICE_VERSION_KEY = 'prices:version'
+
+# Tabel harga per proses: {'version', 'checked_at', 'entries': {product_id: entry}}
+_local = {'version': None, 'checked_at': 0.0, 'entries': {}}
+_local_lock = threading.Lock()
+
+
+def _entry_key(version, product_id):
+    return f'prices:{version}:{product_id}'
+
+
+def _current_version():
+    """
+    Versi tabel harga. Dibaca dari cache bersama paling sering sekali per
+    PRICE_LOCAL_TTL detik; di antaranya versi lokal yang dipakai.
+    """
+    now = time.monotonic()
+    if _local['version'] is not None and now - _local['checked_at'] < settings.PRICE_LOCAL_TTL:
+        return _local['version']
+
+    version = cache.get_or_set(PRICE_VERSION_KEY, time.time_ns(), None)
+    with _local_lock:
+        if _local['version'] != version:
+            _local['entries'] = {}
+            _local['version'] = version
+        _local['checked_at'] = now
+    return version
+
+
+def invalidate_prices():
+    """Product disimpan/dihapus -> semua harga lama (lokal dan cache bersama) tidak dipakai lagi"""
+    cache.set(PRICE_VERSION_KEY, time.time_ns(), None)
+    with _local_lock:
+        _local['version'] = None
+        _local['entries'] = {}
+
+
+def _load_entries(product_ids):
+    products = Product.objects.only('id', 'name', 'price', 'image', 'image_variants').in_bulk(product_ids)
+    return {
+        product.id: {
+            'price': product.price,
+            'name': product.name,
+            'image': product_image_url(product, width=160),
+        }
+        for product in products.values()
+    }
+
+
+def get_prices(product_ids):
+    """
+    Harga server untuk beberapa produk: {product_id: {'price', 'name', 'image'}}.
+
+    Urutan lookup: tabel di memori proses -> cache bersama (satu get_many) ->
+    database (satu query untuk yang belum ada). Produk yang tidak ada tidak
+    ikut di hasil. Stok sengaja tidak disimpan di sini; stok dijaga oleh
+    UPDATE bersyarat saat checkout.
+    """
+    product_ids = set(product_ids)
+    if not product_ids:
+        return {}
+
+    version = _current_version()
+    entries = _local['entries']
+    found = {product_id: entries[product_id] for product_id in product_ids if product_id in entries}
+
+    missing = product_ids - set(found)
+    if missing:
+        keys = {_entry_key(version, product_id): product_id for product_id in missing}
+        from_shared = {keys[key]: entry for key, entry in cache.get_many(list(keys)).items()}
+        missing -= set(from_shared)
+
+        from_db = _load_entries(missing) if missing else {}
+        if from_db:
+            cache.set_many(
+                {_entry_key(version, product_id): entry for product_id, entry in from_db.items()},
+                settings.PRICE_CACHE_TIMEOUT,
+            )
+
+        loaded = {**from_shared, **from_db}
+        with _local_lock:
+            if _local['version'] == version:
+                _local['entries'].update(loaded)
+        found.update(loaded)
+
+    return found
@@ -0,0 +1,146 @@
+import hashlib
+import math
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+
+
+STATS_KEY = 'ratelimit-stats:{scope}:{result}'
+
+
+def client_ip(request):
+    """
+    IP klien. Di belakang proxy (Render, load balancer) REMOTE_ADDR adalah
+    IP proxy; RATE_LIMIT_PROXY_COUNT = jumlah proxy tepercaya, IP diambil
+    dari X-Forwarded-For sejumlah itu dari belakang (bagian depan bisa dipalsukan).
+    """
+    hops = settings.RATE_LIMIT_PROXY_COUNT
+    if hops:
+        forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+        if len(forwarded) >= hops:
+            return forwarded[-hops]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def post_field(name):
+    """Key dari field POST (username / email), tanpa beda huruf besar-kecil"""
+    def key(request):
+        return (request.POST.get(name) or '').strip().lower()
+    return key
+
+
+def user_or_session(request):
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'session:{request.session.session_key}' if request.session.session_key else ''
+
+
+def hit(scope, key, now=None):
+    """
+    Catat satu request dan kembalikan (diizinkan?, detik sampai boleh lagi).
+
+    Sliding window counter: hitungan window sebelumnya diberi bobot sisa
+    waktunya, ditambah hitungan window sekarang. Dua key cache per scope+key,
+    dinaikkan dengan incr (atomik di Redis), tanpa query database.
+    """
+    limit, window = settings.RATE_LIMITS[scope]
+    now = time.time() if now is None else now
+    current = int(now // window)
+    digest = hashlib.sha256(key.encode()).hexdigest()[:32]
+    current_key = f'ratelimit:{scope}:{digest}:{current}'
+    previous_key = f'ratelimit:{scope}:{digest}:{current - 1}'
+
+    cache.add(current_key, 0, window * 2)
+    try:
+        count = cache.incr(current_key)
+    except ValueError:
+        # Key baru saja kedaluwarsa di antara add dan incr
+        cache.set(current_key, 1, window * 2)
+        count = 1
+    previous = cache.get(previous_key, 0)
+
+    elapsed = (now % window) / window
+    if previous * (1 - elapsed) + count <= limit:
+        return True, 0
+    return False, max(1, math.ceil(window * (1 - elapsed)))
+
+
+def _count(scope, result):
+    key = STATS_KEY.format(scope=scope, result=result)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def rate_limit_stats():
+    """Jumlah request allowed / blocked per scope (untuk monitoring)"""
+    keys = {
+        (scope, result): STATS_KEY.format(scope=scope, result=result)
+        for scope in settings.RATE_LIMITS for result in ('allowed', 'blocked')
+    }
+    values = cache.get_many(keys.values())
+    stats = {scope: {'allowed': 0, 'blocked': 0} for scope in settings.RATE_LIMITS}
+    for (scope, result), key in keys.items():
+        stats[scope][result] = values.get(key, 0)
+    return stats
+
+
+def limited_json(request, retry_after):
+    return JsonResponse({'error': 'Terlalu banyak percobaan, coba lagi nanti'}, status=429)
+
+
+def rate_limit(*rules, methods=('POST',), limited=limited_json):
+    """
+    Decorator view: rules = (scope di settings.RATE_LIMITS, fungsi key).
+    Dicek sebelum view berjalan (sebelum hash password / query database);
+    kalau salah satu rule terlampaui, `limited(request, retry_after)` yang
+    dikembalikan dengan status 429 dan header Retry-After.
+    """
+    def check(request):
+        """Response 429, atau None kalau request boleh lanjut"""
+        if not settings.RATE_LIMIT_ENABLED or request.method not in methods:
+            return None
+
+        retry_after = 0
+        for scope, key_func in rules:
+            key = key_func(request)
+            if not key:
+                continue
+            allowed, wait = hit(scope, key)
+            _count(scope, 'allowed' if allowed else 'blocked')
+            if not allowed:
+                retry_after = max(retry_after, wait)
+
+        if not retry_after:
+            return None
+        response = limited(request, retry_after)
+        response.status_code = 429
+        response['Retry-After'] = str(retry_after)
+        return response
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            # Cache dan render halaman 429 tetap sync
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if settings.RATE_LIMIT_ENABLED and request.method in methods:
+                    response = await sync_to_async(check)(request)
+                    if response is not None:
+                        return response
+                return await view(request, *args, **kwargs)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = check(request)
+            if response is not None:
+                return response
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
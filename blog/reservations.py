@@ -0,0 +1,170 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .analytics import PAID_ORDER_STATUSES, record_order_transitions, revert_paid_orders
+from .checkout import restore_stock
+from .mail import enqueue_payment_success
+from .models import Order, Payment, StockReservation
+from .payment_status import publish_payment_status_on_commit, publish_payment_statuses_on_commit
+
+
+def commit_reservations(order_ids):
+    """Order dibayar: hold menjadi 'committed' (stok sudah dikurangi saat checkout)"""
+    return StockReservation.objects.filter(order_id__in=order_ids, state='held').update(
+        state='committed', updated_at=timezone.now()
+    )
+
+
+def release_reservations(order_ids, state='held'):
+    """
+    Lepas semua hold beberapa order sekaligus dan kembalikan stoknya
+    (state='committed' untuk order yang sudah dibayar lalu dibatalkan).
+
+    Baris reservation di-lock dulu, jadi dua proses yang melepas order yang
+    sama (webhook expire + sweeper + cancel user) tidak mengembalikan stok dua
+    kali. Stok dikembalikan dalam satu UPDATE. Return {product_id: jumlah}.
+    """
+    with transaction.atomic():
+        held = list(
+            StockReservation.objects.select_for_update()
+            .filter(order_id__in=order_ids, state=state)
+            .values_list('id', 'product_id', 'quantity')
+        )
+        if not held:
+            return {}
+
+        quantities = {}
+        for _, product_id, quantity in held:
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+        StockReservation.objects.filter(id__in=[pk for pk, _, _ in held]).update(
+            state='released', updated_at=timezone.now()
+        )
+        restore_stock(quantities)
+    return quantities
+
+
+def transition_order(order, order_status, payment_status, now=None):
+    """
+    Pindahkan order pending ke order_status beserta efeknya: status Payment,
+    hold stok (committed saat 'paid', dilepas saat 'cancelled'), rollup
+    analitik, email pembayaran berhasil dan cache status pembayaran. Satu jalur
+    untuk webhook Midtrans, cancel oleh user dan perubahan manual di admin.
+
+    UPDATE order bersyarat (masih 'pending'), jadi dua proses yang memindahkan
+    order yang sama tidak mencatat / melepas stok dua kali. Harus dipanggil di
+    dalam transaction.atomic(). Return False kalau order sudah tidak pending.
+    """
+    now = now or timezone.now()
+    order_update = {'status': order_status, 'updated_at': now}
+    if order_status == 'paid':
+        order_update['paid_at'] = now
+    elif order_status == 'cancelled':
+        order_update['cancelled_at'] = now
+    if not Order.objects.filter(pk=order.pk, status='pending').update(**order_update):
+        return False
+
+    Payment.objects.filter(order_id=order.pk).update(status=payment_status, updated_at=now)
+    if order_status == 'paid':
+        commit_reservations([order.pk])
+        enqueue_payment_success(order.order_id)
+    elif order_status == 'cancelled':
+        release_reservations([order.pk])
+    record_order_transitions([order.pk], order_status, now)
+    publish_payment_status_on_commit(order.order_id)
+    return True
+
+
+def can_change_status(previous, status):
+    """
+    Perubahan status manual yang didukung change_order_status: dari pending,
+    antar status sesudah dibayar (paid -> processing -> shipped -> delivered),
+    atau order dibayar yang dibatalkan. Order batal tidak bisa dibuka lagi
+    (stoknya sudah dikembalikan) dan order tidak bisa kembali ke pending.
+    """
+    if previous == status or previous == 'pending':
+        return True
+    return previous in PAID_ORDER_STATUSES and status != 'pending'
+
+
+def change_order_status(order, previous, status, now=None):
+    """
+    Ubah status order dari `previous` (perubahan manual di admin) beserta
+    efeknya ke stok, rollup dan cache status; satu jalur untuk semua
+    perubahan yang lolos can_change_status. Order dibayar yang dibatalkan:
+    hold 'committed' dilepas (stok kembali), angka paid-nya dikurangi dari
+    rollup dan batalnya dicatat. Status Payment tidak diubah (refund di luar
+    sistem ini).
+
+    UPDATE bersyarat pada `previous`; return False kalau order sudah diubah
+    proses lain. Harus dipanggil di dalam transaction.atomic().
+    """
+    if not can_change_status(previous, status):
+        raise ValueError(f'Status {previous} tidak bisa diubah ke {status}')
+    if previous == status:
+        return True
+    now = now or timezone.now()
+
+    if previous == 'pending':
+        if status not in PAID_ORDER_STATUSES:
+            return transition_order(order, status, 'cancelled', now)
+        if not transition_order(order, 'paid', 'success', now):
+            return False
+        if status != 'paid':
+            Order.objects.filter(pk=order.pk).update(status=status)
+        return True
+
+    order_update = {'status': status, 'updated_at': now}
+    if status == 'cancelled':
+        order_update['cancelled_at'] = now
+    if not Order.objects.filter(pk=order.pk, status=previous).update(**order_update):
+        return False
+    if status == 'cancelled':
+        release_reservations([order.pk], state='committed')
+        revert_paid_orders([order.pk])
+        record_order_transitions([order.pk], 'cancelled', now)
+    publish_payment_status_on_commit(order.order_id)
+    return True
+
+
+def release_expired_holds(limit=200):
+    """
+    Satu putaran `manage.py release_expired_holds`.
+
+    Payment pending yang Payment.expired_at-nya lewat ditandai 'expired',
+    order-nya dibatalkan, dan hold stoknya dilepas, semuanya per batch dalam
+    satu transaksi dengan jumlah query tetap berapa pun besar batch-nya.
+    Payment yang sedang di-lock (mis. webhook settlement yang sedang
+    diproses) dilewati dan diambil lagi di putaran berikutnya.
+    Return jumlah order yang dilepas.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            Payment.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', expired_at__lte=now, order__status='pending')
+            .order_by('expired_at')
+            .values_list('order_id', flat=True)[:limit]
+        )
+        if not batch:
+            return 0
+
+        # Lock di atas tidak ada di SQLite: webhook, cancel user atau sweeper
+        # lain bisa sudah mengubah order di antaranya. Satu UPDATE bersyarat
+        # untuk seluruh batch, lalu order yang benar-benar dipindahkan UPDATE
+        # ini dikenali dari cancelled_at = now (pengganti RETURNING); hanya
+        # order itu yang dicatat ke rollup dan dilepas stoknya.
+        if not Order.objects.filter(id__in=batch, status='pending').update(
+            status='cancelled', cancelled_at=now, updated_at=now
+        ):
+            return 0
+        cancelled = dict(
+            Order.objects.filter(id__in=batch, status='cancelled', cancelled_at=now).values_list('id', 'order_id')
+        )
+
+        Payment.objects.filter(order_id__in=cancelled, status='pending').update(status='expired', updated_at=now)
+        record_order_transitions(list(cancelled), 'cancelled', now)
+        release_reservations(list(cancelled))
+        publish_payment_statuses_on_commit(list(cancelled.values()))
+
+    return len(cancelled)
@@ -0,0 +1,221 @@
+import re
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from .catalog import get_catalog_version, prepare_product, product_data
+from .models import Product
+
+
+# Index pencarian produk (name, category.name, description) di luar ORM:
+# SQLite  - tabel virtual FTS5, rowid = product id, ranking bm25
+# PostgreSQL - tabel tsvector (bobot A/B/C) + index GIN, ranking ts_rank_cd
+# Database lain - fallback icontains (tanpa index)
+# Tabelnya dibuat migration 0016_product_search_index.
+SEARCH_TABLE = 'blog_product_search'
+# Sama dengan prefix index FTS5 terpendek (prefix='2 3')
+SEARCH_MIN_LENGTH = 2
+
+# Baris yang di-index: satu per produk, nama kategori ikut
+_SOURCE = (
+    "SELECT p.id, p.name, COALESCE(c.name, ''), p.description "
+    "FROM blog_product p LEFT JOIN blog_category c ON c.id = p.category_id"
+)
+_POSTGRESQL_DOCUMENT = (
+    "setweight(to_tsvector('simple', p.name), 'A') || "
+    "setweight(to_tsvector('simple', COALESCE(c.name, '')), 'B') || "
+    "setweight(to_tsvector('simple', p.description), 'C')"
+)
+
+
+def search_backend(conn=None):
+    vendor = (conn or connection).vendor
+    return vendor if vendor in ('sqlite', 'postgresql') else None
+
+
+def _where(product_ids, category_id):
+    if product_ids is not None:
+        return 'p.id IN (%s)' % ', '.join(['%s'] * len(product_ids)), list(product_ids)
+    if category_id is not None:
+        return 'p.category_id = %s', [category_id]
+    return '1 = 1', []
+
+
+def index_products(product_ids=None, category_id=None, conn=None):
+    """
+    Tulis ulang baris index untuk produk tertentu, produk satu kategori, atau
+    semuanya (tanpa argumen). DELETE + INSERT ... SELECT, berapa pun jumlahnya.
+    """
+    conn = conn or connection
+    backend = search_backend(conn)
+    if backend is None or product_ids == []:
+        return
+    where, params = _where(product_ids, category_id)
+    rebuild = product_ids is None and category_id is None
+
+    with conn.cursor() as cursor:
+        if rebuild:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        if backend == 'sqlite':
+            if not rebuild:
+                cursor.execute(
+                    f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN (SELECT p.id FROM blog_product p WHERE {where})', params
+                )
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, name, category, description) {_SOURCE} WHERE {where}', params
+            )
+        else:
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (product_id, document) '
+                f'SELECT p.id, {_POSTGRESQL_DOCUMENT} FROM blog_product p '
+                f'LEFT JOIN blog_category c ON c.id = p.category_id WHERE {where} '
+                'ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document',
+                params,
+            )
+
+
+def remove_products(product_ids):
+    # PostgreSQL: ON DELETE CASCADE
+    if search_backend() == 'sqlite' and product_ids:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN (%s)' % ', '.join(['%s'] * len(product_ids)),
+                list(product_ids),
+            )
+
+
+def query_terms(query):
+    """
+    Kata dalam query (huruf/angka saja), maksimal SEARCH_MAX_TERMS. Kata satu
+    huruf dilewati: index prefix mulai dari 2 huruf, jadi 'katun b' dicari
+    sebagai 'katun' sampai huruf berikutnya diketik.
+    """
+    words = re.findall(r'\w+', (query or '').lower())
+    return [word for word in words if len(word) >= SEARCH_MIN_LENGTH][:settings.SEARCH_MAX_TERMS]
+
+
+def _ranked_ids(backend, terms, limit, names_only):
+    """
+    Satu query ber-index. Ranking dihitung hanya untuk SEARCH_RANK_CANDIDATES
+    baris pertama yang cocok: prefix pendek ('ka') bisa cocok dengan puluhan
+    ribu produk dan biaya ranking naik linear dengan jumlah itu.
+    """
+    candidates = settings.SEARCH_RANK_CANDIDATES
+    if backend == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        if names_only:
+            match = f'{{name category}} : ({match})'
+        # bm25: makin kecil makin relevan; nama > kategori > deskripsi
+        sql = (
+            f'SELECT rowid FROM (SELECT rowid, bm25({SEARCH_TABLE}, 10.0, 4.0, 1.0) AS score '
+            f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s LIMIT %s) ORDER BY score LIMIT %s'
+        )
+    else:
+        # Bobot A = nama, B = kategori, C = deskripsi
+        match = ' & '.join(f'{term}:*AB' if names_only else f'{term}:*' for term in terms)
+        sql = (
+            f"SELECT product_id FROM (SELECT product_id, ts_rank_cd(document, query) AS score "
+            f"FROM {SEARCH_TABLE}, to_tsquery('simple', %s) query WHERE document @@ query LIMIT %s) candidates "
+            'ORDER BY score DESC, product_id LIMIT %s'
+        )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, candidates, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _fallback_ids(terms, limit):
+    products = Product.objects.all()
+    for term in terms:
+        products = products.filter(
+            Q(name__icontains=term) | Q(category__name__icontains=term) | Q(description__icontains=term)
+        )
+    first = terms[0]
+    rank = Case(
+        When(name__istartswith=first, then=Value(0)),
+        When(name__icontains=first, then=Value(1)),
+        When(category__name__icontains=first, then=Value(2)),
+        default=Value(3),
+        output_field=IntegerField(),
+    )
+    return list(products.annotate(rank=rank).order_by('rank', 'id').values_list('id', flat=True)[:limit])
+
+
+def search_product_ids(terms, limit):
+    """
+    Id produk terurut relevansi. Semua kata harus cocok, masing-masing
+    sebagai prefix ('kaos hit' menemukan 'Kaos Hitam'). Nama dan kategori
+    dicari dulu; deskripsi hanya dipakai kalau hasilnya belum cukup.
+    """
+    if not terms:
+        return []
+    backend = search_backend()
+    if backend is None:
+        return _fallback_ids(terms, limit)
+
+    ids = _ranked_ids(backend, terms, limit, names_only=True)
+    if len(ids) < limit:
+        found = set(ids)
+        more = _ranked_ids(backend, terms, limit + len(ids), names_only=False)
+        ids += [product_id for product_id in more if product_id not in found][:limit - len(ids)]
+    return ids
+
+
+class _LRU:
+    """LRU kecil per proses untuk hasil query yang sering dicari"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.data.get(key)
+            if value is not None:
+                self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+
+_hot_queries = _LRU(settings.SEARCH_LRU_SIZE)
+
+
+def search_products(query, limit=8):
+    """
+    Hasil typeahead: [{id, category, ...product_data}] terurut relevansi.
+    Query yang sama dilayani dari LRU sampai katalog berubah (versi katalog
+    bagian dari key), jadi query populer tidak menyentuh database.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return []
+
+    key = (get_catalog_version(), ' '.join(terms), limit)
+    results = _hot_queries.get(key)
+    if results is not None:
+        return results
+
+    ids = search_product_ids(terms, limit)
+    products = Product.objects.select_related('category').in_bulk(ids)
+    results = []
+    for product_id in ids:
+        product = products.get(product_id)
+        if product is None:
+            continue
+        prepare_product(product)
+        results.append({
+            'id': product.id,
+            'category': product.category.name if product.category else None,
+            **product_data(product),
+        })
+    _hot_queries.set(key, results)
+    return results
@@ -0,0 +1,86 @@
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_in
+from django.core.signals import setting_changed
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.conf import settings
+from django.dispatch import receiver
+
+from .cart import merge_session_cart
+from .catalog import invalidate_catalog_cache
+from .gateway import reset_gateway
+from .images import refresh_product_images
+from .prices import invalidate_prices
+from .search import index_products, remove_products
+from .tasks import run_after_commit
+from .wishlist import release_user_wishlist
+from .models import Category, Product
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Category)
+def product_catalog_changed(sender, **kwargs):
+    """Produk/kategori berubah -> fragment katalog lama tidak dipakai lagi"""
+    invalidate_catalog_cache()
+
+
+@receiver([post_save, post_delete], sender=Product)
+def product_price_changed(sender, **kwargs):
+    invalidate_prices()
+
+
+@receiver(post_save, sender=Product)
+def product_search_changed(sender, instance, update_fields=None, **kwargs):
+    """Index pencarian ditulis di transaksi yang sama dengan produknya"""
+    if update_fields is not None and not {'name', 'description', 'category'} & set(update_fields):
+        return
+    index_products([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def product_search_deleted(sender, instance, **kwargs):
+    remove_products([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def category_search_changed(sender, instance, created, **kwargs):
+    if not created:
+        index_products(category_id=instance.pk)
+
+
+@receiver(pre_delete, sender=Category)
+def category_search_deleting(sender, instance, **kwargs):
+    # Produknya jadi tanpa kategori (SET_NULL); catat dulu id-nya
+    instance.search_product_ids = list(instance.product_set.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Category)
+def category_search_deleted(sender, instance, **kwargs):
+    index_products(getattr(instance, 'search_product_ids', []))
+
+
+@receiver(post_save, sender=Product)
+def product_image_changed(sender, instance, update_fields=None, **kwargs):
+    """Gambar baru/diganti -> buat turunan WebP/AVIF/JPEG di background"""
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    source = instance.image.name if instance.image else None
+    if source != (instance.image_variants or {}).get('source'):
+        run_after_commit(settings.PRODUCT_IMAGE_DISPATCH, refresh_product_images, instance.pk)
+
+
+@receiver(setting_changed)
+def payment_gateway_changed(setting, **kwargs):
+    if setting in ('PAYMENT_GATEWAY', 'PAYMENT_STUB_LATENCY_MS'):
+        reset_gateway()
+
+
+@receiver(user_logged_in)
+def move_guest_cart(request, user, **kwargs):
+    """Cart tamu (session) ikut pindah ke cart user setelah login"""
+    if request is not None and hasattr(request, 'session'):
+        merge_session_cart(request.session, user)
+
+
+@receiver(pre_delete, sender=User)
+def user_wishlist_deleted(sender, instance, **kwargs):
+    release_user_wishlist(instance.pk)
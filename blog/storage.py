@@ -0,0 +1,50 @@
+import hashlib
+import posixpath
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+
+# <stem>.<12 hex>.<...> -> nama yang sudah memuat hash isi file
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.')
+
+
+def is_hashed_name(name):
+    return bool(HASHED_NAME.search(posixpath.basename(name)))
+
+
+class HashedMediaStorage(FileSystemStorage):
+    """
+    Storage media dengan nama berbasis isi: products/gelang.jpg disimpan
+    sebagai products/gelang.<hash>.jpg.
+
+    Isi file di balik satu URL tidak pernah berubah, jadi media bisa di-cache
+    browser/CDN selamanya (lihat blog/media.py). Upload ulang file yang sama
+    memakai file yang sudah ada, bukan membuat gelang_AbC12.jpg baru.
+    """
+
+    def hashed_name(self, name, content):
+        if is_hashed_name(name):
+            return name
+
+        sha = hashlib.sha256()
+        for chunk in content.chunks():
+            sha.update(chunk)
+        content.seek(0)
+
+        directory, filename = posixpath.split(name)
+        stem, ext = posixpath.splitext(filename)
+        # Stem dipotong supaya nama tetap muat di ImageField (max_length 100)
+        return posixpath.join(directory, f'{stem[:60]}.{sha.hexdigest()[:12]}{ext.lower()}')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
@@ -0,0 +1,32 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+
+async def _aiter_chunks(chunks):
+    """
+    Iterator sync (cursor database, file) sebagai async generator: tiap
+    potong diambil lewat sync_to_async, jadi dikirim satu per satu.
+    thread_sensitive: semua potong dibaca di thread yang sama (koneksi DB
+    dan server-side cursor terikat ke thread).
+    """
+    pull = sync_to_async(next, thread_sensitive=True)
+    done = object()
+    try:
+        while (chunk := await pull(chunks, done)) is not done:
+            yield chunk
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            await sync_to_async(close, thread_sensitive=True)()
+
+
+def streaming_content(request, chunks):
+    """
+    Isi StreamingHttpResponse untuk server yang melayani request ini. Di
+    ASGI iterator sync dibaca Django sekaligus ke list sebelum dikirim,
+    jadi diberi versi async; di WSGI iterator sync tetap dipakai langsung.
+    """
+    chunks = iter(chunks)
+    if isinstance(request, ASGIRequest):
+        return _aiter_chunks(chunks)
+    return chunks
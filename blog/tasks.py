@@ -0,0 +1,46 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+
+_executor = None
+
+
+def get_executor():
+    """Thread pool background bersama untuk satu proses web/worker"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.BACKGROUND_THREADS,
+            thread_name_prefix='blog-task',
+        )
+    return _executor
+
+
+def _run_task(func, args):
+    # Thread pool memakai koneksi DB sendiri; tutup supaya tidak bocor
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+def submit(func, *args):
+    """Jalankan func(*args) di thread pool; return Future"""
+    return get_executor().submit(_run_task, func, args)
+
+
+def run_after_commit(mode, func, *args):
+    """
+    Jadwalkan func(*args) setelah transaksi commit.
+
+    mode 'thread' - thread pool di proses ini
+    mode 'sync'   - langsung di thread ini (test)
+    mode lainnya ('worker') - tidak dijadwalkan; diambil oleh management command
+    """
+    if mode == 'thread':
+        transaction.on_commit(lambda: submit(func, *args))
+    elif mode == 'sync':
+        transaction.on_commit(lambda: func(*args))
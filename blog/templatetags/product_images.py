@@ -0,0 +1,34 @@
+from django import template
+
+from blog.images import image_sources, image_srcset, product_image_url
+
+
+register = template.Library()
+
+
+@register.inclusion_tag('blog/partials/product_picture.html')
+def product_picture(product, sizes='100vw', width=640, css_class='', loading='lazy'):
+    """
+    <picture> responsif untuk gambar produk:
+    {% product_picture product sizes="60px" width=60 css_class="order-item-image" %}
+    """
+    variants = product.image_variants or {}
+    current = product.image and variants.get('source') == product.image.name
+    return {
+        'product': product,
+        'src': product_image_url(product, width=width),
+        'srcset': image_srcset(variants) if current else '',
+        'sources': image_sources(variants) if current else [],
+        'sizes': sizes,
+        'css_class': css_class,
+        'loading': loading,
+    }
+
+
+@register.filter
+def srcset(product, ext='jpg'):
+    """{{ product|srcset:'webp' }} -> 'url 160w, url 320w, ...'"""
+    variants = product.image_variants or {}
+    if not product.image or variants.get('source') != product.image.name:
+        return ''
+    return image_srcset(variants, ext)
@@ -1,3 +1,1171 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import logging
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
\ No newline at end of file
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import AsyncRequestFactory, LiveServerTestCase, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from config.asgi import PathRouter
+
+from .accounts import EmailOrUsernameBackend, email_taken
+from .analytics import rebuild_rollups
+from .checkout import SHIPPING_COST, CheckoutError, parse_cart, place_order
+from .exports import EXPORT_COLUMNS, iter_lines, order_lines, streaming_export
+from .instrumentation import BackgroundStreamHandler
+from .mail import REDACTED_BODY, enqueue_email, enqueue_password_reset, send_pending_emails
+from .media import IMMUTABLE_CACHE_CONTROL, parse_range
+from .models import (
+    Category, DailyProductSales, DailySales, Order, OrderItem, OutgoingEmail, Payment, PaymentNotification, Product,
+    StockReservation, Wishlist,
+)
+from .order_ids import (
+    SnowflakeGenerator, decode, encode, legacy_order_id, order_id_created_at, snowflake_order_id,
+)
+from .orders import SESSION_ORDERS_KEY, decode_cursor, encode_cursor
+from .payment_status import payment_status_events, publish_payment_status, stream_slots_available
+from .payments import dispatch_snap_token, request_snap_token
+from .prices import get_prices
+from .ratelimit import hit, rate_limit_stats
+from .reservations import release_expired_holds, transition_order
+from .storage import is_hashed_name
+from .webhooks import CONFLICT_ERROR, notification_signature
+from .wishlist import WishlistError, apply_wishlist_changes
+
+
+# Manifest static hanya ada setelah collectstatic; di test cukup storage biasa
+TEST_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class BlogTestCase(TestCase):
+    """Dasar semua test: gambar produk fallback memakai {% static %}, tanpa manifest"""
+
+
+ORDER_FIELDS = {
+    'full_name': 'Pembeli', 'address': 'Jl. Test', 'city': 'Bandung', 'postal_code': '40111',
+    'phone': '0800', 'payment_method': 'qris',
+}
+
+
+class CheckoutTest(BlogTestCase):
+    """place_order: stok tidak pernah minus, transaksi di-rollback kalau ada item yang kurang"""
+
+    def setUp(self):
+        self.shirt = Product.objects.create(name='Kaos', price=Decimal('50000'), stock=3)
+        self.hat = Product.objects.create(name='Topi', price=Decimal('25000'), stock=1)
+
+    def test_conflicting_checkouts_do_not_oversell(self):
+        place_order({str(self.shirt.pk): {'quantity': 2}}, **ORDER_FIELDS)
+        with self.assertRaisesMessage(CheckoutError, 'Stok Kaos tidak mencukupi'):
+            place_order({str(self.shirt.pk): {'quantity': 2}}, **ORDER_FIELDS)
+
+        self.shirt.refresh_from_db()
+        self.assertEqual(self.shirt.stock, 1)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_short_item_rolls_back_whole_order(self):
+        cart = {str(self.shirt.pk): {'quantity': 1}, str(self.hat.pk): {'quantity': 2}}
+        with self.assertRaises(CheckoutError):
+            place_order(cart, **ORDER_FIELDS)
+
+        self.assertEqual(Product.objects.get(pk=self.shirt.pk).stock, 3)
+        self.assertEqual(Product.objects.get(pk=self.hat.pk).stock, 1)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_client_price_is_ignored(self):
+        order, lines = place_order({str(self.shirt.pk): {'quantity': 1, 'price': 1}}, **ORDER_FIELDS)
+        self.assertEqual(lines[0]['price'], Decimal('50000'))
+        self.assertEqual(order.total_amount, Decimal('50000') + SHIPPING_COST)
+
+    @override_settings(RATE_LIMIT_ENABLED=False)
+    def test_cart_data_must_be_an_object(self):
+        for cart_json in ('[1]', '"x"', '1'):
+            with self.subTest(cart_data=cart_json):
+                response = self.client.post(reverse('process_payment'), {**ORDER_FIELDS, 'cart_data': cart_json})
+                self.assertEqual(response.status_code, 400)
+        with self.assertRaises(CheckoutError):
+            parse_cart([1])
+
+
+def create_pending_order(product, quantity=1, **payment_fields):
+    """Order pending + Payment, seperti hasil process_payment"""
+    order, _ = place_order({str(product.pk): {'quantity': quantity}}, **ORDER_FIELDS)
+    payment = Payment.objects.create(
+        order=order, payment_method='qris', transaction_id=order.order_id, amount=order.total_amount,
+        status='pending', token_status='pending', **payment_fields,
+    )
+    return order, payment
+
+
+@override_settings(PAYMENT_GATEWAY='blog.gateway.StubGateway', SNAP_TOKEN_DISPATCH='sync', SNAP_TOKEN_MAX_ATTEMPTS=2)
+class SnapTokenTest(BlogTestCase):
+    """Snap token: satu percobaan setelah commit, percobaan ulang oleh worker"""
+
+    def setUp(self):
+        self.product = Product.objects.create(name='Kaos', price=Decimal('50000'), stock=5)
+
+    def test_failed_attempt_is_retried_by_worker_then_cancelled(self):
+        with mock.patch('blog.gateway.StubGateway.create_transaction', side_effect=OSError('down')):
+            with self.captureOnCommitCallbacks(execute=True):
+                order, payment = create_pending_order(self.product, 2)
+                dispatch_snap_token(payment.pk)
+            payment.refresh_from_db()
+            self.assertEqual((payment.token_status, payment.token_attempts, payment.token_error), ('pending', 1, 'down'))
+
+            self.assertEqual(request_snap_token(payment.pk), 'failed')
+        order.refresh_from_db()
+        self.product.refresh_from_db()
+        self.assertEqual(order.status, 'cancelled')
+        self.assertEqual(self.product.stock, 5)
+
+    def test_token_ready(self):
+        order, payment = create_pending_order(self.product)
+        self.assertEqual(request_snap_token(payment.pk), 'ready')
+        # Sudah diklaim: tidak memanggil gateway lagi
+        with mock.patch('blog.gateway.StubGateway.create_transaction') as create:
+            self.assertEqual(request_snap_token(payment.pk), 'ready')
+        create.assert_not_called()
+
+
+def midtrans_notification(order, transaction_status, transaction_id='TRX-1', gross_amount=None):
+    """Payload webhook Midtrans dengan signature_key yang benar"""
+    gross_amount = gross_amount or '%.2f' % order.total_amount
+    return {
+        'order_id': order.order_id,
+        'transaction_id': transaction_id,
+        'transaction_status': transaction_status,
+        'fraud_status': 'accept',
+        'status_code': '200',
+        'gross_amount': gross_amount,
+        'signature_key': notification_signature(order.order_id, '200', gross_amount),
+    }
+
+
+@override_settings(PAYMENT_NOTIFICATION_DISPATCH='sync', EMAIL_DISPATCH='worker', MIDTRANS_SERVER_KEY='test-key')
+class PaymentNotificationTest(BlogTestCase):
+    """Webhook Midtrans: signature dicek, retry tidak dobel, urutan status terjaga"""
+
+    def setUp(self):
+        self.product = Product.objects.create(name='Kaos', price=Decimal('50000'), stock=5)
+        self.order, self.payment = create_pending_order(self.product, 2)
+
+    def notify(self, notification):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                reverse('payment_notification'), json.dumps(notification), content_type='application/json',
+            )
+
+    def assert_order(self, order_status, payment_status, stock):
+        self.order.refresh_from_db()
+        self.payment.refresh_from_db()
+        self.product.refresh_from_db()
+        self.assertEqual((self.order.status, self.payment.status, self.product.stock), (order_status, payment_status, stock))
+
+    def test_retried_notification_is_applied_once(self):
+        notification = midtrans_notification(self.order, 'settlement')
+        self.assertEqual(self.notify(notification).json(), {'status': 'success', 'duplicate': False})
+        self.assertEqual(self.notify(notification).json(), {'status': 'success', 'duplicate': True})
+
+        self.assertEqual(PaymentNotification.objects.get().state, 'done')
+        self.assert_order('paid', 'success', 3)
+        self.assertEqual(StockReservation.objects.get().state, 'committed')
+
+    def test_bad_signature_or_amount_is_rejected(self):
+        forged = {**midtrans_notification(self.order, 'settlement'), 'signature_key': 'x' * 128}
+        self.assertEqual(self.notify(forged).status_code, 403)
+        # Signature benar, tapi jumlahnya bukan total order
+        wrong_amount = midtrans_notification(self.order, 'settlement', gross_amount='1000.00')
+        self.assertEqual(self.notify(wrong_amount).status_code, 403)
+
+        self.assertFalse(PaymentNotification.objects.exists())
+        self.assert_order('pending', 'pending', 3)
+
+    def test_late_pending_does_not_undo_payment(self):
+        self.notify(midtrans_notification(self.order, 'settlement'))
+        self.notify(midtrans_notification(self.order, 'pending'))
+        self.notify(midtrans_notification(self.order, 'expire'))
+
+        self.assert_order('paid', 'success', 3)
+        self.assertEqual(
+            list(PaymentNotification.objects.order_by('id').values_list('transaction_status', 'state')),
+            [('settlement', 'done'), ('pending', 'skipped'), ('expire', 'skipped')],
+        )
+
+    def test_settlement_after_cancel_is_a_conflict(self):
+        self.notify(midtrans_notification(self.order, 'expire'))
+        self.assert_order('cancelled', 'failed', 5)
+
+        with self.assertLogs('blog.webhooks', 'ERROR'):
+            self.notify(midtrans_notification(self.order, 'settlement', transaction_id='TRX-2'))
+
+        self.assert_order('cancelled', 'failed', 5)
+        conflict = PaymentNotification.objects.get(transaction_status='settlement')
+        self.assertEqual((conflict.state, conflict.error), ('conflict', CONFLICT_ERROR))
+
+
+class PaymentStatusPollingTest(BlogTestCase):
+    """Polling status pembayaran: ETag / 304, cache diperbarui saat status berubah"""
+
+    def setUp(self):
+        cache.clear()
+        self.order, self.payment = create_pending_order(Product.objects.create(name='Kaos', price=Decimal('50000'), stock=5))
+        self.url = reverse('check_payment_status', kwargs={'order_id': self.order.order_id})
+        session = self.client.session
+        session[SESSION_ORDERS_KEY] = [self.order.order_id]
+        session.save()
+
+    def test_etag_and_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'pending')
+        etag = response['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        Payment.objects.filter(pk=self.payment.pk).update(status='success')
+        Order.objects.filter(pk=self.order.pk).update(status='paid')
+        publish_payment_status(self.order.order_id)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'success')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_published_status_uses_short_ttl(self):
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            publish_payment_status(self.order.order_id)
+        self.assertEqual(cache_set.call_args.args[2], settings.PAYMENT_STATUS_CACHE_TIMEOUT)
+
+    def test_unknown_order(self):
+        response = self.client.get(reverse('check_payment_status', kwargs={'order_id': 'ORD-UNKNOWN'}))
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(PAYMENT_STATUS_STREAM_INTERVAL=1.0, PAYMENT_STATUS_STREAM_MAX_INTERVAL=3.0)
+    async def test_stream_backs_off_while_unchanged(self):
+        intervals = []
+        final = {'status': 'success', 'order_status': 'paid', 'paid_at': None}
+
+        async def sleep(seconds):
+            intervals.append(seconds)
+            if len(intervals) == 4:
+                await cache.aset(f'payment-status:{self.order.order_id}', final)
+
+        with mock.patch('blog.payment_status.asyncio.sleep', sleep):
+            events = [event async for event in payment_status_events(self.order.order_id)]
+
+        self.assertEqual(intervals, [1.0, 1.5, 2.25, 3.0])
+        self.assertEqual([event.split('\n')[0] for event in events[1:]], ['event: status', 'event: status'])
+        self.assertTrue(stream_slots_available())
+
+    @override_settings(PAYMENT_STATUS_MAX_STREAMS=0)
+    def test_stream_limit_falls_back_to_polling(self):
+        response = self.client.get(reverse('payment_status_stream', kwargs={'order_id': self.order.order_id}))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '30')
+
+
+@override_settings(
+    PAYMENT_GATEWAY='blog.gateway.StubGateway', SNAP_TOKEN_DISPATCH='sync', EMAIL_DISPATCH='worker',
+    RATE_LIMIT_ENABLED=False, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class OrderAccessTest(BlogTestCase):
+    """Order ID bisa ditebak: konfirmasi, status dan Snap token hanya untuk pembuat order"""
+
+    def setUp(self):
+        product = Product.objects.create(name='Kaos', price=Decimal('50000'), stock=5)
+        cart = json.dumps({str(product.pk): {'quantity': 1}})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('process_payment'), {**ORDER_FIELDS, 'cart_data': cart})
+        self.order_id = Order.objects.get().order_id
+        self.urls = [
+            reverse(name, kwargs={'order_id': self.order_id})
+            for name in ('order_confirmation', 'check_payment_status', 'payment_status_stream', 'check_snap_token')
+        ]
+
+    def get(self, client, url):
+        response = client.get(url)
+        self.addCleanup(response.close)
+        return response.status_code
+
+    def test_other_session_gets_404(self):
+        guest = self.client_class()
+        other_user = self.client_class()
+        other_user.force_login(User.objects.create_user('lain', 'lain@example.com', 'password'))
+        for client in (guest, other_user):
+            for url in self.urls:
+                with self.subTest(url=url):
+                    self.assertEqual(self.get(client, url), 404)
+
+    def test_creator_owner_and_staff_can_view(self):
+        # Tamu yang checkout: lewat session; pemilik (login di perangkat lain) lewat Order.user
+        user = User.objects.create_user('budi', 'budi@example.com', 'password')
+        Order.objects.filter(order_id=self.order_id).update(user=user)
+        owner = self.client_class()
+        owner.force_login(user)
+        staff = self.client_class()
+        staff.force_login(User.objects.create_user('staf', password='password', is_staff=True))
+        for client in (self.client, owner, staff):
+            for url in self.urls:
+                with self.subTest(url=url):
+                    self.assertEqual(self.get(client, url), 200)
+
+
+class OrderHistoryApiTest(BlogTestCase):
+    """Riwayat pesanan: cursor keyset melewati semua order tepat sekali"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('budi', 'budi@example.com', 'password')
+        self.client.force_login(self.user)
+        orders = Order.objects.bulk_create([
+            Order(order_id=f'ORD-{i}', user=self.user, full_name='Budi', address='Jl. Test', city='Bandung',
+                  postal_code='40111', phone='0800', total_amount=Decimal('10000'))
+            for i in range(7)
+        ])
+        # Beberapa order dengan created_at yang sama: urutan ditentukan id
+        now = timezone.now()
+        for i, order in enumerate(orders):
+            Order.objects.filter(pk=order.pk).update(created_at=now - timedelta(minutes=i // 3))
+        self.expected = list(Order.objects.order_by('-created_at', '-id').values_list('order_id', flat=True))
+
+        products = [Product.objects.create(name=f'Produk {i}', price=Decimal('5000'), stock=10) for i in range(2)]
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, quantity=1, price=product.price)
+            for order in orders for product in products
+        ])
+
+    def test_cursor_round_trip(self):
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+            data = self.client.get(reverse('order_history_api'), params).json()
+            seen += [order['order_id'] for order in data['orders']]
+            cursor = data['next_cursor']
+            if cursor is None:
+                break
+            self.assertEqual(decode_cursor(cursor), decode_cursor(encode_cursor(Order.objects.get(order_id=seen[-1]))))
+        self.assertEqual(seen, self.expected)
+
+    def test_cursor_stable_across_equal_timestamps(self):
+        # Batas halaman jatuh di tengah order dengan created_at yang sama
+        Order.objects.filter(user=self.user).update(created_at=timezone.now())
+        expected = list(Order.objects.order_by('-id').values_list('order_id', flat=True))
+
+        first = self.client.get(reverse('order_history_api'), {'limit': 3}).json()
+        second = self.client.get(reverse('order_history_api'), {'limit': 3, 'cursor': first['next_cursor']}).json()
+        first_ids = [order['order_id'] for order in first['orders']]
+        second_ids = [order['order_id'] for order in second['orders']]
+        self.assertEqual(first_ids, expected[:3])
+        self.assertEqual(second_ids, expected[3:6])
+        self.assertEqual(first['orders'][-1]['created_at'], second['orders'][0]['created_at'])
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        # Session, user, order, item + produk (prefetch)
+        for limit in (1, 7):
+            with self.subTest(limit=limit):
+                with self.assertNumQueries(4):
+                    data = self.client.get(reverse('order_history_api'), {'limit': limit}).json()
+                self.assertEqual(len(data['orders']), limit)
+                self.assertEqual(len(data['orders'][0]['items']), 2)
+
+                with self.assertNumQueries(4):
+                    response = self.client.get(reverse('profile_orders'), {'limit': limit})
+                self.assertEqual(len(response.context['orders']), limit)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('order_history_api'), {'cursor': 'bukan-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+class HoldExpiryTest(BlogTestCase):
+    """Sweeper hold stok: order kadaluarsa dibatalkan dan stoknya kembali, sekali saja"""
+
+    def setUp(self):
+        self.product = Product.objects.create(name='Kaos', price=Decimal('50000'), stock=5)
+        self.expired_order, self.expired_payment = create_pending_order(
+            self.product, 2, expired_at=timezone.now() - timedelta(minutes=1),
+        )
+        self.active_order, _ = create_pending_order(self.product, 1, expired_at=timezone.now() + timedelta(minutes=30))
+
+    def test_expired_hold_restores_stock_once(self):
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock, 2)
+
+        self.assertEqual(release_expired_holds(), 1)
+        self.assertEqual(release_expired_holds(), 0)
+
+        self.product.refresh_from_db()
+        self.expired_order.refresh_from_db()
+        self.expired_payment.refresh_from_db()
+        self.assertEqual(self.product.stock, 4)
+        self.assertEqual((self.expired_order.status, self.expired_payment.status), ('cancelled', 'expired'))
+        self.assertEqual(
+            dict(StockReservation.objects.values_list('order__order_id', 'state')),
+            {self.expired_order.order_id: 'released', self.active_order.order_id: 'held'},
+        )
+        self.assertEqual(DailySales.objects.get().orders_cancelled, 1)
+
+    def sweep_queries(self, orders):
+        expired_at = timezone.now() - timedelta(minutes=1)
+        products = [Product.objects.create(name=f'Produk {i}', price=Decimal('10000'), stock=10) for i in range(orders)]
+        for product in products:
+            create_pending_order(product, 2, expired_at=expired_at)
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            released = release_expired_holds()
+        self.assertEqual(Product.objects.filter(pk__in=[p.pk for p in products], stock=10).count(), orders)
+        return released, len(queries)
+
+    def test_query_count_does_not_grow_with_batch(self):
+        cache.clear()
+        # Putaran pertama juga membuat baris rollup hari ini
+        self.assertEqual(self.sweep_queries(1)[0], 2)
+        small = self.sweep_queries(1)
+        large = self.sweep_queries(6)
+        self.assertEqual((small[0], large[0]), (1, 6))
+        self.assertEqual(small[1], large[1])
+        self.assertEqual(cache.get(f'payment-status:{self.expired_order.order_id}')['status'], 'expired')
+
+
+@override_settings(CART_MAX_LINES=2, CART_MAX_QUANTITY=5)
+class CartSyncTest(BlogTestCase):
+    """api/sync-cart/: batas jumlah baris dan quantity, tamu (session) dan user login (database)"""
+
+    def setUp(self):
+        self.products = [Product.objects.create(name=f'Produk {i}', price=Decimal('10000'), stock=10) for i in range(3)]
+
+    def sync(self, changes, **extra):
+        return self.client.post(
+            reverse('sync_cart'), json.dumps({'changes': changes, **extra}), content_type='application/json',
+        )
+
+    def cart(self):
+        return {item['product_id']: item['quantity'] for item in self.client.get(reverse('sync_cart')).json()['items']}
+
+    def check_limits(self):
+        first, second, third = (product.pk for product in self.products)
+
+        response = self.sync({first: 2, second: 1, 999999: 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total'], 30000 + int(SHIPPING_COST))
+        self.assertEqual(self.cart(), {first: 2, second: 1})
+
+        self.assertEqual(self.sync({third: 1}).status_code, 400)
+        self.assertEqual(self.sync({first: 6}).status_code, 400)
+        self.assertEqual(self.sync({first: -1}).status_code, 400)
+        self.assertEqual(self.sync([first]).status_code, 400)
+        self.assertEqual(self.cart(), {first: 2, second: 1})
+
+        # Quantity adalah jumlah akhir: dikirim ulang tidak menggandakan; 0 = hapus
+        self.sync({first: 3, second: 0})
+        self.sync({first: 3, third: 1})
+        self.assertEqual(self.cart(), {first: 3, third: 1})
+
+        self.sync({}, clear=True)
+        self.assertEqual(self.cart(), {})
+
+    def test_guest_cart(self):
+        self.check_limits()
+
+    def test_user_cart(self):
+        self.client.force_login(User.objects.create_user('budi', 'budi@example.com', 'password'))
+        self.check_limits()
+
+
+@override_settings(CATALOG_PAGE_SIZE=2)
+class CatalogCacheTest(BlogTestCase):
+    """Fragment katalog: query hanya saat cache kosong, tanpa stok, halaman dibatasi"""
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Baju')
+        self.products = [
+            Product.objects.create(name=f'Produk {i}', price=Decimal('10000'), stock=10, category=self.category)
+            for i in range(3)
+        ]
+
+    def get(self, **params):
+        response = self.client.get(reverse('products'), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_cached_fragment_runs_no_queries(self):
+        # Jumlah produk (kategori + total), satu halaman produk, daftar kategori
+        with self.assertNumQueries(4):
+            self.get()
+        with self.assertNumQueries(0):
+            self.get()
+        # Jumlah produk sudah di-cache, halaman lain cukup dua query
+        with self.assertNumQueries(2):
+            self.get(page=2)
+
+    def test_fragment_has_no_stock(self):
+        response = self.get()
+        script = response.content.decode().split('id="catalog-products-data" type="application/json">')[1]
+        products_data = json.loads(script.split('</script>')[0])
+        self.assertEqual(len(products_data), 2)
+        for data in products_data.values():
+            self.assertNotIn('stock', data)
+
+    def test_page_is_clamped_to_last_page(self):
+        self.assertContains(self.get(page=2), 'Halaman 2')
+        with self.assertNumQueries(0):
+            self.assertContains(self.get(page=999), 'Halaman 2')
+
+    def test_unknown_category_falls_back_to_all(self):
+        self.get()
+        with self.assertNumQueries(0):
+            self.get(category=self.category.pk + 100)
+
+        other = Category.objects.create(name='Topi')
+        self.assertContains(self.get(category=other.pk, page=5), 'Belum ada produk di kategori ini.')
+
+
+class PriceTableTest(BlogTestCase):
+    """Tabel harga server: dibaca dari cache, langsung basi saat Product disimpan"""
+
+    def test_product_save_invalidates_cached_price(self):
+        product = Product.objects.create(name='Kaos', price=Decimal('50000'), stock=5)
+        self.assertEqual(get_prices([product.pk])[product.pk]['price'], Decimal('50000'))
+        with self.assertNumQueries(0):
+            self.assertEqual(get_prices([product.pk])[product.pk]['price'], Decimal('50000'))
+
+        product.price = Decimal('45000')
+        product.save()
+        self.assertEqual(get_prices([product.pk])[product.pk]['price'], Decimal('45000'))
+
+        product_id = product.pk
+        product.delete()
+        self.assertEqual(get_prices([product_id]), {})
+
+
+class MediaRangeTest(BlogTestCase):
+    """Media: cache immutable untuk nama ber-hash, ETag / 304, Range (206) dan 416"""
+
+    CONTENT = b'0123456789abcdef'
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(
+            MEDIA_ROOT=media_root.name,
+            STORAGES={**TEST_STORAGES, 'default': {'BACKEND': 'blog.storage.HashedMediaStorage'}},
+        ))
+        self.name = default_storage.save('products/kaos.txt', ContentFile(self.CONTENT))
+        self.url = reverse('media_file', kwargs={'path': self.name})
+
+    def get(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        self.addCleanup(response.close)
+        return response
+
+    def test_full_file_is_immutable(self):
+        self.assertTrue(is_hashed_name(self.name))
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response), self.CONTENT)
+        self.assertEqual(response['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+        self.assertEqual(self.get(if_none_match=response['ETag']).status_code, 304)
+
+    def test_ranges(self):
+        response = self.get(range='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 2-5/{len(self.CONTENT)}')
+        self.assertEqual(b''.join(response), b'2345')
+
+        response = self.get(range='bytes=-3')
+        self.assertEqual((response.status_code, b''.join(response)), (206, b'def'))
+
+        # End melewati ukuran file dipotong; If-Range lama -> file utuh
+        self.assertEqual(b''.join(self.get(range='bytes=10-99')), b'abcdef')
+        self.assertEqual(self.get(range='bytes=2-5', if_range='"lama"').status_code, 200)
+
+    def test_unsatisfiable_range(self):
+        for header in ('bytes=16-', 'bytes=5-2', 'bytes=-0'):
+            with self.subTest(range=header):
+                response = self.get(range=header)
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response['Content-Range'], f'bytes */{len(self.CONTENT)}')
+        # Multi-range / satuan lain diabaikan: file utuh
+        self.assertIsNone(parse_range('bytes=0-1,4-5', 16))
+        self.assertEqual(self.get(range='items=0-1').status_code, 200)
+
+    async def test_asgi_response_is_async(self):
+        for headers, status, body in (({}, 200, self.CONTENT), ({'range': 'bytes=2-5'}, 206, b'2345')):
+            with self.subTest(**headers):
+                response = await self.async_client.get(self.url, headers=headers)
+                self.assertEqual(response.status_code, status)
+                self.assertTrue(response.is_async)
+                self.assertEqual(response['Content-Length'], str(len(body)))
+                self.assertEqual(b''.join([chunk async for chunk in response.streaming_content]), body)
+
+
+@override_settings(EMAIL_DISPATCH='worker')
+class OrderAdminStatusTest(BlogTestCase):
+    """Status order diubah manual di admin: efeknya sama dengan webhook / cancel user"""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.product = Product.objects.create(name='Kaos', price=Decimal('50000'), stock=5)
+        self.order, self.payment = create_pending_order(self.product, 2)
+
+    def change_status(self, status, expected_status_code=302):
+        item = self.order.items.get()
+        data = {
+            'user': '', 'status': status, 'payment_method': 'qris', 'total_amount': str(self.order.total_amount),
+            **{field: value for field, value in ORDER_FIELDS.items() if field != 'payment_method'},
+            'items-TOTAL_FORMS': '1', 'items-INITIAL_FORMS': '1', 'items-MIN_NUM_FORMS': '0',
+            'items-MAX_NUM_FORMS': '1000', 'items-0-id': str(item.pk), 'items-0-order': str(self.order.pk),
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('admin:blog_order_change', args=[self.order.pk]), data)
+        self.assertEqual(response.status_code, expected_status_code)
+        self.order.refresh_from_db()
+        self.payment.refresh_from_db()
+        self.product.refresh_from_db()
+        return response
+
+    def test_admin_cancel_restores_stock(self):
+        self.change_status('cancelled')
+
+        self.assertEqual((self.order.status, self.payment.status, self.product.stock), ('cancelled', 'cancelled', 5))
+        self.assertEqual(StockReservation.objects.get().state, 'released')
+        self.assertEqual(DailySales.objects.get().orders_cancelled, 1)
+        # Tidak lagi diambil sweeper hold
+        Payment.objects.filter(pk=self.payment.pk).update(expired_at=timezone.now())
+        self.assertEqual(release_expired_holds(), 0)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock, 5)
+
+    def test_admin_paid_commits_hold(self):
+        self.change_status('processing')
+
+        self.assertEqual((self.order.status, self.payment.status, self.product.stock), ('processing', 'success', 3))
+        self.assertIsNotNone(self.order.paid_at)
+        self.assertEqual(StockReservation.objects.get().state, 'committed')
+        self.assertEqual(DailySales.objects.get().orders_paid, 1)
+
+    def test_admin_cancels_paid_order(self):
+        self.change_status('paid')
+        self.change_status('shipped')
+        self.assertEqual((self.order.status, self.product.stock), ('shipped', 3))
+
+        self.change_status('cancelled')
+        self.assertEqual((self.order.status, self.payment.status, self.product.stock), ('cancelled', 'success', 5))
+        self.assertIsNotNone(self.order.cancelled_at)
+        self.assertEqual(StockReservation.objects.get().state, 'released')
+        sales = DailySales.objects.get()
+        self.assertEqual((sales.orders_paid, sales.orders_cancelled, sales.items_sold, sales.revenue), (0, 1, 0, 0))
+        self.assertFalse(DailyProductSales.objects.exclude(quantity=0).exists())
+
+        # Backfill menghasilkan angka yang sama
+        today = timezone.localdate()
+        rebuild_rollups(today, today + timedelta(days=1))
+        sales = DailySales.objects.get()
+        self.assertEqual((sales.orders_paid, sales.orders_cancelled, sales.revenue), (0, 1, 0))
+
+    def test_unsupported_transition_is_rejected(self):
+        self.change_status('cancelled')
+        response = self.change_status('paid', expected_status_code=200)
+        self.assertContains(response, 'tidak bisa diubah ke status ini')
+        self.assertEqual((self.order.status, self.product.stock), ('cancelled', 5))
+
+
+@override_settings(EMAIL_DISPATCH='worker')
+class SalesRollupTest(BlogTestCase):
+    """Rollup inkremental dan backfill rebuild_rollups menghasilkan angka yang sama"""
+
+    def test_rebuild_matches_incremental_after_later_edit(self):
+        product = Product.objects.create(name='Kaos', price=Decimal('50000'), stock=10)
+        paid_order, _ = create_pending_order(product, 2)
+        cancelled_order, _ = create_pending_order(product, 1)
+        cancelled_at = timezone.now() - timedelta(days=3)
+        with transaction.atomic():
+            transition_order(paid_order, 'paid', 'success')
+            transition_order(cancelled_order, 'cancelled', 'cancelled', now=cancelled_at)
+        # Diedit lagi belakangan (mis. catatan admin): tanggal rollup tidak boleh bergeser
+        Order.objects.filter(pk=cancelled_order.pk).update(updated_at=timezone.now())
+
+        def snapshot():
+            return sorted(DailySales.objects.values_list('date', 'orders_paid', 'orders_cancelled', 'items_sold', 'revenue'))
+
+        incremental = snapshot()
+        today = timezone.localdate()
+        rebuild_rollups(today - timedelta(days=7), today + timedelta(days=1))
+        self.assertEqual(snapshot(), incremental)
+        self.assertEqual(DailySales.objects.get(date=timezone.localdate(cancelled_at)).orders_cancelled, 1)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class EmailOrUsernameBackendTest(BlogTestCase):
+    """Login dengan username atau email; email unik tanpa membedakan huruf besar/kecil"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('budi', 'Budi@Example.com', 'rahasia-123')
+        self.backend = EmailOrUsernameBackend()
+
+    def test_login_by_username_or_email(self):
+        for identifier in ('budi', 'budi@example.com', 'BUDI@EXAMPLE.COM', ' Budi@Example.com '):
+            with self.subTest(identifier=identifier):
+                with self.assertNumQueries(1):
+                    self.assertEqual(self.backend.authenticate(None, username=identifier, password='rahasia-123'), self.user)
+        self.assertIsNone(self.backend.authenticate(None, username='budi', password='salah'))
+        self.assertIsNone(self.backend.authenticate(None, username='tidak@ada.com', password='rahasia-123'))
+
+    def test_exact_username_wins_over_email(self):
+        other = User.objects.create_user('budi@example.com', 'lain@example.com', 'password-lain')
+        self.assertEqual(self.backend.find_user('budi@example.com'), other)
+
+    def test_email_is_unique_case_insensitive(self):
+        self.assertTrue(email_taken('BUDI@example.COM'))
+        self.assertFalse(email_taken('budi@example.com', exclude_user=self.user))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create_user('budi2', 'budi@EXAMPLE.com', 'password')
+        # Email kosong boleh dipakai banyak akun
+        User.objects.create_user('tanpa-email-1', '', 'password')
+        User.objects.create_user('tanpa-email-2', '', 'password')
+
+    def test_register_rejects_email_in_other_case(self):
+        response = self.client.post(reverse('register'), {
+            'username': 'budi2', 'email': 'BUDI@example.com', 'password': 'rahasia-456', 'password2': 'rahasia-456',
+        })
+        self.assertContains(response, 'Email ini sudah dipakai.')
+        self.assertFalse(User.objects.filter(username='budi2').exists())
+
+
+@override_settings(
+    RATE_LIMIT_ENABLED=True,
+    RATE_LIMITS={**settings.RATE_LIMITS, 'login-ip': (10, 60), 'login-account': (3, 60)},
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class RateLimitTest(BlogTestCase):
+    """Rate limit login per akun dan per IP: request berlebih dijawab 429 sebelum cek password"""
+
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user('budi', 'budi@example.com', 'rahasia-123')
+
+    def login(self, username, password='salah'):
+        return self.client.post(reverse('login'), {'username': username, 'password': password})
+
+    def test_account_is_blocked_after_limit(self):
+        for _ in range(3):
+            self.assertEqual(self.login('budi').status_code, 200)
+
+        with mock.patch('blog.accounts.EmailOrUsernameBackend.authenticate') as authenticate:
+            response = self.login('BUDI', 'rahasia-123')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        authenticate.assert_not_called()
+
+        # Akun lain dari IP yang sama masih boleh, sampai batas per IP
+        self.assertEqual(self.login('siti').status_code, 200)
+        self.assertEqual(rate_limit_stats()['login-account'], {'allowed': 4, 'blocked': 1})
+
+    def test_sliding_window(self):
+        # Batas 3 per 60 detik: window sebelumnya ikut dihitung sesuai sisa waktunya
+        results = [hit('login-account', 'key', now=now)[0] for now in (0, 1, 2, 3)]
+        self.assertEqual(results, [True, True, True, False])
+        self.assertFalse(hit('login-account', 'key', now=61)[0])
+        self.assertTrue(hit('login-account', 'key', now=150)[0])
+
+
+class ProductSearchTest(BlogTestCase):
+    """Pencarian produk: nama > kategori > deskripsi, index ikut berubah dengan produk"""
+
+    def setUp(self):
+        cache.clear()
+        socks = Category.objects.create(name='Kaos Kaki')
+        self.name_match = Product.objects.create(name='Kaos Hitam Polos', price=Decimal('50000'))
+        self.category_match = Product.objects.create(name='Sepasang Motif', category=socks, price=Decimal('20000'))
+        self.description_match = Product.objects.create(
+            name='Kemeja Flanel', description='Lembut seperti kaos', price=Decimal('90000'),
+        )
+        Product.objects.create(name='Topi Rajut', price=Decimal('30000'))
+
+    def search(self, query):
+        response = self.client.get(reverse('product_search'), {'q': query})
+        return [result['id'] for result in response.json()['results']]
+
+    def test_ranking_and_prefix(self):
+        self.assertEqual(self.search('kaos'), [self.name_match.pk, self.category_match.pk, self.description_match.pk])
+        self.assertEqual(self.search('ka hit'), [self.name_match.pk])
+        self.assertEqual(self.search('k'), [])
+
+    def test_index_follows_product_and_category_changes(self):
+        self.assertEqual(self.search('kaos'), [self.name_match.pk, self.category_match.pk, self.description_match.pk])
+
+        self.name_match.name = 'Jaket Hitam'
+        self.name_match.save()
+        Category.objects.filter(pk=self.category_match.category_id).get().delete()
+        self.assertEqual(self.search('kaos'), [self.description_match.pk])
+        self.assertEqual(self.search('jaket'), [self.name_match.pk])
+
+        self.description_match.delete()
+        self.assertEqual(self.search('kaos'), [])
+
+
+class WishlistTest(BlogTestCase):
+    """Wishlist: request yang dikirim ulang tidak mengubah wishlist_count"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('budi', password='x')
+        self.shirt = Product.objects.create(name='Kaos', price=Decimal('50000'))
+        self.hat = Product.objects.create(name='Topi', price=Decimal('25000'))
+
+    def counts(self):
+        return list(Product.objects.order_by('pk').values_list('wishlist_count', flat=True))
+
+    def test_repeated_changes_are_counted_once(self):
+        for _ in range(2):
+            apply_wishlist_changes(self.user, add=[self.shirt.pk, self.hat.pk, 9999])
+        self.assertEqual(self.counts(), [1, 1])
+        self.assertEqual(Wishlist.objects.filter(user=self.user).count(), 2)
+
+        for _ in range(2):
+            apply_wishlist_changes(self.user, remove=[self.hat.pk])
+        self.assertEqual(self.counts(), [1, 0])
+
+        # Produk yang ditambah sekaligus dihapus dalam satu batch dianggap dihapus
+        apply_wishlist_changes(self.user, add=[self.hat.pk], remove=[self.hat.pk])
+        self.assertEqual(self.counts(), [1, 0])
+
+        self.user.delete()
+        self.assertEqual(self.counts(), [0, 0])
+
+    def test_api_resend_and_limit(self):
+        self.client.force_login(self.user)
+        for _ in range(2):
+            response = self.client.post(
+                reverse('sync_wishlist'), json.dumps({'add': [self.shirt.pk]}), content_type='application/json',
+            )
+            self.assertEqual([item['id'] for item in response.json()['items']], [self.shirt.pk])
+        self.assertEqual(self.counts(), [1, 0])
+
+        response = self.client.post(reverse('sync_wishlist'), '{"add": "x"}', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+        with override_settings(WISHLIST_MAX_ITEMS=1):
+            with self.assertRaises(WishlistError):
+                apply_wishlist_changes(self.user, add=[self.hat.pk])
+        self.assertEqual(self.counts(), [1, 0])
+
+
+class OrderIdTest(BlogTestCase):
+    """Order ID Snowflake: lebar tetap, urutan string = urutan waktu dibuat"""
+
+    def test_values_keep_increasing(self):
+        generator = SnowflakeGenerator(node=5)
+        # Jam berhenti lalu mundur, dan lebih dari 4096 id dalam satu milidetik
+        clock = [1_800_000_000.0] * 5000 + [1_799_999_999.0] * 10
+        with mock.patch('blog.order_ids.time.time', side_effect=clock):
+            values = [generator.next_value() for _ in clock]
+        self.assertEqual(values, sorted(set(values)))
+
+        codes = [encode(value) for value in values]
+        self.assertEqual(codes, sorted(codes))
+        self.assertEqual(decode(codes[-1]), values[-1])
+
+    def test_format_and_created_at(self):
+        before = timezone.now()
+        order_id = snowflake_order_id()
+        self.assertRegex(order_id, r'^ORD-[0-9A-HJKMNP-TV-Z]{13}$')
+        self.assertLess(order_id, snowflake_order_id())
+        self.assertLess(abs(order_id_created_at(order_id) - before), timedelta(seconds=1))
+
+        self.assertIsNone(order_id_created_at(legacy_order_id()))
+
+    def test_colliding_id_is_regenerated(self):
+        existing = Order.objects.create(total_amount=Decimal('10000'), **ORDER_FIELDS)
+        with mock.patch('blog.models.new_order_id', side_effect=[existing.order_id, 'ORD-NEW']):
+            order = Order.objects.create(total_amount=Decimal('10000'), **ORDER_FIELDS)
+        self.assertEqual(order.order_id, 'ORD-NEW')
+
+
+class ExportStreamingTest(BlogTestCase):
+    """Export order: di ASGI baris dibaca dari database sambil response dikirim"""
+
+    def setUp(self):
+        product = Product.objects.create(name='Kaos', price=Decimal('50000'), stock=10)
+        self.orders = [create_pending_order(product)[0] for _ in range(3)]
+
+    def tracked_rows(self, lines):
+        for row in iter_lines(lines):
+            self.pulled += 1
+            yield row
+
+    async def test_asgi_export_is_streamed(self):
+        self.pulled = 0
+        request = AsyncRequestFactory().get('/')
+        with mock.patch('blog.exports.iter_lines', self.tracked_rows):
+            response = streaming_export(request, order_lines(), 'csv')
+            self.assertTrue(response.is_async)
+
+            chunks = aiter(response.streaming_content)
+            header = await anext(chunks)
+            # Header sudah dikirim sebelum satu baris pun dibaca
+            self.assertEqual(self.pulled, 0)
+            body = [chunk async for chunk in chunks]
+
+        self.assertTrue(header.startswith(b'order_id,'))
+        self.assertEqual(self.pulled, 3)
+        self.assertEqual(b''.join(body).count(b'\n'), 3)
+        self.assertIn(self.orders[0].order_id.encode(), body[0])
+
+    def test_formula_cells_are_neutralised(self):
+        Order.objects.filter(pk=self.orders[0].pk).update(full_name='=HYPERLINK("http://x")', city='@SUM(A1)')
+        response = streaming_export(RequestFactory().get('/'), order_lines(), 'csv')
+        rows = list(csv.reader(b''.join(response).decode().splitlines()))
+        columns = [name for name, _ in EXPORT_COLUMNS]
+        first = dict(zip(columns, rows[1]))
+        self.assertEqual((first['full_name'], first['city']), ('\'=HYPERLINK("http://x")', "'@SUM(A1)"))
+        self.assertEqual(dict(zip(columns, rows[2]))['full_name'], 'Pembeli')
+
+    def test_wsgi_export_stays_sync(self):
+        response = streaming_export(RequestFactory().get('/'), order_lines(), 'csv')
+        self.assertFalse(response.is_async)
+        self.assertEqual(b''.join(response).count(b'\n'), 4)
+
+
+class PathRouterTest(BlogTestCase):
+    """config/asgi.py: endpoint lama terbuka ke Django ASGI, sisanya WSGI di thread pool"""
+
+    def setUp(self):
+        self.closed = []
+        self.asgi_paths = []
+        self.router = PathRouter(self.asgi_app, self.wsgi_app, ['/api/payment-status-stream/'], threads=1)
+        self.addCleanup(self.router.executor.shutdown)
+
+    async def asgi_app(self, scope, receive, send):
+        self.asgi_paths.append(scope['path'])
+
+    def wsgi_app(self, environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        if environ['PATH_INFO'] == '/stream/':
+            response = StreamingHttpResponse(iter([b'a', b'b']))
+        else:
+            response = HttpResponse(b'katalog')
+        response.close = lambda: self.closed.append(environ['PATH_INFO'])
+        return response
+
+    async def call(self, path):
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {'type': 'http', 'http_version': '1.1', 'method': 'GET', 'path': path, 'query_string': b'', 'headers': []}
+        await self.router(scope, receive, send)
+        return messages
+
+    async def test_routing_and_close(self):
+        messages = await self.call('/')
+        self.assertEqual([message['type'] for message in messages], ['http.response.start', 'http.response.body'])
+        self.assertEqual((messages[0]['status'], messages[1]['body']), (200, b'katalog'))
+
+        messages = await self.call('/stream/')
+        self.assertEqual(b''.join(message.get('body', b'') for message in messages[1:]), b'ab')
+        self.assertFalse(messages[-1].get('more_body'))
+        # close() -> signal request_finished (close_old_connections, metrics)
+        self.assertEqual(self.closed, ['/', '/stream/'])
+
+        self.assertEqual(await self.call('/api/payment-status-stream/ORD-1/'), [])
+        self.assertEqual(self.asgi_paths, ['/api/payment-status-stream/ORD-1/'])
+
+
+class BackgroundStreamHandlerTest(BlogTestCase):
+    """Handler log JSON: close() menulis sisa antrian dan menghentikan thread penulis"""
+
+    def test_close_flushes_and_joins(self):
+        with mock.patch('sys.stderr', io.StringIO()) as stderr:
+            handler = BackgroundStreamHandler()
+        thread = handler.listener._thread
+        record = logging.LogRecord('blog.test', logging.INFO, __file__, 0, 'halo', None, None)
+        for _ in range(100):
+            handler.handle(record)
+
+        handler.close()
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(stderr.getvalue().count('halo'), 100)
+        handler.close()
+
+    def test_disabled_under_tests(self):
+        self.assertEqual(settings.LOGGING['handlers']['background'], {'class': 'logging.NullHandler'})
+
+
+class AdminChangelistQueryBudgetTest(BlogTestCase):
+    """Jumlah query changelist admin tidak bertambah mengikuti jumlah baris"""
+
+    # Session, user, count, full count, baris, plus satu query untuk list_filter
+    QUERY_BUDGET = 6
+    MODELS = (Category, Product, Order, OrderItem, OutgoingEmail, Payment, PaymentNotification, StockReservation)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def create_rows(self, start, stop):
+        now = timezone.now()
+        categories = Category.objects.bulk_create(
+            [Category(name=f'Kategori {i}') for i in range(start, stop)]
+        )
+        products = Product.objects.bulk_create([
+            Product(category=categories[i - start], name=f'Produk {i}', price=Decimal('10000'), stock=10)
+            for i in range(start, stop)
+        ])
+        orders = Order.objects.bulk_create([
+            Order(
+                order_id=f'ORD-{i:08d}', user=self.admin_user, full_name=f'Pembeli {i}',
+                address='Jl. Test', city='Bandung', postal_code='40111', phone='0800',
+                total_amount=Decimal('10000'), created_at=now - timedelta(minutes=i),
+            )
+            for i in range(start, stop)
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=orders[i - start], product=products[i - start], quantity=1, price=Decimal('10000'))
+            for i in range(start, stop)
+        ])
+        Payment.objects.bulk_create([
+            Payment(order=orders[i - start], payment_method='qris', transaction_id=f'TRX-{i}', amount=Decimal('10000'))
+            for i in range(start, stop)
+        ])
+        PaymentNotification.objects.bulk_create([
+            PaymentNotification(dedupe_key=f'key-{i}', order_id=orders[i - start].order_id, transaction_status='settlement', payload={})
+            for i in range(start, stop)
+        ])
+        StockReservation.objects.bulk_create([
+            StockReservation(order=orders[i - start], product=products[i - start], quantity=1)
+            for i in range(start, stop)
+        ])
+        OutgoingEmail.objects.bulk_create([
+            OutgoingEmail(kind='order_confirmation', to=f'user{i}@example.com', subject=f'Pesanan {i}', body='...')
+            for i in range(start, stop)
+        ])
+
+    def changelist_queries(self, model):
+        url = reverse(f'admin:blog_{model._meta.model_name}_changelist')
+        with mock.patch.object(admin.site._registry[model], 'list_per_page', 100):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_budget_at_20_and_100_rows(self):
+        self.create_rows(0, 20)
+        at_20 = {model: self.changelist_queries(model) for model in self.MODELS}
+
+        self.create_rows(20, 100)
+        at_100 = {model: self.changelist_queries(model) for model in self.MODELS}
+
+        for model in self.MODELS:
+            with self.subTest(model=model.__name__):
+                self.assertLessEqual(at_20[model], self.QUERY_BUDGET)
+                self.assertEqual(at_100[model], at_20[model])
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', EMAIL_DISPATCH='worker')
+class OutgoingEmailTest(BlogTestCase):
+    """Outbox email dikirim worker, dengan retry + backoff"""
+
+    def test_worker_sends_due_emails_once(self):
+        enqueue_email('password_reset', 'a@example.com', 'Reset', 'Isi')
+        enqueue_email('order_confirmation', 'b@example.com', 'Pesanan', 'Isi', dedupe_key='order_confirmation:ORD-1')
+        self.assertIsNone(enqueue_email('order_confirmation', 'b@example.com', 'Pesanan', 'Isi', dedupe_key='order_confirmation:ORD-1'))
+
+        self.assertEqual(send_pending_emails(), (2, 2))
+        self.assertEqual(send_pending_emails(), (0, 0))
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['a@example.com', 'b@example.com'])
+        self.assertFalse(OutgoingEmail.objects.exclude(state='sent').exists())
+
+    @override_settings(EMAIL_MAX_ATTEMPTS=2, EMAIL_RETRY_DELAY=60)
+    def test_failed_send_is_retried_with_backoff(self):
+        email = enqueue_email('password_reset', 'a@example.com', 'Reset', 'Isi')
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('down')):
+            self.assertEqual(send_pending_emails(), (1, 0))
+        email.refresh_from_db()
+        self.assertEqual((email.state, email.attempts, email.error), ('pending', 1, 'down'))
+        self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=50))
+        # Belum jatuh tempo
+        self.assertEqual(send_pending_emails(), (0, 0))
+
+        OutgoingEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('down')):
+            send_pending_emails()
+        email.refresh_from_db()
+        self.assertEqual((email.state, email.attempts), ('failed', 2))
+        self.assertEqual(email.body, REDACTED_BODY)
+        self.assertEqual(mail.outbox, [])
+
+    def test_password_reset_link_is_not_kept(self):
+        user = User.objects.create_user('budi', 'budi@example.com', 'password')
+        link = 'https://example.com/password-reset-confirm/MQ/token-rahasia/'
+        email = enqueue_password_reset(user, link)
+        self.assertIn(link, email.body)
+
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        response = self.client.get(reverse('admin:blog_outgoingemail_change', args=[email.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'token-rahasia')
+
+        send_pending_emails()
+        email.refresh_from_db()
+        self.assertEqual((email.state, email.body), ('sent', REDACTED_BODY))
+        self.assertIn(link, mail.outbox[0].body)
+
+
+@override_settings(
+    STORAGES=TEST_STORAGES,
+    PAYMENT_GATEWAY='blog.gateway.StubGateway',
+    SNAP_TOKEN_DISPATCH='sync',
+    PAYMENT_NOTIFICATION_DISPATCH='sync',
+    EMAIL_DISPATCH='worker',
+    RATE_LIMIT_ENABLED=False,
+    METRICS_SERVER_TIMING=True,
+)
+class LoadTestHarnessTest(LiveServerTestCase):
+    """manage.py loadtest: alur belanja lengkap sampai lunas, hasil JSON"""
+
+    def test_flow_completes_and_reports_json(self):
+        with tempfile.NamedTemporaryFile(suffix='.json') as output:
+            call_command(
+                'loadtest', url=self.live_server_url, shoppers=1, iterations=2, products=3,
+                json_path=output.name, stdout=mock.MagicMock(),
+            )
+            with open(output.name) as f:
+                result = json.load(f)
+
+        self.assertEqual(result['flows']['completed'], 2)
+        self.assertEqual(result['flows']['failed'], 0)
+        for name in ('catalog', 'cart_get', 'cart_sync', 'checkout', 'status_poll', 'notification'):
+            with self.subTest(endpoint=name):
+                self.assertEqual(result['endpoints'][name]['error_rate'], 0)
+        self.assertGreater(result['endpoints']['checkout']['db_queries']['mean'], 0)
+        self.assertEqual(Order.objects.filter(full_name='Loadtest').count(), 0)
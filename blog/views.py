@@ -2,19 +2,56 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse, HttpResponse
-from django.utils import timezone
+from django.contrib.admin.views.decorators import staff_member_required
+from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie
+from django.http import Http404, JsonResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
 from django.conf import settings
-from django.core.mail import send_mail
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from django.contrib.auth.tokens import default_token_generator
 from django.urls import reverse
-import midtransclient
+from django.db import IntegrityError, transaction
+from django.core.paginator import Paginator
+from django.utils import timezone
+from django.utils.safestring import mark_safe
 import json
-from decimal import Decimal
-from .models import Order, OrderItem, Payment, Product
+import logging
+from asgiref.sync import sync_to_async
+from datetime import timedelta
+from .models import Order, Payment
+from .catalog import parse_catalog_params, render_catalog_fragment
+from .accounts import email_taken, normalize_email, users_by_email
+from .cart import CartError, apply_cart_changes, checkout_cart_data, get_cart_store, price_cart
+from .checkout import CheckoutError, place_order
+from .instrumentation import metrics
+from .mail import enqueue_order_confirmation, enqueue_password_reset
+from .media import media_response
+from .orders import (
+    acan_view_order,
+    can_view_order,
+    order_history_page,
+    order_stats,
+    parse_page_size,
+    parse_status_filter,
+    remember_order,
+    serialize_order,
+    user_orders,
+)
+from .payments import dispatch_snap_token
+from .ratelimit import client_ip, post_field, rate_limit, rate_limit_stats, user_or_session
+from .reservations import transition_order
+from .search import search_products
+from .webhooks import InvalidNotification, enqueue_notification, verify_notification
+from .wishlist import WishlistError, apply_wishlist_changes, parse_ids, wishlist_items
+from .payment_status import (
+    aget_payment_status,
+    payment_status_events,
+    status_etag,
+    stream_slots_available,
+)
+
+
+checkout_logger = logging.getLogger('blog.checkout')
 
 
 # ========================================
@@ -22,7 +59,24 @@ from .models import Order, OrderItem, Payment, Product
 # ========================================
 
 def catalog_view(request):
-    return render(request, 'blog/catalog.html')
+    """Katalog dari database: paginasi, filter kategori, urutan, fragment cache"""
+    category_id, sort, page = parse_catalog_params(request.GET)
+    context = {
+        'catalog_html': mark_safe(render_catalog_fragment(category_id, sort, page)),
+    }
+    return render(request, 'blog/catalog.html', context)
+
+
+def product_search(request):
+    """Typeahead pencarian produk: hasil terurut relevansi (JSON)"""
+    try:
+        limit = min(max(int(request.GET.get('limit', 8)), 1), settings.SEARCH_MAX_RESULTS)
+    except ValueError:
+        limit = 8
+    query = request.GET.get('q', '')
+    response = JsonResponse({'query': query, 'results': search_products(query, limit)})
+    response['Cache-Control'] = 'public, max-age=30'
+    return response
 
 
 def cart_view(request):
@@ -51,14 +105,23 @@ def contact_page(request):
 
 
 def wishlist_page(request):
-    """Wishlist page"""
-    return render(request, 'blog/wishlist.html')
+    """Wishlist: user login dirender dari database, tamu dari localStorage"""
+    context = {}
+    if request.user.is_authenticated:
+        context['wishlist_items'] = wishlist_items(request.user)
+    return render(request, 'blog/wishlist.html', context)
 
 
 # ========================================
 # VIEWS AUTHENTICATION
 # ========================================
 
+def _login_limited(request, retry_after):
+    context = {'error': f'Terlalu banyak percobaan login. Coba lagi dalam {retry_after} detik.'}
+    return render(request, 'blog/login.html', context)
+
+
+@rate_limit(('login-ip', client_ip), ('login-account', post_field('username')), limited=_login_limited)
 def login_view(request):
     if request.user.is_authenticated:
         return redirect('home')
@@ -67,15 +130,9 @@ def login_view(request):
         username_or_email = request.POST.get('username')
         password_input = request.POST.get('password')
         
+        # Username atau email: blog.accounts.EmailOrUsernameBackend
         user = authenticate(request, username=username_or_email, password=password_input)
         
-        if user is None and '@' in username_or_email:
-            try:
-                user_obj = User.objects.get(email=username_or_email)
-                user = authenticate(request, username=user_obj.username, password=password_input)
-            except User.DoesNotExist:
-                user = None
-        
         if user is not None:
             login(request, user)
             return redirect('home')
@@ -92,7 +149,7 @@ def register_view(request):
 
     if request.method == 'POST':
         username_input = request.POST.get('username')
-        email_input = request.POST.get('email')
+        email_input = normalize_email(request.POST.get('email'))
         password_input = request.POST.get('password')
         password2_input = request.POST.get('password2')
 
@@ -104,16 +161,21 @@ def register_view(request):
             context = {'error': 'Username ini sudah dipakai.'}
             return render(request, 'blog/register.html', context)
         
-        if User.objects.filter(email=email_input).exists():
+        if email_taken(email_input):
             context = {'error': 'Email ini sudah dipakai.'}
             return render(request, 'blog/register.html', context)
             
-        user = User.objects.create_user(
-            username=username_input, 
-            email=email_input, 
-            password=password_input
-        )
-        user.save()
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(
+                    username=username_input, 
+                    email=email_input, 
+                    password=password_input
+                )
+        except IntegrityError:
+            # Dua pendaftaran bersamaan dengan username/email yang sama
+            context = {'error': 'Username atau email ini sudah dipakai.'}
+            return render(request, 'blog/register.html', context)
         
         login(request, user)
         return redirect('home')
@@ -130,15 +192,21 @@ def logout_view(request):
 # VIEWS PASSWORD RESET
 # ========================================
 
-def password_reset_view(request):
+def _password_reset_limited(request, retry_after):
+    context = {'error': 'Terlalu banyak permintaan reset password. Coba lagi nanti.'}
+    return render(request, 'blog/password_reset.html', context)
+
+
+@rate_limit(('password-reset-ip', client_ip), ('password-reset-account', post_field('email')),
+            limited=_password_reset_limited)
+async def password_reset_view(request):
     context = {}
     
     if request.method == 'POST':
         email = request.POST.get('email')
         
-        try:
-            user = User.objects.get(email=email)
-            
+        user = await users_by_email(email).afirst()
+        if user is not None:
             token = default_token_generator.make_token(user)
             uid = urlsafe_base64_encode(force_bytes(user.pk))
             
@@ -146,33 +214,15 @@ def password_reset_view(request):
                 reverse('password_reset_confirm', kwargs={'uidb64': uid, 'token': token})
             )
             
-            subject = 'Reset Password - Threeofkind.supply'
-            message = f'''
-Halo {user.username},
-
-Anda menerima email ini karena ada permintaan untuk reset password akun Anda di Threeofkind.supply.
-
-Klik link berikut untuk membuat password baru:
-{reset_link}
-
-Link ini akan kadaluarsa dalam 24 jam.
-
-Jika Anda tidak meminta reset password, abaikan email ini.
-
-Salam,
-Tim Threeofkind.supply
-            '''
-            
-            try:
-                send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [email], fail_silently=False)
-                context['success'] = 'Link reset password telah dikirim ke email Anda.'
-            except Exception as e:
-                context['error'] = 'Gagal mengirim email.'
+            # Dikirim worker outbox (blog/mail.py), bukan di dalam request
+            await sync_to_async(enqueue_password_reset)(user, reset_link)
+            context['success'] = 'Link reset password telah dikirim ke email Anda.'
             
-        except User.DoesNotExist:
+        else:
             context['success'] = 'Jika email terdaftar, link reset password telah dikirim.'
     
-    return render(request, 'blog/password_reset.html', context)
+    # Context processor membaca request.user (query session/user): tetap sync
+    return await sync_to_async(render)(request, 'blog/password_reset.html', context)
 
 
 def password_reset_confirm_view(request, uidb64, token):
@@ -215,52 +265,67 @@ def password_reset_confirm_view(request, uidb64, token):
 @login_required
 def profile_dashboard(request):
     """Dashboard profil user"""
-    status_filter = request.GET.get('status', 'all')
-    
-    if status_filter == 'all':
-        orders = Order.objects.filter(user=request.user).order_by('-created_at')
-    else:
-        orders = Order.objects.filter(user=request.user, status=status_filter).order_by('-created_at')
-    
-    total_orders = Order.objects.filter(user=request.user).count()
-    completed_orders = Order.objects.filter(user=request.user, status='delivered').count()
-    pending_orders = Order.objects.filter(user=request.user, status__in=['pending', 'paid', 'processing']).count()
-    
+    status_filter = parse_status_filter(request.GET.get('status', 'all'))
+
+    paginator = Paginator(user_orders(request.user, status_filter), settings.PROFILE_ORDERS_PAGE_SIZE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+
     context = {
-        'orders': orders,
+        'orders': page_obj.object_list,
+        'page_obj': page_obj,
         'status_filter': status_filter,
-        'total_orders': total_orders,
-        'completed_orders': completed_orders,
-        'pending_orders': pending_orders,
+        **order_stats(request.user),
     }
-    
+
     return render(request, 'blog/profile_dashboard.html', context)
 
 
 @login_required
 def profile_orders(request):
-    """Halaman daftar semua pesanan user"""
-    status_filter = request.GET.get('status', 'all')
-    
-    orders = Order.objects.filter(user=request.user).order_by('-created_at')
-    
-    if status_filter != 'all':
-        orders = orders.filter(status=status_filter)
-    
+    """Halaman riwayat pesanan user (keyset pagination, tombol 'Muat Lebih Banyak')"""
+    status_filter = parse_status_filter(request.GET.get('status', 'all'))
+
+    try:
+        orders, next_cursor = order_history_page(
+            request.user, status_filter, request.GET.get('cursor'), parse_page_size(request.GET.get('limit'))
+        )
+    except ValueError:
+        return redirect(f"{reverse('profile_orders')}?status={status_filter}")
+
     context = {
         'orders': orders,
         'status_filter': status_filter,
+        'next_cursor': next_cursor,
+        'is_first_page': not request.GET.get('cursor'),
     }
-    
+
     return render(request, 'blog/profile_orders.html', context)
 
 
+@login_required
+def order_history_api(request):
+    """API riwayat pesanan (JSON) dengan keyset pagination: ?status=&cursor=&limit="""
+    status_filter = parse_status_filter(request.GET.get('status', 'all'))
+
+    try:
+        orders, next_cursor = order_history_page(
+            request.user, status_filter, request.GET.get('cursor'), parse_page_size(request.GET.get('limit'))
+        )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    return JsonResponse({
+        'orders': [serialize_order(order) for order in orders],
+        'next_cursor': next_cursor,
+    })
+
+
 @login_required
 def profile_settings(request):
     """Halaman pengaturan profil user"""
     if request.method == 'POST':
         username = request.POST.get('username')
-        email = request.POST.get('email')
+        email = normalize_email(request.POST.get('email'))
         first_name = request.POST.get('first_name', '')
         last_name = request.POST.get('last_name', '')
         
@@ -269,8 +334,8 @@ def profile_settings(request):
                 context = {'error': 'Username sudah digunakan'}
                 return render(request, 'blog/profile_settings.html', context)
         
-        if email != request.user.email:
-            if User.objects.filter(email=email).exists():
+        if email.lower() != request.user.email.lower():
+            if email_taken(email, exclude_user=request.user):
                 context = {'error': 'Email sudah digunakan'}
                 return render(request, 'blog/profile_settings.html', context)
         
@@ -316,19 +381,15 @@ def payment_view(request):
         'grand_total': 10000
     }
     
-    print(f"[PAYMENT VIEW] Rendering payment page")
-    
     return render(request, 'blog/payment.html', context)
 
 
+@rate_limit(('payment-ip', client_ip), ('payment-user', user_or_session))
 def process_payment(request):
     """Process payment - FIXED VERSION"""
     if request.method != 'POST':
         return redirect('/')
     
-    print("[PROCESS PAYMENT] Starting...")
-    print(f"[PROCESS PAYMENT] POST data: {request.POST}")
-    
     # Data customer
     full_name = request.POST.get('full_name')
     address = request.POST.get('address')
@@ -339,192 +400,79 @@ def process_payment(request):
     
     # Cart data dari form
     cart_json = request.POST.get('cart_data', '{}')
-    print(f"[PROCESS PAYMENT] Cart JSON: {cart_json}")
     
     if not all([full_name, address, city, postal_code, phone, payment_method]):
-        print("[PROCESS PAYMENT] ERROR: Data tidak lengkap!")
+        checkout_logger.warning('checkout_rejected', extra={'fields': {'reason': 'incomplete'}})
         return JsonResponse({'error': 'Data tidak lengkap'}, status=400)
     
-    try:
-        cart_data = json.loads(cart_json)
-        print(f"[PROCESS PAYMENT] Cart data parsed: {cart_data}")
-    except json.JSONDecodeError as e:
-        print(f"[PROCESS PAYMENT] ERROR: Invalid JSON - {e}")
-        return JsonResponse({'error': 'Invalid cart data'}, status=400)
+    # Cart dari server (api/sync-cart/); cart_data dari form hanya untuk client lama
+    cart_store = get_cart_store(request)
+    server_cart = cart_store.load()
+    if server_cart:
+        cart_data = checkout_cart_data(server_cart)
+    else:
+        try:
+            cart_data = json.loads(cart_json)
+        except json.JSONDecodeError:
+            checkout_logger.warning('checkout_rejected', extra={'fields': {'reason': 'invalid_cart_json'}})
+            return JsonResponse({'error': 'Invalid cart data'}, status=400)
+        # JSON valid tapi bukan object ({"<product_id>": {...}}), mis. [1] atau "x"
+        if not isinstance(cart_data, dict):
+            checkout_logger.warning('checkout_rejected', extra={'fields': {'reason': 'invalid_cart_json'}})
+            return JsonResponse({'error': 'Invalid cart data'}, status=400)
     
     if not cart_data:
-        print("[PROCESS PAYMENT] ERROR: Cart kosong!")
+        checkout_logger.warning('checkout_rejected', extra={'fields': {'reason': 'empty_cart'}})
         return JsonResponse({'error': 'Cart kosong'}, status=400)
     
-    # Process cart items
-    total = Decimal('0.00')
-    order_items_data = []
-    
-    for product_id, item_data in cart_data.items():
-        try:
-            product = Product.objects.get(id=product_id)
-            quantity = item_data.get('quantity', 1)
-            
-            if product.stock < quantity:
-                return JsonResponse({'error': f'Stok {product.name} tidak mencukupi'}, status=400)
-            
-            price = Decimal(str(item_data.get('price', product.price)))
-            subtotal = price * quantity
-            total += subtotal
-            
-            order_items_data.append({
-                'product': product,
-                'quantity': quantity,
-                'price': price
-            })
-        except Product.DoesNotExist:
-            print(f"[PROCESS PAYMENT] Product {product_id} not found")
-            continue
-    
-    if not order_items_data:
-        return JsonResponse({'error': 'Tidak ada produk valid dalam cart'}, status=400)
-    
-    # Add shipping
-    shipping_cost = Decimal('10000')
-    total_with_shipping = total + shipping_cost
-    
-    # Create order
-    order = Order.objects.create(
-        user=request.user if request.user.is_authenticated else None,
-        full_name=full_name,
-        address=address,
-        city=city,
-        postal_code=postal_code,
-        phone=phone,
-        total_amount=total_with_shipping,
-        payment_method=payment_method,
-        status='pending'
-    )
-    
-    print(f"[PROCESS PAYMENT] Order created: {order.order_id}")
-    
-    # Create order items
-    for item_data in order_items_data:
-        OrderItem.objects.create(
-            order=order,
-            product=item_data['product'],
-            quantity=item_data['quantity'],
-            price=item_data['price']
-        )
-        
-        product = item_data['product']
-        product.stock -= item_data['quantity']
-        product.save()
-    
-    # Midtrans integration
-    snap = midtransclient.Snap(
-        is_production=settings.MIDTRANS_IS_PRODUCTION,
-        server_key=settings.MIDTRANS_SERVER_KEY,
-        client_key=settings.MIDTRANS_CLIENT_KEY
-    )
-    
-    transaction_details = {
-        'order_id': order.order_id,
-        'gross_amount': int(total_with_shipping)
-    }
-    
-    item_details = []
-    for item in order.items.all():
-        product_name = item.product.name[:50] if len(item.product.name) > 50 else item.product.name
-        
-        item_details.append({
-            'id': str(item.product.id),
-            'price': int(item.price),
-            'quantity': item.quantity,
-            'name': product_name
-        })
-    
-    item_details.append({
-        'id': 'SHIPPING',
-        'price': int(shipping_cost),
-        'quantity': 1,
-        'name': 'Biaya Pengiriman'
-    })
-    
-    if request.user.is_authenticated and request.user.email:
-        customer_email = request.user.email
-    else:
-        customer_email = 'customer@threeofkind.supply'
-    
-    customer_details = {
-        'first_name': full_name,
-        'email': customer_email,
-        'phone': phone,
-        'billing_address': {
-            'address': address,
-            'city': city,
-            'postal_code': postal_code,
-            'country_code': 'IDN'
-        },
-        'shipping_address': {
-            'address': address,
-            'city': city,
-            'postal_code': postal_code,
-            'country_code': 'IDN'
-        }
-    }
-    
-    enabled_payments = []
-    if payment_method == 'credit_card':
-        enabled_payments = ['credit_card']
-    elif payment_method == 'qris':
-        enabled_payments = ['qris']
-    elif payment_method == 'bank_transfer':
-        bank_choice = request.POST.get('bank_choice', 'bca')
-        enabled_payments = [f'{bank_choice}_va']
-    elif payment_method == 'e_wallet':
-        ewallet_choice = request.POST.get('ewallet_choice', 'gopay')
-        enabled_payments = [ewallet_choice]
-    
-    param = {
-        'transaction_details': transaction_details,
-        'item_details': item_details,
-        'customer_details': customer_details,
-        'enabled_payments': enabled_payments
-    }
-    
-    print(f"[PROCESS PAYMENT] Midtrans param: {json.dumps(param, indent=2)}")
-    
+    # Buat order + item + potong stok + payment dalam satu transaksi.
+    # Snap token dibuat di background setelah commit (blog/payments.py), jadi
+    # view ini tidak menunggu Midtrans dan tetap sync (transaksi ORM belum async).
     try:
-        print("[PROCESS PAYMENT] Creating Midtrans transaction...")
-        transaction = snap.create_transaction(param)
-        print(f"[PROCESS PAYMENT] SUCCESS! Token: {transaction.get('token')}")
-        
-        payment = Payment.objects.create(
-            order=order,
-            payment_method=payment_method,
-            transaction_id=order.order_id,
-            snap_token=transaction['token'],
-            redirect_url=transaction.get('redirect_url', ''),
-            amount=total_with_shipping,
-            status='pending',
-            bank_choice=request.POST.get('bank_choice') if payment_method == 'bank_transfer' else None,
-            ewallet_choice=request.POST.get('ewallet_choice') if payment_method == 'e_wallet' else None
-        )
-        
-        print(f"[PROCESS PAYMENT] Redirecting to confirmation...")
-        return redirect('order_confirmation', order_id=order.order_id)
+        with transaction.atomic():
+            order, order_lines = place_order(
+                cart_data,
+                user=request.user if request.user.is_authenticated else None,
+                full_name=full_name,
+                address=address,
+                city=city,
+                postal_code=postal_code,
+                phone=phone,
+                payment_method=payment_method,
+            )
             
-    except Exception as e:
-        print(f"[PROCESS PAYMENT] ERROR: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        
-        for item in order.items.all():
-            product = item.product
-            product.stock += item.quantity
-            product.save()
-        
-        order.delete()
-        return JsonResponse({'error': f'Gagal membuat transaksi: {str(e)}'}, status=500)
+            payment = Payment.objects.create(
+                order=order,
+                payment_method=payment_method,
+                transaction_id=order.order_id,
+                amount=order.total_amount,
+                status='pending',
+                token_status='pending',
+                expired_at=timezone.now() + timedelta(minutes=settings.STOCK_HOLD_MINUTES),
+                bank_choice=request.POST.get('bank_choice') if payment_method == 'bank_transfer' else None,
+                ewallet_choice=request.POST.get('ewallet_choice') if payment_method == 'e_wallet' else None
+            )
+            dispatch_snap_token(payment.pk)
+            enqueue_order_confirmation(order.order_id)
+    except CheckoutError as e:
+        checkout_logger.warning('checkout_rejected', extra={'fields': {'reason': 'checkout_error', 'error': str(e)}})
+        return JsonResponse({'error': str(e)}, status=400)
+
+    cart_store.clear()
+    remember_order(request, order.order_id)
+    # Tanpa data pelanggan (nama, alamat, telepon) di log
+    checkout_logger.info('order_created', extra={'fields': {
+        'order_id': order.order_id,
+        'items': len(order_lines),
+        'total': order.total_amount,
+        'payment_method': payment_method,
+    }})
+    return redirect('order_confirmation', order_id=order.order_id)
 
 
 def order_confirmation(request, order_id):
+    if not can_view_order(request, order_id):
+        raise Http404('Order not found')
     order = get_object_or_404(Order, order_id=order_id)
     payment = get_object_or_404(Payment, order=order)
     
@@ -533,7 +481,8 @@ def order_confirmation(request, order_id):
     context = {
         'order': order,
         'payment': payment,
-        'snap_token': snap_token,
+        'snap_token': snap_token or '',
+        'token_status': payment.token_status,
         'midtrans_client_key': settings.MIDTRANS_CLIENT_KEY,
         'is_production': settings.MIDTRANS_IS_PRODUCTION,
     }
@@ -542,64 +491,154 @@ def order_confirmation(request, order_id):
 
 
 @csrf_exempt
-def payment_notification(request):
+async def payment_notification(request):
+    """Webhook Midtrans: cek signature, simpan ke antrian lalu langsung ack (blog/webhooks.py)"""
     if request.method != 'POST':
         return HttpResponse(status=405)
     
     try:
         notification = json.loads(request.body)
-        
-        order_id = notification.get('order_id')
-        transaction_status = notification.get('transaction_status')
-        fraud_status = notification.get('fraud_status')
-        
-        payment = Payment.objects.get(transaction_id=order_id)
-        order = payment.order
-        
-        if transaction_status == 'capture':
-            if fraud_status == 'accept':
-                payment.status = 'success'
-                order.status = 'paid'
-                order.paid_at = timezone.now()
-        elif transaction_status == 'settlement':
-            payment.status = 'success'
-            order.status = 'paid'
-            order.paid_at = timezone.now()
-        elif transaction_status in ['cancel', 'deny', 'expire']:
-            payment.status = 'failed'
-            order.status = 'cancelled'
-            
-            for item in order.items.all():
-                product = item.product
-                product.stock += item.quantity
-                product.save()
-        elif transaction_status == 'pending':
-            payment.status = 'pending'
-            order.status = 'pending'
-        
-        payment.save()
-        order.save()
-        
-        return JsonResponse({'status': 'success'})
-        
-    except Payment.DoesNotExist:
-        return JsonResponse({'status': 'error', 'message': 'Payment not found'}, status=404)
-    except Exception as e:
-        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+    except json.JSONDecodeError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid JSON'}, status=400)
+    
+    if not isinstance(notification, dict) or not notification.get('order_id') or not notification.get('transaction_status'):
+        return JsonResponse({'status': 'error', 'message': 'Invalid notification'}, status=400)
+    
+    try:
+        await sync_to_async(verify_notification)(notification)
+    except InvalidNotification as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=403)
+    except Order.DoesNotExist:
+        return JsonResponse({'status': 'error', 'message': 'Order not found'}, status=404)
+    
+    queued, created = await sync_to_async(enqueue_notification)(notification)
+    return JsonResponse({'status': 'success', 'duplicate': not created})
 
 
-def check_payment_status(request, order_id):
-    try:
-        order = Order.objects.get(order_id=order_id)
-        payment = Payment.objects.get(order=order)
-        
-        return JsonResponse({
-            'status': payment.status,
-            'order_status': order.status,
-            'paid_at': order.paid_at.isoformat() if order.paid_at else None
-        })
-    except (Order.DoesNotExist, Payment.DoesNotExist):
+async def check_payment_status(request, order_id):
+    """Polling status pembayaran: dari cache, dengan ETag/304"""
+    if not await acan_view_order(request, order_id):
         return JsonResponse({'error': 'Order not found'}, status=404)
+    status = await aget_payment_status(order_id)
+    if status is None:
+        return JsonResponse({'error': 'Order not found'}, status=404)
+    
+    etag = status_etag(status)
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse(status)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+async def payment_status_stream(request, order_id):
+    """Server-Sent Events: browser diberi tahu begitu status pembayaran berubah"""
+    if not await acan_view_order(request, order_id):
+        return JsonResponse({'error': 'Order not found'}, status=404)
+    if not stream_slots_available():
+        # EventSource berhenti di 503; halaman beralih ke polling
+        return JsonResponse({'error': 'Too many streams'}, status=503, headers={'Retry-After': '30'})
+    response = StreamingHttpResponse(payment_status_events(order_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def check_snap_token(request, order_id):
+    """Dipoll halaman konfirmasi sampai Snap token selesai dibuat"""
+    if not await acan_view_order(request, order_id):
+        return JsonResponse({'error': 'Order not found'}, status=404)
+    payment = await Payment.objects.filter(order__order_id=order_id).values(
+        'token_status', 'snap_token', 'redirect_url'
+    ).afirst()
+    if payment is None:
+        return JsonResponse({'error': 'Order not found'}, status=404)
+    
+    return JsonResponse({
+        'token_status': payment['token_status'],
+        'snap_token': payment['snap_token'] if payment['token_status'] == 'ready' else None,
+        'redirect_url': payment['redirect_url'] if payment['token_status'] == 'ready' else None,
+    })
+
+
+@staff_member_required
+def ratelimit_stats(request):
+    """Monitoring: jumlah request diizinkan / ditolak per scope rate limit"""
+    return JsonResponse(rate_limit_stats())
+
+
+def metrics_view(request):
+    """Metrics Prometheus proses ini; staff, atau Authorization: Bearer METRICS_TOKEN"""
+    token = settings.METRICS_TOKEN
+    authorized = request.user.is_authenticated and request.user.is_staff
+    if token and request.headers.get('Authorization') == f'Bearer {token}':
+        authorized = True
+    if not authorized:
+        return HttpResponse(status=403)
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def media_file(request, path):
+    """File upload (MEDIA_URL): nama ber-hash di-cache immutable, mendukung Range"""
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponse(status=405, headers={'Allow': 'GET, HEAD'})
+    return media_response(request, path)
+
+
+@ensure_csrf_cookie
+def sync_cart(request):
+    """
+    Cart di server (session untuk tamu, database untuk user login).
+
+    GET  -> isi cart dengan harga dari server
+    POST -> {"changes": {"<product_id>": quantity, ...}, "clear": false}
+            quantity = jumlah akhir, 0 = hapus. Response sama dengan GET.
+    """
+    store = get_cart_store(request)
+
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body or '{}')
+            quantities = apply_cart_changes(store, data.get('changes', {}), clear=bool(data.get('clear')))
+        except (json.JSONDecodeError, AttributeError):
+            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        except CartError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+    elif request.method == 'GET':
+        quantities = store.load()
+    else:
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    return JsonResponse(price_cart(quantities))
+
+
+@ensure_csrf_cookie
+def sync_wishlist(request):
+    """
+    Wishlist user login (tamu: {"authenticated": false}, tetap di localStorage).
+
+    GET  -> isi wishlist
+    POST -> {"add": [product_id, ...], "remove": [product_id, ...]}; toggle
+            yang dikumpulkan client, atau seluruh wishlist lokal saat login.
+            Response sama dengan GET.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'authenticated': False, 'items': []})
+
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body or '{}')
+            apply_wishlist_changes(request.user, parse_ids(data.get('add', [])), parse_ids(data.get('remove', [])))
+        except (json.JSONDecodeError, AttributeError):
+            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        except WishlistError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+    elif request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    return JsonResponse({'authenticated': True, 'items': wishlist_items(request.user)})
 
 
 @login_required
@@ -614,24 +653,10 @@ def cancel_order(request, order_id):
         if request.user.is_authenticated and order.user != request.user:
             return JsonResponse({'error': 'Unauthorized'}, status=403)
         
-        if order.status != 'pending':
-            return JsonResponse({'error': 'Hanya pesanan pending yang bisa dibatalkan'}, status=400)
-        
-        for item in order.items.all():
-            product = item.product
-            product.stock += item.quantity
-            product.save()
-        
-        order.status = 'cancelled'
-        order.save()
-        
-        try:
-            payment = Payment.objects.get(order=order)
-            payment.status = 'cancelled'
-            payment.save()
-        except Payment.DoesNotExist:
-            pass
-        
+        with transaction.atomic():
+            if not transition_order(order, 'cancelled', 'cancelled'):
+                return JsonResponse({'error': 'Hanya pesanan pending yang bisa dibatalkan'}, status=400)
+
         return JsonResponse({
             'success': True,
             'message': 'Pesanan berhasil dibatalkan'
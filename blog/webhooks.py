@@ -0,0 +1,187 @@
+import hashlib
+import hmac
+import logging
+from concurrent.futures import wait
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Order, Payment, PaymentNotification
+from .reservations import transition_order
+from .tasks import run_after_commit, submit
+
+
+logger = logging.getLogger('blog.webhooks')
+
+# Status order yang sudah final: notifikasi yang datang terlambat diabaikan
+FINAL_ORDER_STATUSES = {'paid', 'processing', 'shipped', 'delivered', 'cancelled'}
+CONFLICT_ERROR = 'Dibayar setelah order dibatalkan: perlu refund / rekonsiliasi'
+
+
+class InvalidNotification(Exception):
+    """Notifikasi bukan dari Midtrans atau tidak cocok dengan order; dijawab 403"""
+
+
+def notification_signature(order_id, status_code, gross_amount):
+    """signature_key Midtrans: sha512(order_id + status_code + gross_amount + server key)"""
+    raw = f'{order_id}{status_code}{gross_amount}{settings.MIDTRANS_SERVER_KEY}'
+    return hashlib.sha512(raw.encode()).hexdigest()
+
+
+def verify_notification(notification):
+    """
+    Cek signature_key dan gross_amount sebelum notifikasi masuk antrian, jadi
+    request palsu tidak bisa menandai order lunas atau membanjiri antrian.
+    Raise InvalidNotification, atau Order.DoesNotExist kalau order tidak dikenal.
+    """
+    order_id = notification.get('order_id')
+    gross_amount = notification.get('gross_amount')
+    expected = notification_signature(order_id, notification.get('status_code'), gross_amount)
+    if not hmac.compare_digest(str(notification.get('signature_key') or ''), expected):
+        raise InvalidNotification('Invalid signature')
+
+    try:
+        amount = Decimal(str(gross_amount))
+    except InvalidOperation:
+        raise InvalidNotification('Invalid gross_amount')
+    total_amount = Order.objects.values_list('total_amount', flat=True).get(order_id=order_id)
+    if amount != total_amount:
+        raise InvalidNotification('gross_amount does not match order')
+
+
+def notification_dedupe_key(notification):
+    raw = '|'.join(str(notification.get(field) or '') for field in (
+        'order_id', 'transaction_id', 'transaction_status', 'fraud_status',
+    ))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def enqueue_notification(notification):
+    """
+    Simpan notifikasi ke antrian. Return (PaymentNotification, created).
+
+    Notifikasi yang sama persis (retry Midtrans) tidak masuk antrian dua kali:
+    unique index pada dedupe_key yang menolak duplikatnya.
+    """
+    dedupe_key = notification_dedupe_key(notification)
+    try:
+        with transaction.atomic():
+            queued = PaymentNotification.objects.create(
+                dedupe_key=dedupe_key,
+                order_id=str(notification.get('order_id') or '')[:100],
+                transaction_status=str(notification.get('transaction_status') or '')[:50],
+                fraud_status=str(notification.get('fraud_status') or '')[:50],
+                payload=notification,
+            )
+    except IntegrityError:
+        return PaymentNotification.objects.get(dedupe_key=dedupe_key), False
+
+    run_after_commit(settings.PAYMENT_NOTIFICATION_DISPATCH, process_notification, queued.pk)
+    return queued, True
+
+
+def resolve_transition(transaction_status, fraud_status):
+    """(payment.status, order.status) tujuan untuk satu notifikasi, atau None"""
+    if transaction_status == 'capture':
+        if fraud_status == 'accept':
+            return 'success', 'paid'
+        return None
+    if transaction_status == 'settlement':
+        return 'success', 'paid'
+    if transaction_status in ['cancel', 'deny', 'expire']:
+        return 'failed', 'cancelled'
+    if transaction_status == 'pending':
+        return 'pending', 'pending'
+    return None
+
+
+def apply_notification(order_id, transaction_status, fraud_status):
+    """
+    Terapkan satu notifikasi dalam satu transaksi dengan baris Payment di-lock.
+
+    Transisi hanya dari order yang belum final, jadi notifikasi expire/cancel
+    yang dikirim ulang tidak mengembalikan stok dua kali, dan 'pending' yang
+    datang terlambat tidak menimpa order yang sudah dibayar. Pembayaran
+    berhasil untuk order yang sudah dibatalkan (user, sweeper, admin) tidak
+    diterapkan tetapi dicatat sebagai 'conflict' untuk refund / rekonsiliasi.
+    Return 'done', 'skipped' atau 'conflict'; Payment.DoesNotExist kalau order
+    tidak dikenal.
+    """
+    transition = resolve_transition(transaction_status, fraud_status)
+
+    with transaction.atomic():
+        payment = Payment.objects.select_for_update().select_related('order').get(transaction_id=order_id)
+        order = payment.order
+
+        if transition is None:
+            return 'skipped'
+
+        payment_status, order_status = transition
+        if order.status in FINAL_ORDER_STATUSES:
+            if order_status == 'paid' and order.status == 'cancelled':
+                logger.error('payment_conflict', extra={'fields': {
+                    'order_id': order_id,
+                    'transaction_status': transaction_status,
+                    'payment_status': payment.status,
+                }})
+                return 'conflict'
+            return 'skipped'
+
+        if (payment.status, order.status) == (payment_status, order_status):
+            return 'skipped'
+
+        if not transition_order(order, order_status, payment_status):
+            return 'skipped'
+
+    return 'done'
+
+
+def process_notification(notification_id):
+    """Proses satu notifikasi dari antrian (thread pool atau worker)"""
+    queued = PaymentNotification.objects.filter(pk=notification_id, state='pending').first()
+    if queued is None:
+        return None
+
+    try:
+        state = apply_notification(queued.order_id, queued.transaction_status, queued.fraud_status)
+        error = CONFLICT_ERROR if state == 'conflict' else ''
+    except Payment.DoesNotExist:
+        state, error = 'failed', 'Payment not found'
+    except Exception as e:
+        state = 'failed' if queued.attempts + 1 >= settings.PAYMENT_NOTIFICATION_MAX_ATTEMPTS else 'pending'
+        error = str(e)[:255]
+
+    PaymentNotification.objects.filter(pk=notification_id, state='pending').update(
+        state=state,
+        error=error,
+        attempts=queued.attempts + 1,
+        processed_at=timezone.now() if state != 'pending' else None,
+    )
+    return state
+
+
+def process_pending_notifications(limit=200):
+    """
+    Satu putaran `manage.py process_notifications`.
+
+    Notifikasi diproses per order secara berurutan (urut id) supaya urutan
+    status dari Midtrans tetap terjaga; order yang berbeda diproses paralel.
+    Return jumlah notifikasi yang diproses.
+    """
+    pending = list(
+        PaymentNotification.objects.filter(state='pending')
+        .order_by('id')
+        .values_list('id', 'order_id')[:limit]
+    )
+    by_order = {}
+    for notification_id, order_id in pending:
+        by_order.setdefault(order_id, []).append(notification_id)
+
+    def process_in_order(notification_ids):
+        for notification_id in notification_ids:
+            process_notification(notification_id)
+
+    wait([submit(process_in_order, ids) for ids in by_order.values()])
+    return len(pending)
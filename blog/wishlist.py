@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+
+from .catalog import prepare_product
+from .models import Product, Wishlist
+
+
+class WishlistError(Exception):
+    """Perubahan wishlist tidak valid; pesan aman ditampilkan ke user"""
+
+
+def parse_ids(values):
+    if not isinstance(values, list):
+        raise WishlistError('Data wishlist tidak valid')
+    try:
+        return {int(value) for value in values}
+    except (TypeError, ValueError):
+        raise WishlistError('Data wishlist tidak valid')
+
+
+def _adjust_counts(product_ids, delta):
+    if product_ids:
+        Product.objects.filter(pk__in=product_ids).update(wishlist_count=F('wishlist_count') + delta)
+
+
+def apply_wishlist_changes(user, add=(), remove=()):
+    """
+    Satu batch perubahan wishlist (toggle yang dikumpulkan client, atau
+    seluruh wishlist localStorage saat pertama login) dalam satu transaksi.
+
+    Produk yang sudah ada / tidak ada di database diabaikan, jadi request yang
+    dikirim ulang tidak mengubah apa-apa. Product.wishlist_count ikut
+    dinaikkan/diturunkan dengan satu UPDATE per arah.
+    """
+    add, remove = set(add) - set(remove), set(remove)
+
+    with transaction.atomic():
+        # Request paralel dari user yang sama (dua tab / perangkat) diantrikan,
+        # supaya counter tidak dihitung dua kali untuk produk yang sama
+        User.objects.select_for_update().filter(pk=user.pk).exists()
+        current = set(Wishlist.objects.filter(user=user).values_list('product_id', flat=True))
+
+        removed = current & remove
+        if removed:
+            Wishlist.objects.filter(user=user, product_id__in=removed).delete()
+            _adjust_counts(removed, -1)
+
+        new = add - current
+        if new:
+            new = set(Product.objects.filter(pk__in=new).values_list('id', flat=True))
+        if len(current) - len(removed) + len(new) > settings.WISHLIST_MAX_ITEMS:
+            raise WishlistError(f'Maksimal {settings.WISHLIST_MAX_ITEMS} produk dalam wishlist')
+        if new:
+            Wishlist.objects.bulk_create([Wishlist(user=user, product_id=product_id) for product_id in new])
+            _adjust_counts(new, 1)
+
+
+def wishlist_items(user):
+    """Isi wishlist (terbaru dulu) untuk halaman dan API; satu query join produk"""
+    rows = (
+        Wishlist.objects.filter(user=user)
+        .select_related('product')
+        .order_by('-created_at', '-id')
+    )
+    items = []
+    for row in rows:
+        product = prepare_product(row.product)
+        items.append({
+            'id': product.id,
+            'name': product.name,
+            'price': int(product.price),
+            'originalPrice': int(product.original_price) if product.discount else None,
+            'image': product.image_url,
+            'stock': product.stock,
+        })
+    return items
+
+
+def release_user_wishlist(user_id):
+    """User dihapus: baris wishlist ikut terhapus (CASCADE), counter diturunkan dulu"""
+    _adjust_counts(list(Wishlist.objects.filter(user_id=user_id).values_list('product_id', flat=True)), -1)
@@ -3,14 +3,120 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Profil deployment (gunicorn + uvicorn worker, lihat Procfile):
+
+    gunicorn config.asgi:application -k uvicorn_worker.UvicornWorker --workers 2
+
+Hanya endpoint yang lama terbuka (settings.ASGI_PATH_PREFIXES: stream SSE
+status pembayaran, file media, export order di admin) yang dilayani Django
+ASGI: tidak memegang thread selama menunggu dan response dikirim per
+potong. Request lain (katalog, cart, checkout, polling) dijalankan sebagai
+WSGI di thread pool tetap (WSGI_THREADS per worker): jauh lebih murah
+daripada middleware sync di bawah ASGI (~15 perpindahan thread per request),
+dan tiap thread memakai ulang koneksi DB persisten (DATABASE_CONN_MAX_AGE).
+Koneksi DB yang dibuka request ASGI ditutup di akhir request.
+Perbandingan: `python manage.py bench_concurrency --path /`.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
 import os
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
 
-from django.core.asgi import get_asgi_application
+from asgiref.sync import AsyncToSync, ThreadSensitiveContext, sync_to_async
+from asgiref.wsgi import WsgiToAsgiInstance
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+from django.conf import settings  # noqa: E402
+from django.core.asgi import get_asgi_application  # noqa: E402
+from django.core.wsgi import get_wsgi_application  # noqa: E402
+from django.db import connections  # noqa: E402
+
+
+class WsgiInstance(WsgiToAsgiInstance):
+    """
+    Satu request WSGI di thread pool milik worker. Beda dengan asgiref:
+    response biasa dikirim dari event loop dalam satu kali lompat thread
+    (hanya response streaming yang dikirim per potong dari thread), dan
+    response selalu ditutup, jadi signal request_finished tetap jalan
+    (close_old_connections, metrics).
+    """
+
+    def __init__(self, wsgi_application, executor):
+        super().__init__(wsgi_application)
+        self.executor = executor
+
+    async def __call__(self, scope, receive, send):
+        self.scope = scope
+        with SpooledTemporaryFile(max_size=65536) as body:
+            while True:
+                message = await receive()
+                if message['type'] != 'http.request':
+                    return
+                body.write(message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+            self.sync_send = AsyncToSync(send)
+            messages = await sync_to_async(self.run_wsgi_app, thread_sensitive=False, executor=self.executor)(body)
+        for message in messages:
+            await send(message)
+
+    def run_wsgi_app(self, body):
+        """Pesan ASGI response biasa; response streaming langsung dikirim dari sini"""
+        try:
+            environ = self.build_environ(self.scope, body)
+        except ValueError:
+            # Header duplikat melebihi batas
+            return [{'type': 'http.response.start', 'status': 400, 'headers': []}, {'type': 'http.response.body'}]
+
+        response = self.wsgi_application(environ, self.start_response)
+        try:
+            if not getattr(response, 'streaming', False):
+                return [self.response_start, {'type': 'http.response.body', 'body': b''.join(response)}]
+            for output in response:
+                if not self.response_started:
+                    self.response_started = True
+                    self.sync_send(self.response_start)
+                self.sync_send({'type': 'http.response.body', 'body': output, 'more_body': True})
+        finally:
+            close = getattr(response, 'close', None)
+            if close is not None:
+                close()
+        if self.response_started:
+            return [{'type': 'http.response.body'}]
+        return [self.response_start, {'type': 'http.response.body'}]
+
+
+class PathRouter:
+    """Path dengan prefix di asgi_prefixes ke Django ASGI, sisanya ke WSGI"""
+
+    def __init__(self, asgi_application, wsgi_application, asgi_prefixes, threads):
+        self.asgi_application = asgi_application
+        self.wsgi_application = wsgi_application
+        self.asgi_prefixes = tuple(asgi_prefixes)
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and not scope['path'].startswith(self.asgi_prefixes):
+            await WsgiInstance(self.wsgi_application, self.executor)(scope, receive, send)
+            return
+
+        # Semua ORM sync dalam satu request ASGI jalan di satu thread milik
+        # context ini; koneksinya ditutup sebelum thread itu dibuang
+        async with ThreadSensitiveContext():
+            try:
+                await self.asgi_application(scope, receive, send)
+            finally:
+                await sync_to_async(connections.close_all)()
+
+
+application = PathRouter(
+    get_asgi_application(),
+    get_wsgi_application(),
+    settings.ASGI_PATH_PREFIXES,
+    settings.WSGI_THREADS,
+)
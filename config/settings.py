@@ -1,6 +1,7 @@
 import dj_database_url
 from pathlib import Path
 import os
+import sys
 from decouple import config
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -30,7 +31,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Tambahkan ini
+    # WhiteNoise yang juga bisa async (blog/middleware.py), supaya stack tetap async di ASGI
+    'blog.middleware.StaticFilesMiddleware',
+    'blog.instrumentation.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -63,10 +66,76 @@ WSGI_APPLICATION = 'config.wsgi.application'
 DATABASES = {
     'default': dj_database_url.config(
         default='sqlite:///db.sqlite3',
-        conn_max_age=600
+        # Persisten per thread WSGI (juga thread pool WSGI di config/asgi.py);
+        # request yang dilayani Django ASGI menutup koneksinya di akhir request
+        conn_max_age=config('DATABASE_CONN_MAX_AGE', default=600, cast=int)
     )
 }
 
+# config/asgi.py: hanya endpoint yang lama terbuka dilayani Django ASGI
+# (stream SSE, file media, export order di admin); sisanya WSGI di thread
+# pool per worker dengan koneksi DB persisten
+ASGI_PATH_PREFIXES = ['/api/payment-status-stream/', '/media/', '/admin/blog/order/']
+WSGI_THREADS = config('WSGI_THREADS', default=4, cast=int)
+
+# Cache - pakai Redis kalau REDIS_URL diset (wajib untuk multi-worker),
+# selain itu LocMem per-proses
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'threeofkind',
+        }
+    }
+
+# Katalog
+CATALOG_PAGE_SIZE = config('CATALOG_PAGE_SIZE', default=12, cast=int)
+CATALOG_CACHE_TIMEOUT = config('CATALOG_CACHE_TIMEOUT', default=600, cast=int)
+
+# Wishlist user login (blog/wishlist.py); tamu tetap di localStorage
+WISHLIST_MAX_ITEMS = 200
+
+# Pencarian produk (blog/search.py): FTS5 di SQLite, tsvector di PostgreSQL
+SEARCH_MAX_TERMS = 6
+SEARCH_MAX_RESULTS = 20
+SEARCH_RANK_CANDIDATES = config('SEARCH_RANK_CANDIDATES', default=1000, cast=int)
+SEARCH_LRU_SIZE = config('SEARCH_LRU_SIZE', default=512, cast=int)
+
+# Turunan gambar produk (blog/images.py): 'thread', 'worker' (manage.py regenerate_product_images) atau 'sync'
+PRODUCT_IMAGE_WIDTHS = [160, 320, 640, 960]
+PRODUCT_IMAGE_QUALITY = config('PRODUCT_IMAGE_QUALITY', default=80, cast=int)
+PRODUCT_IMAGE_DISPATCH = config('PRODUCT_IMAGE_DISPATCH', default='thread')
+
+# Tabel harga server (blog/prices.py): cache proses dicek ulang tiap PRICE_LOCAL_TTL detik
+PRICE_CACHE_TIMEOUT = config('PRICE_CACHE_TIMEOUT', default=3600, cast=int)
+PRICE_LOCAL_TTL = config('PRICE_LOCAL_TTL', default=5, cast=float)
+
+# Keranjang (api/sync-cart/)
+CART_MAX_LINES = config('CART_MAX_LINES', default=100, cast=int)
+CART_MAX_QUANTITY = config('CART_MAX_QUANTITY', default=99, cast=int)
+
+# Profil
+PROFILE_ORDERS_PAGE_SIZE = config('PROFILE_ORDERS_PAGE_SIZE', default=10, cast=int)
+ORDER_HISTORY_MAX_PAGE_SIZE = config('ORDER_HISTORY_MAX_PAGE_SIZE', default=50, cast=int)
+# Order milik session tamu (blog/orders.py:remember_order) yang masih bisa dibuka
+SESSION_ORDERS_MAX = config('SESSION_ORDERS_MAX', default=20, cast=int)
+
+# Dashboard analitik admin (blog/analytics.py): kecepatan jual dihitung dari
+# ANALYTICS_STOCK_WINDOW_DAYS hari terakhir; stok < ANALYTICS_STOCK_RISK_DAYS hari = berisiko
+ANALYTICS_STOCK_WINDOW_DAYS = config('ANALYTICS_STOCK_WINDOW_DAYS', default=14, cast=int)
+ANALYTICS_STOCK_RISK_DAYS = config('ANALYTICS_STOCK_RISK_DAYS', default=7, cast=int)
+
+# Export order (manage.py export_orders / action admin): baris per fetch dari cursor
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -85,18 +154,32 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Cache-Control untuk file media lama yang namanya belum ber-hash (detik)
+MEDIA_CACHE_MAX_AGE = config('MEDIA_CACHE_MAX_AGE', default=3600, cast=int)
+
+# Django 5.1+ hanya membaca STORAGES (STATICFILES_STORAGE diabaikan).
+# Static: nama ber-hash dari manifest collectstatic, jadi {% static %} tidak
+# perlu ?v=. Media: nama ber-hash dari isi file (blog/storage.py).
+STORAGES = {
+    'default': {
+        'BACKEND': 'blog.storage.HashedMediaStorage',
+    },
+    'staticfiles': {
+        'BACKEND': config('STATICFILES_BACKEND', default='whitenoise.storage.CompressedManifestStaticFilesStorage'),
+    },
+}
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Authentication
 AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',
+    # Pengganti ModelBackend: login dengan username atau email, satu query + satu hash
+    'blog.accounts.EmailOrUsernameBackend',
 ]
 
 # Login/Logout URLs
@@ -115,7 +198,9 @@ MESSAGE_TAGS = {
 }
 
 # Email Configuration
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# 'django.core.mail.backends.console.EmailBackend' / '...locmem.EmailBackend' untuk dev dan test
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=30, cast=int)
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
@@ -126,7 +211,91 @@ ADMIN_EMAIL = 'threeofkind1@gmail.com'
 
 PASSWORD_RESET_TIMEOUT = 86400
 
+# Outbox email (blog/mail.py): 'thread', 'worker' (manage.py send_queued_mail) atau 'sync'
+EMAIL_DISPATCH = config('EMAIL_DISPATCH', default='thread')
+EMAIL_MAX_ATTEMPTS = config('EMAIL_MAX_ATTEMPTS', default=6, cast=int)
+EMAIL_RETRY_DELAY = config('EMAIL_RETRY_DELAY', default=60, cast=int)
+EMAIL_SEND_LEASE = config('EMAIL_SEND_LEASE', default=300, cast=int)
+
 # Midtrans Configuration
 MIDTRANS_IS_PRODUCTION = config('MIDTRANS_IS_PRODUCTION', default=True, cast=bool)
 MIDTRANS_SERVER_KEY = config('MIDTRANS_SERVER_KEY', default='your-server-key')
-MIDTRANS_CLIENT_KEY = config('MIDTRANS_CLIENT_KEY', default='your-client-key')
\ No newline at end of file
+MIDTRANS_CLIENT_KEY = config('MIDTRANS_CLIENT_KEY', default='your-client-key')
+MIDTRANS_TIMEOUT = config('MIDTRANS_TIMEOUT', default=10, cast=int)
+
+# Thread pool untuk pekerjaan background di proses web (blog/tasks.py)
+BACKGROUND_THREADS = config('BACKGROUND_THREADS', default=4, cast=int)
+
+# Payment gateway: 'blog.gateway.StubGateway' untuk test / load test lokal
+PAYMENT_GATEWAY = config('PAYMENT_GATEWAY', default='blog.gateway.MidtransGateway')
+PAYMENT_STUB_LATENCY_MS = config('PAYMENT_STUB_LATENCY_MS', default=0, cast=int)
+
+# Snap token dibuat di luar request: 'thread', 'worker' (manage.py snap_worker) atau 'sync'.
+# Percobaan ulang setelah gagal selalu diambil snap_worker.
+SNAP_TOKEN_DISPATCH = config('SNAP_TOKEN_DISPATCH', default='thread')
+SNAP_TOKEN_MAX_ATTEMPTS = config('SNAP_TOKEN_MAX_ATTEMPTS', default=3, cast=int)
+
+# Generator order_id (blog/order_ids.py). Format lama: 'blog.order_ids.legacy_order_id'.
+# ORDER_ID_NODE: 0-1023, unik per proses; kosong = diturunkan dari hostname + pid
+ORDER_ID_GENERATOR = config('ORDER_ID_GENERATOR', default='blog.order_ids.snowflake_order_id')
+ORDER_ID_NODE = config('ORDER_ID_NODE', default=None, cast=lambda value: None if value in (None, '') else int(value))
+
+# Hold stok per order dilepas setelah Payment.expired_at (manage.py release_expired_holds)
+STOCK_HOLD_MINUTES = config('STOCK_HOLD_MINUTES', default=60, cast=int)
+
+# Webhook Midtrans diproses dari antrian: 'thread', 'worker' (manage.py process_notifications) atau 'sync'
+PAYMENT_NOTIFICATION_DISPATCH = config('PAYMENT_NOTIFICATION_DISPATCH', default='thread')
+PAYMENT_NOTIFICATION_MAX_ATTEMPTS = config('PAYMENT_NOTIFICATION_MAX_ATTEMPTS', default=5, cast=int)
+
+# Status pembayaran untuk halaman konfirmasi (polling + SSE). Juga TTL status
+# yang dipublish setelah berubah: tanpa REDIS_URL tiap proses punya cache sendiri,
+# jadi status di proses lain paling lama basi selama TTL ini
+PAYMENT_STATUS_CACHE_TIMEOUT = config('PAYMENT_STATUS_CACHE_TIMEOUT', default=5, cast=int)
+# Stream SSE mengecek cache tiap INTERVAL detik, melambat sampai MAX_INTERVAL
+# selama status tidak berubah. Di atas MAX_STREAMS per worker, halaman
+# konfirmasi memakai polling (check_payment_status, ETag)
+PAYMENT_STATUS_STREAM_INTERVAL = config('PAYMENT_STATUS_STREAM_INTERVAL', default=1.0, cast=float)
+PAYMENT_STATUS_STREAM_MAX_INTERVAL = config('PAYMENT_STATUS_STREAM_MAX_INTERVAL', default=10.0, cast=float)
+PAYMENT_STATUS_MAX_STREAMS = config('PAYMENT_STATUS_MAX_STREAMS', default=500, cast=int)
+PAYMENT_STATUS_STREAM_TIMEOUT = config('PAYMENT_STATUS_STREAM_TIMEOUT', default=600, cast=int)
+
+# Rate limit login / reset password / checkout (blog/ratelimit.py), disimpan di cache.
+# scope: (jumlah request, jendela detik). Multi-worker butuh REDIS_URL supaya hitungannya bersama.
+RATE_LIMIT_ENABLED = config('RATE_LIMIT_ENABLED', default=True, cast=bool)
+RATE_LIMIT_PROXY_COUNT = config('RATE_LIMIT_PROXY_COUNT', default=0, cast=int)
+RATE_LIMITS = {
+    'login-ip': (20, 5 * 60),
+    'login-account': (5, 5 * 60),
+    'password-reset-ip': (5, 60 * 60),
+    'password-reset-account': (3, 60 * 60),
+    'payment-ip': (30, 60),
+    'payment-user': (10, 60),
+}
+
+# Instrumentasi (blog/instrumentation.py): log JSON, metrics Prometheus di /metrics
+LOG_LEVEL = config('LOG_LEVEL', default='INFO')
+REQUEST_LOG_SAMPLE_RATE = config('REQUEST_LOG_SAMPLE_RATE', default=0.05, cast=float)
+REQUEST_LOG_SLOW_MS = config('REQUEST_LOG_SLOW_MS', default=1000, cast=int)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_STATSD_ADDR = config('METRICS_STATSD_ADDR', default='')
+METRICS_SERVER_TIMING = config('METRICS_SERVER_TIMING', default=DEBUG, cast=bool)
+TESTING = sys.argv[1:2] == ['test']
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'blog.instrumentation.JsonFormatter'},
+    },
+    'handlers': {
+        # Saat `manage.py test` log dibuang: tidak membanjiri output test dan
+        # tidak ada thread penulis yang tertinggal setelah test selesai
+        'background': (
+            {'class': 'logging.NullHandler'} if TESTING
+            else {'class': 'blog.instrumentation.BackgroundStreamHandler', 'formatter': 'json'}
+        ),
+    },
+    'loggers': {
+        'blog': {'handlers': ['background'], 'level': LOG_LEVEL, 'propagate': False},
+    },
+}
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from django.urls import path
+import re
+
+from django.urls import path, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from blog import views
@@ -37,10 +39,21 @@ urlpatterns = [
     
     # API
     path('api/check-payment-status/<str:order_id>/', views.check_payment_status, name='check_payment_status'),
+    path('api/payment-status-stream/<str:order_id>/', views.payment_status_stream, name='payment_status_stream'),
+    path('api/snap-token/<str:order_id>/', views.check_snap_token, name='check_snap_token'),
     path('api/cancel-order/<str:order_id>/', views.cancel_order, name='cancel_order'),
+    path('api/orders/', views.order_history_api, name='order_history_api'),
+    path('api/search/', views.product_search, name='product_search'),
+    path('api/sync-cart/', views.sync_cart, name='sync_cart'),
+    path('api/wishlist/', views.sync_wishlist, name='sync_wishlist'),
+    path('api/ratelimit-stats/', views.ratelimit_stats, name='ratelimit_stats'),
+    path('metrics', views.metrics_view, name='metrics'),
+]
+
+# Media files (juga di production: nama ber-hash, Cache-Control immutable)
+urlpatterns += [
+    re_path(r'^%s(?P<path>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')), views.media_file, name='media_file'),
 ]
 
-# Media files
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
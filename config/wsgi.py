@@ -3,6 +3,11 @@ WSGI config for config project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
 
+Produksi memakai config/asgi.py (lihat Procfile): aplikasi WSGI ini
+melayani semua path kecuali stream SSE, media dan export order, di thread
+pool per worker. Dijalankan langsung di server WSGI, stream SSE status
+pembayaran tidak bisa dilayani (async generator).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 """
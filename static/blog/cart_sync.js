@@ -0,0 +1,123 @@
+// Sinkronisasi cart localStorage <-> server (api/sync-cart/, blog/cart.py).
+// localStorage tetap dipakai untuk render cepat; harga dan total dari server.
+// Yang dikirim hanya produk yang berubah sejak sinkronisasi terakhir.
+const CartSync = (function() {
+    const CART_KEY = 'cart';
+    const SYNCED_KEY = 'cart_synced';
+    const listeners = [];
+    let pending = {};
+    let timer = null;
+
+    function getCookie(name) {
+        const match = document.cookie.split(';').map(c => c.trim()).find(c => c.startsWith(name + '='));
+        return match ? decodeURIComponent(match.substring(name.length + 1)) : null;
+    }
+
+    function readJSON(key, fallback) {
+        try {
+            return JSON.parse(localStorage.getItem(key)) || fallback;
+        } catch (e) {
+            return fallback;
+        }
+    }
+
+    function quantities(cart) {
+        const result = {};
+        cart.forEach(item => {
+            result[item.productId] = (result[item.productId] || 0) + item.quantity;
+        });
+        return result;
+    }
+
+    function request(method, body, keepalive) {
+        return fetch('/api/sync-cart/', {
+            method: method,
+            credentials: 'same-origin',
+            keepalive: !!keepalive,
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCookie('csrftoken') || ''
+            },
+            body: body ? JSON.stringify(body) : undefined
+        }).then(response => response.ok ? response.json() : Promise.reject(response));
+    }
+
+    // Cart dari response server -> localStorage (id item lama dipertahankan)
+    function store(data) {
+        const previous = readJSON(CART_KEY, []);
+        const cart = data.items.map(item => {
+            const old = previous.find(p => p.productId == item.product_id);
+            return {
+                id: old ? old.id : Date.now() + item.product_id,
+                productId: item.product_id,
+                name: item.name,
+                price: item.price,
+                priceFormatted: 'IDR ' + item.price.toLocaleString('id-ID'),
+                image: item.image,
+                quantity: item.quantity
+            };
+        });
+        localStorage.setItem(CART_KEY, JSON.stringify(cart));
+        localStorage.setItem(SYNCED_KEY, JSON.stringify(quantities(cart)));
+        listeners.forEach(callback => callback(cart, data));
+        return cart;
+    }
+
+    function flush(keepalive) {
+        clearTimeout(timer);
+        if (Object.keys(pending).length === 0) {
+            return Promise.resolve(null);
+        }
+        const changes = pending;
+        pending = {};
+        return request('POST', {changes: changes}, keepalive)
+            .then(data => {
+                // Perubahan baru selama request berjalan: tunggu response berikutnya
+                return Object.keys(pending).length === 0 ? store(data) : null;
+            })
+            .catch(error => {
+                console.error('[CART SYNC] Gagal sinkronisasi cart:', error);
+                pending = Object.assign(changes, pending);
+            });
+    }
+
+    // Dipanggil setiap cart berubah; request dikirim setelah 300ms tanpa perubahan
+    function push(cart) {
+        const current = quantities(cart);
+        const synced = readJSON(SYNCED_KEY, {});
+        Object.keys(synced).forEach(id => {
+            if (!(id in current)) pending[id] = 0;
+        });
+        Object.keys(current).forEach(id => {
+            if (current[id] !== synced[id]) pending[id] = current[id];
+        });
+        clearTimeout(timer);
+        timer = setTimeout(flush, 300);
+    }
+
+    // Ambil cart dari server saat halaman dibuka
+    function pull() {
+        return request('GET').then(data => {
+            const local = readJSON(CART_KEY, []);
+            const synced = readJSON(SYNCED_KEY, null);
+            if (data.items.length === 0 && local.length > 0 && synced === null) {
+                // Cart lama yang belum pernah disinkronkan: kirim ke server
+                push(local);
+                return flush();
+            }
+            // Server kosong setelah checkout / login di perangkat lain: ikuti server
+            return store(data);
+        }).catch(error => {
+            console.error('[CART SYNC] Gagal memuat cart:', error);
+            return null;
+        });
+    }
+
+    function onChange(callback) {
+        listeners.push(callback);
+    }
+
+    window.addEventListener('pagehide', () => flush(true));
+
+    return {push: push, pull: pull, flush: flush, onChange: onChange};
+})();
@@ -8,10 +8,23 @@ document.addEventListener('DOMContentLoaded', function() {
         console.log('✓ Feather icons initialized');
     }
     
+    loadCatalogProductsData();
+    
     console.log("Loading cart from localStorage...");
     loadCartFromStorage();
     console.log("Cart loaded:", cart); 
     
+    // Cart di server (harga dari server) menggantikan salinan localStorage
+    if (typeof CartSync !== 'undefined') {
+        CartSync.onChange(function(serverCart) {
+            cart = serverCart;
+            updateCartBadge();
+            renderCart();
+            renderPaymentSummary();
+        });
+        CartSync.pull();
+    }
+    
     // Initialize all functions
     initializeSearch();
     initializeViewToggle();
@@ -52,6 +65,9 @@ function loadCartFromStorage() {
 function saveCartToStorage() {
     localStorage.setItem('cart', JSON.stringify(cart));
     console.log('✓ Cart saved to localStorage:', cart);
+    if (typeof CartSync !== 'undefined') {
+        CartSync.push(cart);
+    }
     updateCartBadge();
 }
 
@@ -128,6 +144,19 @@ const productsData = {
     },
 };
 
+// Product data rendered by the server-side catalog (blog/catalog.py)
+function loadCatalogProductsData() {
+    const dataElement = document.getElementById('catalog-products-data');
+    if (!dataElement) return;
+    
+    try {
+        Object.assign(productsData, JSON.parse(dataElement.textContent));
+        console.log('✓ Catalog products loaded:', Object.keys(productsData).length);
+    } catch (e) {
+        console.error('Error parsing catalog products:', e);
+    }
+}
+
 // Format currency
 function formatCurrency(amount) {
     return 'IDR ' + amount.toLocaleString('id-ID');
@@ -692,6 +721,7 @@ function openProductModal(productId) {
     quantityInput.value = 1;
 
     document.getElementById('productModal').dataset.currentProduct = productId;
+    refreshFavoriteButtons();
     document.getElementById('productModal').classList.add('open');
     document.body.style.overflow = 'hidden';
 
@@ -775,16 +805,13 @@ function buyNowFromModal() {
 
 // Toggle favorite in modal
 function toggleFavoriteModal() {
-    const btn = document.querySelector('.favorite-modal-btn');
-    if (!btn) return;
+    const modal = document.getElementById('productModal');
+    if (!modal || !modal.dataset.currentProduct) return;
 
-    if (btn.classList.contains('favorited')) {
-        btn.classList.remove('favorited');
-        showNotification('Dihapus dari wishlist');
-    } else {
-        btn.classList.add('favorited');
-        showNotification('Ditambahkan ke wishlist');
-    }
+    const productId = parseInt(modal.dataset.currentProduct);
+    const favorited = !isWishlisted(productId);
+    setWishlisted(productId, favorited);
+    showNotification(favorited ? 'Ditambahkan ke wishlist' : 'Dihapus dari wishlist');
 }
 
 // Search functionality
@@ -792,19 +819,104 @@ function initializeSearch() {
     const searchInput = document.querySelector('.search-input');
     if (!searchInput) return;
 
-    searchInput.addEventListener('input', function(e) {
-        const searchTerm = e.target.value.toLowerCase();
-        const products = document.querySelectorAll('.product-card');
-        
-        products.forEach(product => {
-            const productName = product.querySelector('.product-name').textContent.toLowerCase();
-            if (productName.includes(searchTerm)) {
-                product.style.display = 'flex';
-            } else {
-                product.style.display = 'none';
-            }
+    const resultsBox = searchInput.parentElement.querySelector('.search-results');
+    const searchUrl = searchInput.dataset.searchUrl;
+    let debounceTimer = null;
+    let controller = null;
+    let results = [];
+    let activeIndex = -1;
+
+    function closeResults() {
+        resultsBox.hidden = true;
+        activeIndex = -1;
+    }
+
+    function selectResult(index) {
+        const product = results[index];
+        if (!product) return;
+        // Produk hasil pencarian belum tentu ada di halaman katalog ini
+        productsData[product.id] = product;
+        closeResults();
+        openProductModal(String(product.id));
+    }
+
+    function renderResults(query) {
+        resultsBox.innerHTML = '';
+        if (results.length === 0) {
+            const empty = document.createElement('div');
+            empty.className = 'search-empty';
+            empty.textContent = `Tidak ada produk untuk "${query}"`;
+            resultsBox.appendChild(empty);
+        }
+        results.forEach((product, index) => {
+            const item = document.createElement('button');
+            item.type = 'button';
+            item.className = 'search-result' + (index === activeIndex ? ' active' : '');
+
+            const image = document.createElement('img');
+            image.src = product.image;
+            image.alt = '';
+            image.loading = 'lazy';
+
+            const text = document.createElement('span');
+            const name = document.createElement('strong');
+            name.textContent = product.name;
+            const meta = document.createElement('span');
+            meta.className = 'search-result-meta';
+            meta.textContent = [product.category, product.priceFormatted].filter(Boolean).join(' · ');
+            text.append(name, meta);
+
+            item.append(image, text);
+            item.addEventListener('mousedown', e => e.preventDefault());
+            item.addEventListener('click', () => selectResult(index));
+            resultsBox.appendChild(item);
         });
+        resultsBox.hidden = false;
+    }
+
+    async function runSearch(query) {
+        // Request lama dibatalkan supaya hasil yang tampil selalu untuk ketikan terakhir
+        if (controller) controller.abort();
+        controller = new AbortController();
+        try {
+            const response = await fetch(`${searchUrl}?q=${encodeURIComponent(query)}`, { signal: controller.signal });
+            if (!response.ok) return;
+            const data = await response.json();
+            results = data.results;
+            activeIndex = -1;
+            renderResults(query);
+        } catch (e) {
+            if (e.name !== 'AbortError') console.error('Search error:', e);
+        }
+    }
+
+    searchInput.addEventListener('input', function(e) {
+        const query = e.target.value.trim();
+        clearTimeout(debounceTimer);
+        if (query.length < 2) {
+            if (controller) controller.abort();
+            closeResults();
+            return;
+        }
+        debounceTimer = setTimeout(() => runSearch(query), 200);
+    });
+
+    searchInput.addEventListener('keydown', function(e) {
+        if (resultsBox.hidden || results.length === 0) return;
+        if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+            e.preventDefault();
+            const step = e.key === 'ArrowDown' ? 1 : -1;
+            activeIndex = (activeIndex + step + results.length) % results.length;
+            renderResults(searchInput.value.trim());
+        } else if (e.key === 'Enter') {
+            e.preventDefault();
+            selectResult(activeIndex >= 0 ? activeIndex : 0);
+        } else if (e.key === 'Escape') {
+            closeResults();
+        }
     });
+
+    searchInput.addEventListener('blur', closeResults);
 }
 
 // View toggle
@@ -832,38 +944,17 @@ function initializeViewToggle() {
     });
 }
 
-// Favorite button functionality
+// Favorite button functionality (wishlist, lihat WISHLIST MANAGEMENT)
 function initializeFavorites() {
-    const favBtns = document.querySelectorAll('.favorite-btn');
-    if (favBtns.length === 0) return;
+    refreshFavoriteButtons();
+    updateWishlistBadge();
 
-    favBtns.forEach(btn => {
-        btn.addEventListener('click', function(e) {
-            e.stopPropagation(); 
-            
-            if (this.classList.contains('favorited')) {
-                this.classList.remove('favorited');
-                this.style.color = '#64748b';
-                showNotification('Dihapus dari favorites');
-            } else {
-                this.classList.add('favorited');
-                this.style.color = '#ef4444';
-                showNotification('Ditambahkan ke favorites');
-            }
+    if (typeof WishlistSync !== 'undefined') {
+        WishlistSync.onChange(function() {
+            refreshFavoriteButtons();
+            updateWishlistBadge();
         });
-    });
-}
-
-// Simple toggle favorite function
-function toggleFavorite(btn) {
-    if (btn.classList.contains('favorited')) {
-        btn.classList.remove('favorited');
-        btn.style.color = '#64748b';
-        showNotification('Dihapus dari favorites');
-    } else {
-        btn.classList.add('favorited');
-        btn.style.color = '#ef4444';
-        showNotification('Ditambahkan ke favorites');
+        WishlistSync.pull();
     }
 }
 
@@ -952,44 +1043,70 @@ function initializeModalTabs() {
 // WISHLIST MANAGEMENT
 // ═══════════════════════════════════════════════════════════
 
-function toggleFavorite(button) {
-    const productCard = button.closest('.product-card');
-    const productId = parseInt(productCard.getAttribute('data-product-id'));
-    
-    let wishlist = JSON.parse(localStorage.getItem('wishlist')) || [];
-    const existingIndex = wishlist.findIndex(item => item.id === productId);
-    
-    if (existingIndex > -1) {
-        // Remove from wishlist
-        wishlist.splice(existingIndex, 1);
-        button.classList.remove('favorited');
-        showWishlistNotification('Removed from wishlist');
-    } else {
-        // Add to wishlist
-        const productName = productCard.querySelector('.product-name').textContent;
-        const productImage = productCard.querySelector('.product-image img').src;
-        const currentPrice = productCard.querySelector('.current-price').textContent.replace('IDR ', '').replace(/\./g, '').trim();
-        const originalPriceElement = productCard.querySelector('.original-price');
-        const originalPrice = originalPriceElement ? originalPriceElement.textContent.replace('IDR ', '').replace(/\./g, '').trim() : null;
-        
-        wishlist.push({
+function getWishlist() {
+    try {
+        return JSON.parse(localStorage.getItem('wishlist')) || [];
+    } catch (e) {
+        return [];
+    }
+}
+
+function isWishlisted(productId) {
+    return getWishlist().some(item => item.id === parseInt(productId));
+}
+
+// Simpan di localStorage (render cepat, tamu) dan kirim ke server untuk user login
+function setWishlisted(productId, favorited) {
+    productId = parseInt(productId);
+    const wishlist = getWishlist().filter(item => item.id !== productId);
+
+    if (favorited) {
+        const product = productsData[productId] || {};
+        wishlist.unshift({
             id: productId,
-            name: productName,
-            price: parseInt(currentPrice),
-            originalPrice: originalPrice ? parseInt(originalPrice) : null,
-            image: productImage
+            name: product.name,
+            price: product.price,
+            originalPrice: product.originalPrice ? parseInt(String(product.originalPrice).replace(/\D/g, '')) : null,
+            image: product.image
         });
-        
-        button.classList.add('favorited');
-        showWishlistNotification('✓ Added to wishlist!');
     }
-    
+
     localStorage.setItem('wishlist', JSON.stringify(wishlist));
+    if (typeof WishlistSync !== 'undefined') {
+        WishlistSync.toggle(productId, favorited);
+    }
+    refreshFavoriteButtons();
     updateWishlistBadge();
 }
 
+function refreshFavoriteButtons() {
+    const ids = getWishlist().map(item => item.id);
+
+    document.querySelectorAll('.product-card').forEach(card => {
+        const favoriteBtn = card.querySelector('.favorite-btn');
+        if (favoriteBtn) {
+            favoriteBtn.classList.toggle('favorited', ids.includes(parseInt(card.getAttribute('data-product-id'))));
+        }
+    });
+
+    const modal = document.getElementById('productModal');
+    const modalBtn = document.querySelector('.favorite-modal-btn');
+    if (modal && modalBtn) {
+        modalBtn.classList.toggle('favorited', ids.includes(parseInt(modal.dataset.currentProduct)));
+    }
+}
+
+function toggleFavorite(button) {
+    const productCard = button.closest('.product-card');
+    const productId = parseInt(productCard.getAttribute('data-product-id'));
+    const favorited = !isWishlisted(productId);
+
+    setWishlisted(productId, favorited);
+    showWishlistNotification(favorited ? '✓ Added to wishlist!' : 'Removed from wishlist');
+}
+
 function updateWishlistBadge() {
-    const wishlist = JSON.parse(localStorage.getItem('wishlist')) || [];
+    const wishlist = getWishlist();
     const badge = document.getElementById('wishlist-badge-header');
     
     if (badge) {
@@ -1021,23 +1138,3 @@ function showWishlistNotification(message) {
         setTimeout(() => notification.remove(), 300);
     }, 2000);
 }
-
-// Load wishlist state on page load
-document.addEventListener('DOMContentLoaded', function() {
-    const wishlist = JSON.parse(localStorage.getItem('wishlist')) || [];
-    
-    // Mark favorited products
-    document.querySelectorAll('.product-card').forEach(card => {
-        const productId = parseInt(card.getAttribute('data-product-id'));
-        const isFavorited = wishlist.some(item => item.id === productId);
-        
-        if (isFavorited) {
-            const favoriteBtn = card.querySelector('.favorite-btn');
-            if (favoriteBtn) {
-                favoriteBtn.classList.add('favorited');
-            }
-        }
-    });
-    
-    updateWishlistBadge();
-});
\ No newline at end of file
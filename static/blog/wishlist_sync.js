@@ -0,0 +1,100 @@
+// Sinkronisasi wishlist localStorage <-> server (api/wishlist/, blog/wishlist.py).
+// Tamu: wishlist hanya di localStorage. User login: toggle dikumpulkan lalu
+// dikirim dalam satu request; wishlist lokal yang belum pernah disinkronkan
+// digabung ke server sekali saat halaman dibuka.
+const WishlistSync = (function() {
+    const WISHLIST_KEY = 'wishlist';
+    const SYNCED_KEY = 'wishlist_synced';
+    const listeners = [];
+    let authenticated = false;
+    let pending = {};
+    let timer = null;
+
+    function getCookie(name) {
+        const match = document.cookie.split(';').map(c => c.trim()).find(c => c.startsWith(name + '='));
+        return match ? decodeURIComponent(match.substring(name.length + 1)) : null;
+    }
+
+    function readJSON(key, fallback) {
+        try {
+            return JSON.parse(localStorage.getItem(key)) || fallback;
+        } catch (e) {
+            return fallback;
+        }
+    }
+
+    function request(method, body, keepalive) {
+        return fetch('/api/wishlist/', {
+            method: method,
+            credentials: 'same-origin',
+            keepalive: !!keepalive,
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCookie('csrftoken') || ''
+            },
+            body: body ? JSON.stringify(body) : undefined
+        }).then(response => response.ok ? response.json() : Promise.reject(response));
+    }
+
+    // Wishlist dari server -> localStorage
+    function store(data) {
+        localStorage.setItem(WISHLIST_KEY, JSON.stringify(data.items));
+        localStorage.setItem(SYNCED_KEY, JSON.stringify(data.items.map(item => item.id)));
+        listeners.forEach(callback => callback(data.items));
+        return data.items;
+    }
+
+    function flush(keepalive) {
+        clearTimeout(timer);
+        const ids = Object.keys(pending);
+        if (!authenticated || ids.length === 0) {
+            return Promise.resolve(null);
+        }
+        const changes = pending;
+        pending = {};
+        const body = {
+            add: ids.filter(id => changes[id]).map(Number),
+            remove: ids.filter(id => !changes[id]).map(Number)
+        };
+        return request('POST', body, keepalive)
+            .then(data => Object.keys(pending).length === 0 ? store(data) : null)
+            .catch(error => {
+                console.error('[WISHLIST SYNC] Gagal sinkronisasi wishlist:', error);
+                pending = Object.assign(changes, pending);
+            });
+    }
+
+    // Dipanggil setiap produk ditambah/dihapus; dikirim setelah 300ms tanpa perubahan
+    function toggle(productId, favorited) {
+        pending[productId] = favorited;
+        clearTimeout(timer);
+        timer = setTimeout(flush, 300);
+    }
+
+    function pull() {
+        return request('GET').then(data => {
+            authenticated = data.authenticated;
+            if (!authenticated) return null;
+
+            const local = readJSON(WISHLIST_KEY, []).map(item => item.id);
+            const synced = readJSON(SYNCED_KEY, []);
+            const server = data.items.map(item => item.id);
+            // Ditambah sebelum login / saat offline -> tambahkan ke server;
+            // dihapus sejak sinkronisasi terakhir -> hapus dari server
+            local.filter(id => !server.includes(id) && !synced.includes(id)).forEach(id => { pending[id] = true; });
+            synced.filter(id => server.includes(id) && !local.includes(id)).forEach(id => { pending[id] = false; });
+            return Object.keys(pending).length ? flush() : store(data);
+        }).catch(error => {
+            console.error('[WISHLIST SYNC] Gagal memuat wishlist:', error);
+            return null;
+        });
+    }
+
+    function onChange(callback) {
+        listeners.push(callback);
+    }
+
+    window.addEventListener('pagehide', () => flush(true));
+
+    return {toggle: toggle, pull: pull, flush: flush, onChange: onChange};
+})();